@@ -10,7 +10,9 @@ import datetime
 from os.path import exists
 from Pyfhel import Pyfhel, PyCtxt
 
-CONFIG = {"scheme": "pyfhel-ckks"}
+CONFIG = {"scheme": "pyfhel-ckks", "bfv": {"plain_bound": 40960, "depth": 1, "batching": True}}
+# Smallest BFV parameters meeting the requirements in the config (the stored keys depend on them)
+BFV_CONTEXT = bfv_python.BFVContext.from_requirements(**CONFIG["bfv"])
 
 # Benchmarking Functions
 def get_byte_size(input_obj) -> int:
@@ -37,18 +39,11 @@ def execution_time(input_func, *args) -> float:
 # Encryption Functions
 def key_gen_test():
     if CONFIG["scheme"] == "bfv_python":
-        n = 4096
-        q = 2**54
-        t = 40961
-        std_dev = 3.2
-        p = 2
-        std_dev2 = 1.6
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1]) 
-        priv, pub = bfv_python.key_pair_gen(n, q, poly_mod, std_dev)
-        rlk = bfv_python.rlk_gen(n, q, p, poly_mod, priv, std_dev2)
+        priv, pub = BFV_CONTEXT.key_pair_gen(seeded=True)
+        rlk = BFV_CONTEXT.rlk_gen(priv, seeded=True)
         numpy.savez_compressed('keys/priv.bfv', priv)
-        numpy.savez_compressed('keys/pub.bfv', pub)
-        numpy.savez_compressed('keys/rlk.bfv', rlk)
+        bfv_python.save_key('keys/pub.bfv', pub)
+        bfv_python.save_key('keys/rlk.bfv', rlk)
     
     elif CONFIG["scheme"] == "RSA":
         (pubkey, privkey) = rsa.newkeys(256)
@@ -78,24 +73,20 @@ def key_gen_test():
 def encrypt(message):
     '''Encrypts energy reading with specified scheme in Config'''
     if CONFIG["scheme"] == "bfv_python":
-        n = 4096
-        q = 2**54
-        t = 40961
-        std_dev = 3.2
-        p = 2
-        std_dev2 = 1.6
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
         if not exists('keys/priv.bfv.npz') or not exists('keys/pub.bfv.npz') or not exists('keys/rlk.bfv.npz'):
-            priv, pub = bfv_python.key_pair_gen(n, q, poly_mod, std_dev)
+            priv, pub = BFV_CONTEXT.key_pair_gen(seeded=True)
             numpy.savez_compressed('keys/priv.bfv', priv)
-            numpy.savez_compressed('keys/pub.bfv', pub)
-            rlk = bfv_python.rlk_gen(n, q, p, poly_mod, priv, std_dev2)
-            numpy.savez_compressed('keys/rlk.bfv', rlk)
+            bfv_python.save_key('keys/pub.bfv', pub)
+            rlk = BFV_CONTEXT.rlk_gen(priv, seeded=True)
+            bfv_python.save_key('keys/rlk.bfv', rlk)
         else:
             priv = numpy.load('keys/priv.bfv.npz')['arr_0']
-            pub = numpy.load('keys/pub.bfv.npz')['arr_0']
-            rlk = numpy.load('keys/rlk.bfv.npz')['arr_0']
-        enc_mess = bfv_python.encrypt_message(message, pub, n, q, t, poly_mod, std_dev)
+            pub = bfv_python.load_key('keys/pub.bfv.npz')
+            rlk = bfv_python.load_key('keys/rlk.bfv.npz')
+            BFV_CONTEXT.check_key(priv) # keys from other parameters would decrypt to garbage
+            BFV_CONTEXT.check_key(pub)
+            BFV_CONTEXT.check_key(rlk, relin=True)
+        enc_mess = BFV_CONTEXT.encrypt(message, pub)
         c1 = json.dumps(enc_mess[0].tolist())
         c2 = json.dumps(enc_mess[1].tolist())
         return (c1+"|"+c2).replace(" ", "")
@@ -149,15 +140,12 @@ def encrypt(message):
 def decrypt(message):
     '''Function to handle decryption of incoming messages'''
     if CONFIG["scheme"] == "bfv_python":
-        n = 4096
-        q = 2**54
-        t = 40961
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
         priv = numpy.load('keys/priv.bfv.npz')['arr_0']
+        BFV_CONTEXT.check_key(priv)
         enc_mess = message.split("|")
-        c1 = numpy.array(json.loads(enc_mess[0]))
-        c2 = numpy.array(json.loads(enc_mess[1]))
-        return bfv_python.decrypt_cipher((c1,c2),priv,q,t,poly_mod)
+        c1 = numpy.array(json.loads(enc_mess[0]), dtype=BFV_CONTEXT.dtype)
+        c2 = numpy.array(json.loads(enc_mess[1]), dtype=BFV_CONTEXT.dtype)
+        return BFV_CONTEXT.decrypt((c1,c2),priv)
     elif CONFIG["scheme"] == "RSA":
         with open('keys/priv.rsa.pem', mode='rb') as priv_f:
             privkey = rsa.PrivateKey.load_pkcs1(priv_f.read())
@@ -181,18 +169,15 @@ def decrypt(message):
 
 def eval_add(m1, m2):
     if CONFIG["scheme"] == "bfv_python":
-        q = 2**54
-        n = 4096
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
         m1_split = m1.split("|")
-        m1_c1 = numpy.array(json.loads(m1_split[0]))
-        m1_c2 = numpy.array(json.loads(m1_split[1]))
+        m1_c1 = numpy.array(json.loads(m1_split[0]), dtype=BFV_CONTEXT.dtype)
+        m1_c2 = numpy.array(json.loads(m1_split[1]), dtype=BFV_CONTEXT.dtype)
         enc_m1 = (m1_c1, m1_c2)
         m2_split = m2.split("|")
-        m2_c1 = numpy.array(json.loads(m2_split[0]))
-        m2_c2 = numpy.array(json.loads(m2_split[1]))
+        m2_c1 = numpy.array(json.loads(m2_split[0]), dtype=BFV_CONTEXT.dtype)
+        m2_c2 = numpy.array(json.loads(m2_split[1]), dtype=BFV_CONTEXT.dtype)
         enc_m2 = (m2_c1, m2_c2)
-        enc_sum = bfv_python.eval_add(enc_m1, enc_m2, q, poly_mod)
+        enc_sum = BFV_CONTEXT.eval_add(enc_m1, enc_m2)
         c1 = json.dumps(enc_sum[0].tolist())
         c2 = json.dumps(enc_sum[1].tolist())
         return (c1+"|"+c2).replace(" ", "")
@@ -219,21 +204,17 @@ def eval_add(m1, m2):
 
 def eval_mult(m1, m2):
     if CONFIG["scheme"] == "bfv_python":
-        q = 2**54
-        n = 4096
-        t = 40961
-        p = 2
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
-        rlk = numpy.load('keys/rlk.bfv.npz')['arr_0']
+        rlk = bfv_python.load_key('keys/rlk.bfv.npz')
+        BFV_CONTEXT.check_key(rlk, relin=True)
         m1_split = m1.split("|")
-        m1_c1 = numpy.array(json.loads(m1_split[0]))
-        m1_c2 = numpy.array(json.loads(m1_split[1]))
+        m1_c1 = numpy.array(json.loads(m1_split[0]), dtype=BFV_CONTEXT.dtype)
+        m1_c2 = numpy.array(json.loads(m1_split[1]), dtype=BFV_CONTEXT.dtype)
         enc_m1 = (m1_c1, m1_c2)
         m2_split = m2.split("|")
-        m2_c1 = numpy.array(json.loads(m2_split[0]))
-        m2_c2 = numpy.array(json.loads(m2_split[1]))
+        m2_c1 = numpy.array(json.loads(m2_split[0]), dtype=BFV_CONTEXT.dtype)
+        m2_c2 = numpy.array(json.loads(m2_split[1]), dtype=BFV_CONTEXT.dtype)
         enc_m2 = (m2_c1, m2_c2)
-        enc_prod = bfv_python.eval_mult(enc_m1, enc_m2, q, t, p, poly_mod, rlk)
+        enc_prod = BFV_CONTEXT.eval_mult(enc_m1, enc_m2, rlk)
         c1 = json.dumps(enc_prod[0].tolist())
         c2 = json.dumps(enc_prod[1].tolist())
         return (c1+"|"+c2).replace(" ", "")
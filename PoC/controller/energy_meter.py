@@ -15,25 +15,34 @@ from Pyfhel import Pyfhel, PyCtxt
 with open("./config/config.json", "r") as config_f:
     CONFIG = json.load(config_f)
 TOPIC = f"Meters/{CONFIG['scheme']}/kw/" # topic to subscribe to
+# Smallest BFV parameters meeting the requirements in the config (the stored keys depend on them)
+BFV_CONTEXT = bfv_python.BFVContext.from_requirements(**CONFIG["bfv"])
 
 
 
 # Set Message Queue #
 q=Queue() # initialise queue
 
+def load_c2(text):
+    '''Parses c2 of a bfv_python ciphertext, expanding it from its seed for seeded ciphertexts.'''
+    if text.startswith("["):
+        return numpy.array(json.loads(text), dtype=BFV_CONTEXT.dtype)
+    return BFV_CONTEXT.expand_cipher((None, bytes.fromhex(text)))[1]
+
 def decrypt(message):
     '''Function to handle decryption of incoming messages'''
     if CONFIG["scheme"] == "bfv_python":
         message = message.decode('utf8')
-        n = 4096
-        q = 2**54
-        t = 40961
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
         priv = numpy.load('config/priv.bfv.npz')['arr_0']
+        BFV_CONTEXT.check_key(priv)
         enc_mess = message.split("|")
-        c1 = numpy.array(json.loads(enc_mess[0]))
-        c2 = numpy.array(json.loads(enc_mess[1]))
-        return bfv_python.decrypt_cipher((c1,c2),priv,q,t,poly_mod)
+        if len(enc_mess) == 3: # evaluation result switched to a smaller modulus
+            context = BFV_CONTEXT.switched_context(int(enc_mess[2]))
+            c1, c2 = (numpy.array(json.loads(c), dtype=context.dtype) for c in enc_mess[:2])
+            return context.decrypt((c1,c2),priv)
+        c1 = numpy.array(json.loads(enc_mess[0]), dtype=BFV_CONTEXT.dtype)
+        c2 = load_c2(enc_mess[1])
+        return BFV_CONTEXT.decrypt((c1,c2),priv)
     
     elif CONFIG["scheme"] == "RSA":
         with open('config/priv.rsa.pem', mode='rb') as priv_f:
@@ -17,6 +17,8 @@ from Pyfhel import Pyfhel, PyCtxt
 ### Config ###
 with open("./config/config.json", "r") as config_f:
     CONFIG = json.load(config_f)
+# Smallest BFV parameters meeting the requirements in the config (the stored keys depend on them)
+BFV_CONTEXT = bfv_python.BFVContext.from_requirements(**CONFIG["bfv"])
 
 # Functions #
 def retrieve_key():
@@ -77,6 +79,7 @@ class Meter:
         self.client = mqtt.Client("Meter/"+str(self.label)) # set MQTT client incl. label
         self.topic = f"Meters/{CONFIG['scheme']}/kw/"
         self.prefix = self.label+": "
+        self.pool = None # pool of precomputed encryptions of zero (bfv_python only)
 
     def publish_reading(self):
         '''Publishes object's current kw reading to its MQTT Topic including its label prefix.'''
@@ -88,27 +91,37 @@ class Meter:
             print(f'Failed to send message to topic "{self.topic}"') # print error if unsuccessful
         return True
 
+    def idle(self, duration):
+        '''Precomputes encryptions of zero while idle and sleeps for the remaining duration.'''
+        end_time = time.time() + duration
+        if self.pool is not None:
+            self.pool.refill() # offline step: fill the pool during the idle period
+        time.sleep(max(0, end_time - time.time()))
+
     def encrypt_reading(self, message):
         '''Encrypts energy reading with specified scheme in Config'''
         if CONFIG["scheme"] == "bfv_python":
-            n = 4096
-            q = 2**54
-            t = 40961
-            std_dev = 3.2
-            p = 2
-            std_dev2 = 1.6
-            poly_mod = numpy.array([1]+[0]*(n-1)+[1])
             if not exists('config/priv.bfv.npz') or not exists('config/pub.bfv.npz') or not exists('config/rlk.bfv.npz'):
-                priv, pub = bfv_python.key_pair_gen(n, q, poly_mod, std_dev)
+                priv, pub = BFV_CONTEXT.key_pair_gen(seeded=True)
                 numpy.savez_compressed('config/priv.bfv', priv)
-                numpy.savez_compressed('config/pub.bfv', pub)
-                rlk = bfv_python.rlk_gen(n, q, p, poly_mod, priv, std_dev2)
-                numpy.savez_compressed('config/rlk.bfv', rlk)
+                bfv_python.save_key('config/pub.bfv', pub)
+                rlk = BFV_CONTEXT.rlk_gen(priv, seeded=True)
+                bfv_python.save_key('config/rlk.bfv', rlk)
             else:
                 priv = numpy.load('config/priv.bfv.npz')['arr_0']
-                pub = numpy.load('config/pub.bfv.npz')['arr_0']
-                rlk = numpy.load('config/rlk.bfv.npz')['arr_0']
-            enc_mess = bfv_python.encrypt_message(message, pub, n, q, t, poly_mod, std_dev)
+                pub = bfv_python.load_key('config/pub.bfv.npz')
+                rlk = bfv_python.load_key('config/rlk.bfv.npz')
+                BFV_CONTEXT.check_key(priv) # keys from other parameters would decrypt to garbage
+                BFV_CONTEXT.check_key(pub)
+                BFV_CONTEXT.check_key(rlk, relin=True)
+            if CONFIG.get("symmetric", False): # secret key encryption, c2 is sent as its seed
+                enc_mess = BFV_CONTEXT.encrypt_symmetric(message, priv)
+                c1 = json.dumps(enc_mess[0].tolist())
+                self.reading = (c1+"|"+enc_mess[1].hex()).replace(" ", "")
+                return
+            if self.pool is None: # set up the pool on first use with the loaded public key
+                self.pool = bfv_python.EncryptionPool(BFV_CONTEXT, pub, CONFIG.get("pool_size", 16))
+            enc_mess = self.pool.encrypt(message) # online step: only adds the scaled message
             c1 = json.dumps(enc_mess[0].tolist())
             c2 = json.dumps(enc_mess[1].tolist())
             self.reading = (c1+"|"+c2).replace(" ", "")
@@ -186,4 +199,4 @@ energymeter.client.connect(CONFIG["broker"], port=int(CONFIG["port"])) # connect
 while True:
     energymeter.encrypt_reading(randint(0, 10)) # assign random integer value between 0 and 10 as kw and encrypt
     energymeter.publish_reading() # publish the energy consumption to the MQTT topic
-    time.sleep(CONFIG["freq"])
\ No newline at end of file
+    energymeter.idle(CONFIG["freq"]) # refill precomputed encryptions and wait for next reading
\ No newline at end of file
@@ -1,10 +1,681 @@
 '''Main module for the bfv_python homomorphic encryption library.'''
 
+import hashlib
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 import numpy
-from numpy.polynomial import polynomial
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Bit size of the auxiliary NTT primes. Keeping the primes below 2^31 guarantees
+# that the product of two residues always fits into an unsigned 64-bit integer.
+NTT_PRIME_BITS = 31
+
+# Number of bytes of the seeds from which uniform polynomials are expanded.
+SEED_BYTES = 32
+
+# Maximal bit size of the (key switching) modulus per polynomial length and security level
+# for ternary secrets, as per the HomomorphicEncryption.org security standard.
+SECURITY_MAX_LOG_Q = {
+    128: {1024: 27, 2048: 54, 4096: 109, 8192: 218, 16384: 438, 32768: 881},
+    192: {1024: 19, 2048: 37, 4096: 75, 8192: 152, 16384: 305, 32768: 611},
+    256: {1024: 14, 2048: 29, 4096: 58, 8192: 118, 16384: 237, 32768: 476},
+}
+
+# Modular Arithmetic Kernels
+# Vectorized arithmetic on uint64 residues modulo word-size moduli below 2^NTT_PRIME_BITS
+# without any hardware division: products of two residues are reduced via Barrett reduction,
+# products with a fixed operand (e.g. NTT twiddle factors) via Shoup's precomputed quotients.
+# The moduli are uint64 arrays broadcasting against the operands (e.g. of shape (k, 1)).
+# All kernels accept an optional out array, which may alias the first operand, and an
+# optional scratch array of the output shape for their temporary (see Workspace).
+SHOUP_SHIFT = numpy.uint64(32)
+
+def barrett_precompute(moduli) -> tuple:
+    '''
+    Precomputes the Barrett constants floor(4^l/p) for moduli p of bit size l.
+    Takes as input:
+        moduli: uint64 array of moduli below 2^31.
+    Returns:
+        The tuple (factors, low_shifts, high_shifts) of uint64 arrays shaped like moduli.
+    '''
+    moduli = numpy.asarray(moduli, dtype=numpy.uint64)
+    bits = [int(prime).bit_length() for prime in moduli.flat]
+    factors = [(1 << 2*bit) // int(prime) for bit, prime in zip(bits, moduli.flat)]
+    return tuple(numpy.array(values, dtype=numpy.uint64).reshape(moduli.shape)
+        for values in (factors, [bit - 1 for bit in bits], [bit + 1 for bit in bits]))
+
+def shoup_precompute(operand, moduli):
+    '''
+    Precomputes Shoup's quotients floor(w*2^32/p) for fixed operands w within [0, p).
+    Takes as input:
+        operand: uint64 array of the fixed operands.
+        moduli: uint64 array of moduli below 2^31 (broadcasting against operand).
+    Returns:
+        The uint64 array of quotients.
+    '''
+    return (numpy.asarray(operand, dtype=numpy.uint64) << SHOUP_SHIFT) // moduli
+
+def mod_add(poly1, poly2, moduli, out=None, scratch=None):
+    '''
+    Adds residues within [0, p) modulo p.
+    Takes as input:
+        poly1: first uint64 array of residues.
+        poly2: second uint64 array of residues.
+        moduli: uint64 array of moduli.
+        out: optional output array.
+        scratch: optional uint64 array of the output shape for the wrapped sum.
+    Returns:
+        The sum within [0, p).
+    '''
+    result = numpy.add(poly1, poly2, out=out)
+    # Subtracting p wraps around for values below p, so the minimum is the reduced value
+    return numpy.minimum(result, numpy.subtract(result, moduli, out=scratch), out=result)
+
+def mod_sub(poly1, poly2, moduli, out=None, scratch=None):
+    '''
+    Subtracts residues within [0, p) modulo p.
+    Takes as input:
+        poly1: uint64 array of residues to take as base.
+        poly2: uint64 array of residues to subtract from base.
+        moduli: uint64 array of moduli.
+        out: optional output array.
+        scratch: optional uint64 array of the output shape for the wrapped difference.
+    Returns:
+        The difference within [0, p).
+    '''
+    result = numpy.subtract(poly1, poly2, out=out)
+    return numpy.minimum(result, numpy.add(result, moduli, out=scratch), out=result)
+
+def mod_mul(poly1, poly2, moduli, barrett:tuple, out=None, scratch=None):
+    '''
+    Multiplies residues modulo p using Barrett reduction. The product z < p^2 < 4^l is
+    divided by p via q = floor(floor(z/2^(l-1)) * floor(4^l/p) / 2^(l+1)), which
+    underestimates the quotient by at most 2, and all intermediate values fit into 64 bits.
+    Takes as input:
+        poly1: first uint64 array of residues.
+        poly2: second uint64 array of residues.
+        moduli: uint64 array of moduli below 2^31.
+        barrett: the Barrett constants generated via barrett_precompute().
+        out: optional output array.
+        scratch: optional uint64 array of the output shape for the quotients.
+    Returns:
+        The product within [0, p).
+    '''
+    factors, low_shifts, high_shifts = barrett
+    product = numpy.multiply(poly1, poly2, out=out)
+    quotient = numpy.right_shift(product, low_shifts, out=scratch)
+    numpy.multiply(quotient, factors, out=quotient)
+    numpy.right_shift(quotient, high_shifts, out=quotient)
+    numpy.multiply(quotient, moduli, out=quotient)
+    numpy.subtract(product, quotient, out=product)
+    for _ in range(2):
+        numpy.subtract(product, moduli, out=quotient)
+        numpy.minimum(product, quotient, out=product)
+    return product
+
+def mod_mul_shoup(poly, operand, operand_shoup, moduli, out=None, scratch=None):
+    '''
+    Multiplies residues with fixed operands modulo p using Shoup's precomputed quotients,
+    i.e. x*w - floor(x*w'/2^32)*p lies within [0, 2p) for x < 2^32 and p < 2^31.
+    Takes as input:
+        poly: uint64 array of values below 2^32.
+        operand: uint64 array of the fixed operands within [0, p).
+        operand_shoup: the quotients generated via shoup_precompute().
+        moduli: uint64 array of moduli below 2^31.
+        out: optional output array.
+        scratch: optional uint64 array of the output shape for the quotients.
+    Returns:
+        The product within [0, p).
+    '''
+    quotient = numpy.multiply(poly, operand_shoup, out=scratch)
+    numpy.right_shift(quotient, SHOUP_SHIFT, out=quotient)
+    numpy.multiply(quotient, moduli, out=quotient)
+    result = numpy.multiply(poly, operand, out=out)
+    numpy.subtract(result, quotient, out=result)
+    numpy.subtract(result, moduli, out=quotient)
+    return numpy.minimum(result, quotient, out=result)
+
+# Workspace Arena
+# Ring operations allocate their results and temporaries on every call, which for large
+# parameters (arrays beyond the mmap threshold of the allocator) costs about as much as the
+# arithmetic itself. Functions taking a workspace draw their temporaries from its buffers
+# and write their results into the given out arrays, so that steady-state encryption and
+# accumulation run without allocator churn. Buffers are overwritten by every call using
+# them, a workspace must thus not be shared between threads.
+class Workspace:
+    '''
+    Arena of reusable scratch buffers, allocated on first use and keyed by name, shape and dtype.
+    '''
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name:str, shape:tuple, dtype=numpy.uint64):
+        '''
+        Returns the scratch buffer of the given name and shape (uninitialized on first use).
+        Takes as input:
+            name: the name of the buffer (distinct for buffers used at the same time).
+            shape: the shape of the buffer.
+            dtype: the dtype of the buffer.
+        Returns:
+            The buffer as numpy array.
+        '''
+        key = (name, tuple(shape), numpy.dtype(dtype))
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = numpy.empty(shape, dtype=dtype)
+        return buffer
+
+    @property
+    def nbytes(self) -> int:
+        '''Returns the total size of all scratch buffers in bytes.'''
+        return sum(buffer.nbytes for buffer in self.buffers.values())
+
+    def clear(self):
+        '''Releases all scratch buffers, they are reallocated on their next use.'''
+        self.buffers.clear()
+
+def _scratch(workspace:Workspace, name:str, shape:tuple):
+    # Scratch buffer of a kernel, without workspace the kernel allocates its own temporary
+    return None if workspace is None else workspace.get(name, shape)
+
+# Optional JIT Backend
+# If Numba is installed, the NTT and the negacyclic reduction run as compiled loops
+# (cached on disk after the first call) instead of whole-array NumPy passes, which avoids
+# the temporaries of every butterfly stage. Both backends return identical outputs,
+# the JIT backend can be disabled via use_jit(False) or the environment variable
+# BFV_PYTHON_JIT=0 (e.g. to avoid the compilation time on short-lived processes).
+_JIT_STATE = {"enabled": numba is not None and os.environ.get("BFV_PYTHON_JIT", "1") != "0"}
+
+def use_jit(enabled:bool=True) -> bool:
+    '''
+    Enables or disables the Numba backend of the ring kernels.
+    Takes as input:
+        enabled: True to use the Numba backend (if installed), False for pure NumPy.
+    Returns:
+        True if the Numba backend is active afterwards.
+    '''
+    _JIT_STATE["enabled"] = enabled and numba is not None
+    return _JIT_STATE["enabled"]
+
+def _jit(func):
+    '''Compiles func with Numba if available, otherwise func is returned unchanged.'''
+    return numba.njit(cache=True)(func) if numba is not None else func
+
+@_jit
+def _ntt_rows_jit(residues, prime_index, moduli, twist, twist_shoup, twiddles,
+    twiddles_shoup, bitrev, inverse, output):
+    '''Constant geometry NTT (see _ntt_butterflies()) of every row of residues into output.'''
+    rows, len_n = residues.shape
+    half = len_n // 2
+    shift = numpy.uint64(32)
+    work = numpy.empty(len_n, dtype=numpy.uint64)
+    spare = numpy.empty(len_n, dtype=numpy.uint64)
+    for row in range(rows):
+        index = prime_index[row]
+        prime = moduli[index]
+        for i in range(len_n):
+            value = residues[row, i]
+            if not inverse:
+                value = value * twist[index, i] - ((value * twist_shoup[index, i]) >> shift) * prime
+                if value >= prime:
+                    value -= prime
+            work[i] = value
+        for stage in range(twiddles.shape[0]):
+            for i in range(half):
+                upper = work[i]
+                lower = work[i + half]
+                lower = lower * twiddles[stage, index, i] \
+                    - ((lower * twiddles_shoup[stage, index, i]) >> shift) * prime
+                if lower >= prime:
+                    lower -= prime
+                total = upper + lower
+                spare[2*i] = total - prime if total >= prime else total
+                difference = upper + prime - lower
+                spare[2*i + 1] = difference - prime if difference >= prime else difference
+            work, spare = spare, work
+        for i in range(len_n):
+            value = work[bitrev[i]]
+            if inverse:
+                value = value * twist[index, i] - ((value * twist_shoup[index, i]) >> shift) * prime
+                if value >= prime:
+                    value -= prime
+            output[row, i] = value
+    return output
+
+def _ntt_jit(residues, tables:dict, inverse:bool, out=None):
+    '''Applies _ntt_rows_jit() to residues of shape (..., k, len_n), out has to be contiguous.'''
+    shape = residues.shape
+    rows = numpy.ascontiguousarray(residues, dtype=numpy.uint64).reshape(-1, shape[-1])
+    output = numpy.empty(shape, dtype=numpy.uint64) if out is None else out
+    # Rows are read completely before they are written, so out may alias residues
+    prime_index = numpy.arange(len(rows)) % shape[-2]
+    suffix = "_inv" if inverse else ""
+    _ntt_rows_jit(rows, prime_index, tables["moduli"][:, 0], tables["psi" + suffix],
+        tables["psi" + suffix + "_shoup"], tables["twiddles" + suffix],
+        tables["twiddles" + suffix + "_shoup"], tables["bitrev"], inverse,
+        output.reshape(rows.shape))
+    return output
+
+@_jit
+def _negacyclic_fold_jit(poly, len_n):
+    '''Folds every row of an int64 array onto len_n coefficients with alternating signs.'''
+    rows, length = poly.shape
+    output = numpy.zeros((rows, len_n), dtype=numpy.int64)
+    for row in range(rows):
+        for i in range(length):
+            if (i // len_n) % 2 == 0:
+                output[row, i % len_n] += poly[row, i]
+            else:
+                output[row, i % len_n] -= poly[row, i]
+    return output
+
+# Number Theoretic Transform (NTT) within the negacyclic Ring Z_p[x]/(x^len_n+1)
+def is_prime(num:int) -> bool:
+    '''
+    Deterministic Miller-Rabin primality test (exact for all num < 3.3*10^24).
+    Takes as input:
+        num: the integer to be tested.
+    Returns:
+        True if num is prime and False if not.
+    '''
+    bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+    if num < 2:
+        return False
+    for base in bases:
+        if num % base == 0:
+            return num == base
+    odd, exp = num - 1, 0
+    while odd % 2 == 0:
+        odd, exp = odd // 2, exp + 1
+    for base in bases:
+        witness = pow(base, odd, num)
+        if witness in (1, num - 1):
+            continue
+        for _ in range(exp - 1):
+            witness = pow(witness, 2, num)
+            if witness == num - 1:
+                break
+        else:
+            return False
+    return True
+
+@lru_cache(maxsize=None)
+def ntt_primes(len_n:int, count:int, bits:int=NTT_PRIME_BITS) -> tuple:
+    '''
+    Finds NTT-friendly primes p = 1 mod 2*len_n, i.e. primes for which the
+    negacyclic transform of length len_n exists.
+    Takes as input:
+        len_n: the number of coefficients within the polynomials.
+        count: the number of primes to be returned.
+        bits: the upper bound for the bit size of the primes.
+    Returns:
+        A tuple of the count largest NTT-friendly primes below 2^bits in descending order.
+    '''
+    step = 2 * len_n
+    candidate = ((1 << bits) - 1) // step * step + 1
+    primes = []
+    while len(primes) < count:
+        if candidate <= step:
+            raise ValueError(f"Not enough {bits}-bit NTT primes for len_n={len_n}.")
+        if is_prime(candidate):
+            primes.append(candidate)
+        candidate -= step
+    return tuple(primes)
+
+def _check_rns_prime(len_n:int, prime:int):
+    # The Barrett/Shoup reductions and the NTT kernels assume primes below 2^NTT_PRIME_BITS
+    if prime.bit_length() > NTT_PRIME_BITS or not is_prime(prime):
+        raise ValueError(f"RNS moduli have to be primes below 2^{NTT_PRIME_BITS}, found {prime}.")
+    root_of_unity(len_n, prime) # raises ValueError for unsuitable primes
+
+def root_of_unity(len_n:int, prime:int) -> int:
+    '''
+    Finds the smallest primitive 2*len_n-th root of unity psi modulo prime
+    (i.e. psi^len_n = -1 mod prime).
+    Takes as input:
+        len_n: the number of coefficients within the polynomials (a power of two).
+        prime: an NTT-friendly prime with prime = 1 mod 2*len_n.
+    Returns:
+        The root of unity psi as an integer.
+    '''
+    if (prime - 1) % (2 * len_n) != 0:
+        raise ValueError(f"{prime} is not an NTT-friendly prime for len_n={len_n}.")
+    exponent = (prime - 1) // (2 * len_n)
+    for base in range(2, prime):
+        psi = pow(base, exponent, prime)
+        if pow(psi, len_n, prime) == prime - 1:
+            return psi
+    raise ValueError(f"No primitive {2*len_n}-th root of unity modulo {prime}.")
+
+@lru_cache(maxsize=None)
+def ntt_tables(len_n:int, primes:tuple) -> dict:
+    '''
+    Precomputes the tables of the negacyclic NTT for each of the given primes.
+    The twist by powers of psi maps the negacyclic convolution onto a cyclic one,
+    which is then evaluated by a constant geometry radix-2 transform: every stage combines
+    the two contiguous halves of the array, and the output is bit-reversed once at the end.
+    Results are cached, so repeated calls with the same parameters are free.
+    Takes as input:
+        len_n: the number of coefficients within the polynomials (a power of two).
+        primes: a tuple of NTT-friendly primes (see ntt_primes()).
+    Returns:
+        A dictionary holding the moduli, their Barrett constants, twist factors and
+        per-stage twiddles (each with Shoup quotients) and the bit-reversal permutation.
+    '''
+    if len_n < 2 or len_n & (len_n - 1):
+        raise ValueError(f"len_n={len_n} has to be a power of two.")
+    log_n = len_n.bit_length() - 1
+    bitrev = numpy.zeros(len_n, dtype=numpy.int64)
+    for bit in range(log_n):
+        bitrev |= ((numpy.arange(len_n) >> bit) & 1) << (log_n - 1 - bit)
+    psi_pows, psi_inv_pows, omega_pows, omega_inv_pows = [], [], [], []
+    for prime in primes:
+        psi = root_of_unity(len_n, prime)
+        psi_inv = pow(psi, -1, prime)
+        pows, inv_pows, val, inv_val = [], [], 1, 1
+        for _ in range(len_n):
+            pows.append(val)
+            inv_pows.append(inv_val)
+            val, inv_val = val * psi % prime, inv_val * psi_inv % prime
+        # omega = psi^2 is a primitive len_n-th root of unity, 1/len_n is folded into the twist
+        omega_pows.append(pows[:len_n:2])
+        omega_inv_pows.append(inv_pows[:len_n:2])
+        n_inv = pow(len_n, -1, prime)
+        psi_pows.append(pows)
+        psi_inv_pows.append([val * n_inv % prime for val in inv_pows])
+    omega_pows = numpy.array(omega_pows, dtype=numpy.uint64)
+    omega_inv_pows = numpy.array(omega_inv_pows, dtype=numpy.uint64)
+    moduli = numpy.array(primes, dtype=numpy.uint64)[:, None]
+    # order[k] is the index (within the bit-reversed input of a classic iterative transform)
+    # held by position k, the halves are interleaved (perfect shuffle) after every stage
+    order, half, indices = bitrev, len_n // 2, []
+    for stage_bit in range(log_n):
+        size = 2 << stage_bit
+        indices.append((order[:half] % (size // 2)) * (len_n // size))
+        order = numpy.stack((order[:half], order[half:]), axis=-1).reshape(len_n)
+    # Twiddles of shape (log_n, k, len_n/2), omega_pows[:, index] is of shape (k, len_n/2)
+    twiddles = numpy.stack([omega_pows[:, index] for index in indices])
+    twiddles_inv = numpy.stack([omega_inv_pows[:, index] for index in indices])
+    twiddles_shoup = shoup_precompute(twiddles, moduli)
+    twiddles_inv_shoup = shoup_precompute(twiddles_inv, moduli)
+    psi_pows = numpy.array(psi_pows, dtype=numpy.uint64)
+    psi_inv_pows = numpy.array(psi_inv_pows, dtype=numpy.uint64)
+    return {
+        "len_n": len_n,
+        "primes": primes,
+        "moduli": moduli,
+        "barrett": barrett_precompute(moduli),
+        "psi": psi_pows,
+        "psi_shoup": shoup_precompute(psi_pows, moduli),
+        "psi_inv": psi_inv_pows,
+        "psi_inv_shoup": shoup_precompute(psi_inv_pows, moduli),
+        "twiddles": twiddles,
+        "twiddles_shoup": twiddles_shoup,
+        "twiddles_inv": twiddles_inv,
+        "twiddles_inv_shoup": twiddles_inv_shoup,
+        "stages": list(zip(twiddles, twiddles_shoup)),
+        "stages_inv": list(zip(twiddles_inv, twiddles_inv_shoup)),
+        "bitrev": bitrev,
+    }
+
+def _ntt_butterflies(residues, moduli, stages, bitrev, out, workspace:Workspace):
+    '''Constant geometry Cooley-Tukey butterflies for residues of shape (..., k, len_n).'''
+    shape = residues.shape
+    half_shape = shape[:-1] + (shape[-1] // 2,)
+    # The input is never written to, the stages alternate between two buffers
+    buffers = [workspace.get("ntt_stage_" + str(index), shape) for index in range(2)]
+    reduced = workspace.get("ntt_reduce", shape)
+    lower = workspace.get("ntt_lower", half_shape)
+    quotient = workspace.get("ntt_quotient", half_shape)
+    for stage, (twiddle, twiddle_shoup) in enumerate(stages):
+        output = buffers[stage % 2]
+        pairs = output.reshape(half_shape + (2,))
+        upper = residues[..., :half_shape[-1]]
+        mod_mul_shoup(residues[..., half_shape[-1]:], twiddle, twiddle_shoup, moduli, out=lower,
+            scratch=quotient)
+        # sums lie within [0, 2p), subtracting p wraps around for values below p
+        numpy.add(upper, lower, out=pairs[..., 0])
+        numpy.subtract(numpy.add(upper, moduli, out=quotient), lower, out=pairs[..., 1])
+        numpy.minimum(output, numpy.subtract(output, moduli, out=reduced), out=output)
+        residues = output
+    return numpy.take(residues, bitrev, axis=-1, out=out, mode="clip")
+
+def ntt_forward(residues, tables:dict, out=None, workspace:Workspace=None):
+    '''
+    Transforms polynomials into the NTT (evaluation) domain.
+    Takes as input:
+        residues: uint64 array of shape (..., k, len_n) holding the coefficients modulo
+            each of the k primes of the tables.
+        tables: the NTT tables generated via ntt_tables().
+        out: optional contiguous uint64 output array (may alias residues).
+        workspace: optional Workspace holding the temporaries.
+    Returns:
+        The uint64 array of evaluations, where entry i holds the evaluation at psi^(2i+1).
+    '''
+    if _JIT_STATE["enabled"]:
+        return _ntt_jit(residues, tables, False, out)
+    workspace = Workspace() if workspace is None else workspace
+    moduli = tables["moduli"]
+    twisted = mod_mul_shoup(residues, tables["psi"], tables["psi_shoup"], moduli,
+        out=workspace.get("ntt_twist", residues.shape),
+        scratch=workspace.get("ntt_reduce", residues.shape))
+    return _ntt_butterflies(twisted, moduli, tables["stages"], tables["bitrev"], out, workspace)
+
+def ntt_inverse(evaluations, tables:dict, out=None, workspace:Workspace=None):
+    '''
+    Transforms polynomials from the NTT (evaluation) domain back into coefficients.
+    Takes as input:
+        evaluations: uint64 array of shape (..., k, len_n) as returned by ntt_forward().
+        tables: the NTT tables generated via ntt_tables().
+        out: optional contiguous uint64 output array (may alias evaluations).
+        workspace: optional Workspace holding the temporaries.
+    Returns:
+        The uint64 array of coefficients modulo each of the k primes.
+    '''
+    if _JIT_STATE["enabled"]:
+        return _ntt_jit(evaluations, tables, True, out)
+    workspace = Workspace() if workspace is None else workspace
+    moduli = tables["moduli"]
+    residues = _ntt_butterflies(evaluations, moduli, tables["stages_inv"], tables["bitrev"], out,
+        workspace)
+    return mod_mul_shoup(residues, tables["psi_inv"], tables["psi_inv_shoup"], moduli, out=residues,
+        scratch=workspace.get("ntt_reduce", residues.shape))
+
+def negacyclic_reduce(poly:list, len_n:int):
+    '''
+    Reduces a polynomial of arbitrary length modulo x^len_n+1 without any division.
+    As x^len_n = -1, the coefficient block j (of len_n coefficients each) is folded
+    onto the first block with sign (-1)^j, i.e. "low half minus high half" for products.
+    Shorter polynomials are padded with zeros.
+    Takes as input:
+        poly: integer coefficient array of shape (..., m).
+        len_n: the number of coefficients within the polynomial ring.
+    Returns:
+        The reduced integer coefficient array of shape (..., len_n).
+    '''
+    poly = numpy.asarray(poly)
+    if poly.dtype.kind == "f":
+        poly = numpy.int64(numpy.round(poly))
+    elif poly.dtype.kind in "biu":
+        poly = poly.astype(numpy.int64, copy=False)
+    length = poly.shape[-1]
+    if length == len_n:
+        return poly
+    if _JIT_STATE["enabled"] and poly.dtype == numpy.int64:
+        return _negacyclic_fold_jit(poly.reshape(-1, length), len_n).reshape(
+            poly.shape[:-1] + (len_n,))
+    blocks = -(-length // len_n)
+    padding = [(0, 0)] * (poly.ndim - 1) + [(0, blocks * len_n - length)]
+    poly = numpy.pad(poly, padding)
+    if blocks == 1:
+        return poly
+    poly = poly.reshape(poly.shape[:-1] + (blocks, len_n))
+    signs = numpy.where(numpy.arange(blocks) % 2 == 0, 1, -1)[:, None]
+    return (poly * signs).sum(axis=-2)
+
+def _max_abs(poly) -> int:
+    '''Returns the largest absolute coefficient of an integer array as a Python int.'''
+    if poly.size == 0:
+        return 0
+    return max(int(poly.max()), -int(poly.min()))
+
+def poly_to_residues(poly, primes:tuple):
+    '''
+    Reduces an integer polynomial modulo each of the given primes.
+    Takes as input:
+        poly: integer coefficient array (int64 or object) of shape (..., len_n).
+        primes: a tuple of primes.
+    Returns:
+        A uint64 array of shape (..., k, len_n) with the residues of poly.
+    '''
+    poly = numpy.asarray(poly)
+    if poly.dtype == object:
+        return numpy.stack([(poly % prime).astype(numpy.uint64) for prime in primes], axis=-2)
+    moduli = numpy.array(primes, dtype=numpy.int64)[:, None]
+    return (poly.astype(numpy.int64)[..., None, :] % moduli).astype(numpy.uint64)
+
+def residues_to_poly(residues, primes:tuple):
+    '''
+    Reconstructs the centered integer polynomial from its residues via the
+    Chinese Remainder Theorem (Garner's mixed-radix algorithm).
+    Takes as input:
+        residues: uint64 array of shape (..., k, len_n).
+        primes: the tuple of k primes the residues are taken modulo.
+    Returns:
+        An object array of Python integers within (-P/2, P/2], where P is the product of primes.
+    '''
+    digits = [residues[..., 0, :]]
+    for i in range(1, len(primes)):
+        prime = primes[i]
+        garner_acc = digits[-1] % numpy.uint64(prime)
+        for j in range(i - 2, -1, -1):
+            garner_acc = (garner_acc * numpy.uint64(primes[j] % prime) + digits[j]) \
+                % numpy.uint64(prime)
+        inverse = pow(math.prod(primes[:i]), -1, prime)
+        difference = (residues[..., i, :] + numpy.uint64(prime) - garner_acc) % numpy.uint64(prime)
+        digits.append(difference * numpy.uint64(inverse) % numpy.uint64(prime))
+    value = digits[-1].astype(object)
+    for j in range(len(primes) - 2, -1, -1):
+        value = value * primes[j] + digits[j].astype(object)
+    product = math.prod(primes)
+    return numpy.where(value > product // 2, value - product, value)
+
+def negacyclic_mult(poly1:list, poly2:list, len_n:int):
+    '''
+    Multiplies two integer polynomials exactly within Z[x]/(x^len_n+1) using the NTT.
+    Enough auxiliary primes are chosen so that the exact (signed) product coefficients
+    can be recovered via CRT, which brings multiplication down to O(len_n log len_n).
+    Takes as input:
+        poly1: first polynomial to take as base.
+        poly2: second polynomial to multiply with base.
+        len_n: the number of coefficients within the polynomials (a power of two).
+    Returns:
+        The exact product as an object array of Python integers.
+    '''
+    poly1, poly2 = negacyclic_reduce(poly1, len_n), negacyclic_reduce(poly2, len_n)
+    bound = 2 * len_n * _max_abs(poly1) * _max_abs(poly2) + 1
+    primes = ntt_primes(len_n, -(-bound.bit_length() // (NTT_PRIME_BITS - 1)))
+    tables = ntt_tables(len_n, primes)
+    moduli = tables["moduli"]
+    product = mod_mul(ntt_forward(poly_to_residues(poly1, primes), tables),
+        ntt_forward(poly_to_residues(poly2, primes), tables), moduli, tables["barrett"])
+    return residues_to_poly(ntt_inverse(product, tables), primes)
+
+def round_scale(poly, numer:int, denom:int):
+    '''
+    Computes round(poly * numer / denom) exactly using integer arithmetic only.
+    Takes as input:
+        poly: integer coefficient array (int64 or object).
+        numer: the numerator of the scaling factor.
+        denom: the (positive) denominator of the scaling factor.
+    Returns:
+        The scaled and rounded polynomial as an object array of Python integers.
+    '''
+    poly = numpy.asarray(poly).astype(object)
+    return (2 * numer * poly + denom) // (2 * denom)
+
+# Exact FFT Multiplication for Power-of-Two Moduli
+# For mod_q = 2^k the product modulo mod_q only depends on the low k bits, so the operands are
+# split into balanced limbs small enough for float64 FFT convolutions to round exactly, and
+# the limb products are recombined with wrapping uint64 shifts followed by a bitmask.
+@lru_cache(maxsize=None)
+def _fft_limb_params(len_n:int, bits:int) -> tuple:
+    '''
+    Returns the number of limbs and the limb bit size for operands of the given bit size.
+    The rounding error of an FFT convolution is bounded by ||x||*||y||*(12*log2(N)+8)*2^-53
+    for the folded length N=len_n/2, summing up to count limb products per output limb.
+    The smallest number of limbs keeping this bound below 1/4 is chosen.
+    '''
+    for count in range(1, bits + 1):
+        limb_bits = -(-bits // count)
+        error = count * len_n * 4.0**(limb_bits - 1) * (12 * math.log2(len_n // 2) + 8) / 2**53
+        if error < 0.25:
+            return count, limb_bits
+    raise ValueError(f"len_n={len_n} is too large for an exact float64 FFT convolution.")
+
+@lru_cache(maxsize=None)
+def _fft_twist(len_n:int):
+    '''Returns the powers of exp(i*pi/len_n) mapping x^(len_n/2) = i onto a cyclic convolution.'''
+    return numpy.exp(1j * numpy.pi * numpy.arange(len_n // 2) / len_n)
+
+def _balanced_limbs(poly, len_n:int, mod_q:int, count:int, limb_bits:int):
+    '''
+    Splits a polynomial modulo mod_q = 2^k into limbs within [-2^(limb_bits-1), 2^(limb_bits-1)).
+    Polynomials with small centered coefficients (e.g. ternary ones) are kept as a single limb.
+    '''
+    poly = numpy.asarray(negacyclic_reduce(poly, len_n) % mod_q).astype(numpy.int64)
+    centered = numpy.where(poly >= mod_q // 2, poly - mod_q, poly)
+    half = 1 << (limb_bits - 1)
+    if _max_abs(centered) < half:
+        return centered[None]
+    limbs = numpy.empty((count,) + poly.shape, dtype=numpy.int64)
+    for i in range(count):
+        digit = poly & (2 * half - 1)
+        carry = digit >= half
+        limbs[i] = digit - 2 * half * carry
+        # The carry out of the top limb is a multiple of 2^k and vanishes modulo mod_q
+        poly = (poly >> limb_bits) + carry
+    return limbs
+
+def negacyclic_mult_pow2(poly1:list, poly2:list, len_n:int, mod_q:int):
+    '''
+    Multiplies two polynomials within Z_q[x]/(x^len_n+1) for a power of two mod_q (up to 2^62)
+    using float64 FFTs over limbs of the coefficients (see _fft_limb_params()).
+    The negacyclic product is folded into a complex cyclic convolution of length len_n/2.
+    Takes as input:
+        poly1: first polynomial to take as base.
+        poly2: second polynomial to multiply with base (both may hold leading batch axes).
+        len_n: the number of coefficients within the polynomials (a power of two).
+        mod_q: the power of two modulus.
+    Returns:
+        The product modulo mod_q as an int64 array.
+    '''
+    count, limb_bits = _fft_limb_params(len_n, (mod_q - 1).bit_length())
+    half, twist = len_n // 2, _fft_twist(len_n)
+    spectra = []
+    for poly in (poly1, poly2):
+        limbs = _balanced_limbs(poly, len_n, mod_q, count, limb_bits)
+        spectra.append(numpy.fft.fft((limbs[..., :half] + 1j * limbs[..., half:]) * twist))
+    spec1, spec2 = spectra
+    result = numpy.zeros(numpy.broadcast_shapes(spec1.shape[1:], spec2.shape[1:])[:-1]
+        + (len_n,), dtype=numpy.uint64)
+    for shift in range(min(count, len(spec1) + len(spec2) - 1)):
+        # All limb products contributing to 2^(shift*limb_bits) are summed in the FFT domain
+        acc = sum(spec1[i] * spec2[shift - i] for i in range(len(spec1))
+            if 0 <= shift - i < len(spec2))
+        folded = numpy.fft.ifft(acc) * twist.conj()
+        limb = numpy.rint(numpy.concatenate((folded.real, folded.imag), axis=-1))
+        result += limb.astype(numpy.int64).astype(numpy.uint64) << numpy.uint64(shift * limb_bits)
+    return (result & numpy.uint64(mod_q - 1)).astype(numpy.int64)
 
 # Operations for Polynomials within Polynomial Ring R_q
-def add_polys(poly1:list, poly2:list, mod_q:int, poly_mod:int) -> list:
+def add_polys(poly1:list, poly2:list, mod_q:int, poly_mod:int, out=None) -> list:
     '''
     Adds two polynomials together.
     Takes as input:
@@ -12,11 +683,17 @@ def add_polys(poly1:list, poly2:list, mod_q:int, poly_mod:int) -> list:
         poly2: second polynomial to add to base.
         mod_q: the ciphertext modulus.
         poly_mod: the polynomial modulus (given as x^len_n+1).
+        out: optional int64 output array (may alias poly1), requires mod_q below 2^62.
     Returns:
         The sum as a polynomial within the polynomial ring R_q.
     '''
-    poly_sum = polynomial.polydiv(polynomial.polyadd(poly1, poly2) % mod_q, poly_mod)[1] % mod_q
-    return numpy.int64(numpy.round(poly_sum))
+    len_n = len(poly_mod) - 1
+    if out is not None:
+        numpy.add(negacyclic_reduce(poly1, len_n), negacyclic_reduce(poly2, len_n), out=out,
+            casting="unsafe")
+        return numpy.remainder(out, mod_q, out=out)
+    poly_sum = (negacyclic_reduce(poly1, len_n) + negacyclic_reduce(poly2, len_n)) % mod_q
+    return poly_sum.astype(numpy.int64)
 
 
 def mult_polys(poly1:list, poly2:list, mod_q:int, poly_mod:int) -> list:
@@ -30,8 +707,10 @@ def mult_polys(poly1:list, poly2:list, mod_q:int, poly_mod:int) -> list:
     Returns:
         The product as a polynomial within the polynomial ring R_q.
     '''
-    product = polynomial.polydiv(polynomial.polymul(poly1, poly2) % mod_q, poly_mod)[1] % mod_q
-    return numpy.int64(numpy.round(product))
+    if mod_q & (mod_q - 1) == 0 and mod_q <= 2**62:
+        return negacyclic_mult_pow2(poly1, poly2, len(poly_mod) - 1, mod_q)
+    product = negacyclic_mult(poly1, poly2, len(poly_mod) - 1) % mod_q
+    return product.astype(numpy.int64)
 
 
 # Operations for Polynomials mod poly_mod only
@@ -45,12 +724,14 @@ def add_mod_poly(poly1:list, poly2:list, poly_mod:int) -> list:
     Returns:
         The sum as a polynomial within the polynomial ring without applying mod_q.
     '''
-    summed = polynomial.polydiv(polynomial.polyadd(poly1, poly2), poly_mod)
-    return summed[1]
+    len_n = len(poly_mod) - 1
+    summed = negacyclic_reduce(poly1, len_n) + negacyclic_reduce(poly2, len_n)
+    return summed
 
 def mult_mod_poly(poly1:list, poly2:list, poly_mod:int) -> list:
     '''
     Multiply two polynomials without applying modulus mod_q (mod poly_mod only).
+    The product is computed exactly via the NTT, hence it is returned as Python integers.
     Takes as input:
         poly1: first polynomial to take as base.
         poly2: second polynomial to multiply with base.
@@ -58,7 +739,7 @@ def mult_mod_poly(poly1:list, poly2:list, poly_mod:int) -> list:
     Returns:
         The product as a polynomial within the polynomial ring without applying mod_q.
     '''
-    product = polynomial.polydiv(polynomial.polymul(poly1, poly2), poly_mod)[1]
+    product = negacyclic_mult(poly1, poly2, len(poly_mod) - 1)
     return product
 
 
@@ -68,7 +749,8 @@ def ternary_poly_gen(len_n:int) -> list:
     Generates a ternary polynomial with coefficients being either {-1, 0, 1}.
     Takes as input:
         len_n: the number of coefficients within the polynomial
-           (the degree of the polynomial amounts to len_n+1).
+           (the degree of the polynomial amounts to len_n+1), or a shape
+           tuple (k, len_n) to sample k polynomials at once.
     Returns:
         A coefficient array, where array[i] denotes the polynomial coefficient at position i.
     '''
@@ -81,7 +763,8 @@ def uni_poly_gen(len_n:int, mod_q:int) -> list:
     i.e. is part of the polynomial ring R_q.
     Takes as input:
         len_n: the number of coefficients within the polynomial
-           (the degree of the polynomial amounts to len_n+1).
+           (the degree of the polynomial amounts to len_n+1), or a shape
+           tuple (k, len_n) to sample k polynomials at once.
         mod_q: the modulus for the given polynomial ring.
     Returns:
         A coefficient array, where array[i] denotes the polynomial coefficient at position i.
@@ -96,7 +779,8 @@ def gauss_poly_gen(len_n:int, std_dev:float) -> list:
     transform the normal distribution to a discrete one (discretization).
     Takes as input:
         len_n: the number of coefficients within the polynomial
-           (the degree of the polynomial amounts to len_n+1).
+           (the degree of the polynomial amounts to len_n+1), or a shape
+           tuple (k, len_n) to sample k polynomials at once.
         std_dev: the standard deviation to be used for discretization.
     Returns:
         A coefficient array, where array[i] denotes the polynomial coefficient at position i.
@@ -104,8 +788,29 @@ def gauss_poly_gen(len_n:int, std_dev:float) -> list:
     array = numpy.int64(numpy.random.normal(0, std_dev, size=len_n))
     return array
 
+def seeded_uni_poly_gen(seed:bytes, len_n:int, mod_q:int) -> list:
+    '''
+    Expands a short seed into a polynomial with coefficients uniform within Z_q using the
+    SHAKE-128 extendable-output function and rejection sampling. The expansion is
+    deterministic, so only the seed needs to be stored or transmitted.
+    Takes as input:
+        seed: the seed as bytes (see SEED_BYTES).
+        len_n: the number of coefficients within the polynomial.
+        mod_q: the modulus for the given polynomial ring (below 2^63).
+    Returns:
+        A coefficient array, where array[i] denotes the polynomial coefficient at position i.
+    '''
+    mask = numpy.uint64((1 << (mod_q - 1).bit_length()) - 1)
+    count = len_n + len_n // 2 + 16
+    while True:
+        words = numpy.frombuffer(hashlib.shake_128(seed).digest(8 * count), dtype="<u8") & mask
+        accepted = words[words < mod_q]
+        if len(accepted) >= len_n:
+            return accepted[:len_n].astype(numpy.int64)
+        count *= 2
+
 # Generate Private and Public Key Pair #
-def key_pair_gen(len_n:int, mod_q:int, poly_mod:int, std_dev:float):
+def key_pair_gen(len_n:int, mod_q:int, poly_mod:int, std_dev:float, seeded:bool=False):
     '''
     Generates the private/public key pair to be used for the HE process.
     Takes as input:
@@ -113,24 +818,109 @@ def key_pair_gen(len_n:int, mod_q:int, poly_mod:int, std_dev:float):
         mod_q: the ciphertext modulus.
         poly_mod: the polynomial modulus (given as x^len_n+1).
         std_dev: the standard deviation to be used for the error distribution.
+        seeded: if True, poly_a is derived from a seed, which replaces pub_key_2 and
+            halves the size of the public key (see expand_key()).
     Returns:
         priv_key, pub_key
     '''
     priv_key = ternary_poly_gen(len_n)
-    poly_a = uni_poly_gen(len_n, mod_q)
+    seed = os.urandom(SEED_BYTES) if seeded else None
+    poly_a = uni_poly_gen(len_n, mod_q) if seed is None else seeded_uni_poly_gen(seed, len_n, mod_q)
     poly_e = gauss_poly_gen(len_n,std_dev)
     pub_key_1 = add_polys(mult_polys(-poly_a, priv_key, mod_q, poly_mod), -poly_e, mod_q, poly_mod)
-    pub_key_2 = poly_a
+    pub_key_2 = poly_a if seed is None else seed
     pub_key = (pub_key_1, pub_key_2)
     return priv_key, pub_key
 
+# Plaintext Encoding
+def encode_message(mess, len_n:int, mod_t:int):
+    '''
+    Encodes a plaintext into a polynomial within R_t.
+    Takes as input:
+        mess: plaintext integer message (encoded as the constant coefficient) or a
+            plaintext polynomial given as coefficient array (e.g. from BatchEncoder.encode()).
+        len_n: the number of coefficients within the polynomial.
+        mod_t: the modulus used for plaintext (as per BFV).
+    Returns:
+        The encoded plaintext as an int64 coefficient array with values in Z_t.
+    '''
+    if numpy.ndim(mess) == 0:
+        return numpy.array([mess] +[0]*(len_n-1)) % mod_t
+    return negacyclic_reduce(mess, len_n) % mod_t
+
+def encode_messages(messages, len_n:int, mod_t:int):
+    '''
+    Encodes several plaintexts at once (see encode_message()).
+    Takes as input:
+        messages: a 1-D array of k integer messages or a 2-D array of k plaintext polynomials.
+        len_n: the number of coefficients within the polynomials.
+        mod_t: the modulus used for plaintext (as per BFV).
+    Returns:
+        The encoded plaintexts as an int64 array of shape (k, len_n) with values in Z_t.
+    '''
+    messages = numpy.asarray(messages)
+    if messages.ndim == 1:
+        encoded_m = numpy.zeros((len(messages), len_n), dtype=numpy.int64)
+        encoded_m[:, 0] = messages % mod_t
+        return encoded_m
+    return negacyclic_reduce(messages, len_n) % mod_t
+
+class BatchEncoder:
+    '''
+    SIMD slot batching encoder packing up to len_n integers into one plaintext polynomial.
+    Requires a prime plaintext modulus mod_t = 1 mod 2*len_n, so that x^len_n+1 splits
+    into linear factors modulo mod_t and R_t is isomorphic to len_n copies of Z_t (CRT).
+    Additions and multiplications of ciphertexts then act slot-wise on the packed values.
+    The slots are arranged as a 2 x len_n/2 matrix, where slot j (j < len_n/2) of the first
+    row holds the evaluation at psi^(3^j) and slot j of the second row at psi^(-3^j).
+    '''
+    def __init__(self, len_n:int, mod_t:int):
+        if not is_prime(mod_t) or (mod_t - 1) % (2 * len_n) != 0:
+            raise ValueError(f"Batching requires a prime mod_t = 1 mod {2*len_n}.")
+        if mod_t.bit_length() > NTT_PRIME_BITS: # slots are computed with the uint64 NTT kernels
+            raise ValueError(f"Batching requires mod_t below 2^{NTT_PRIME_BITS}.")
+        self.len_n = len_n
+        self.mod_t = mod_t
+        self.tables = ntt_tables(len_n, (mod_t,))
+        exponents = [pow(3, j, 2 * len_n) for j in range(len_n // 2)]
+        exponents += [2 * len_n - exponent for exponent in exponents]
+        # ntt_forward() returns the evaluation at psi^(2i+1) at index i
+        self.slot_index = (numpy.array(exponents) - 1) // 2
+
+    def encode(self, values:list):
+        '''
+        Packs a vector of integers into a plaintext polynomial.
+        Takes as input:
+            values: up to len_n integers, remaining slots are set to 0.
+        Returns:
+            The plaintext polynomial as int64 coefficient array with values in Z_t.
+        '''
+        values = numpy.asarray(values, dtype=numpy.int64)
+        if values.shape[-1] > self.len_n:
+            raise ValueError(f"Cannot pack more than {self.len_n} values into one plaintext.")
+        evaluations = numpy.zeros(self.len_n, dtype=numpy.uint64)
+        evaluations[self.slot_index[:values.shape[-1]]] = values % self.mod_t
+        return ntt_inverse(evaluations[None, :], self.tables)[0].astype(numpy.int64)
+
+    def decode(self, poly:list):
+        '''
+        Unpacks the slot values of a plaintext polynomial.
+        Takes as input:
+            poly: the plaintext polynomial (e.g. as returned by decrypt_poly()).
+        Returns:
+            An int64 array of len_n slot values within Z_t.
+        '''
+        residues = poly_to_residues(negacyclic_reduce(poly, self.len_n), (self.mod_t,))
+        return ntt_forward(residues, self.tables)[0][self.slot_index].astype(numpy.int64)
+
+
 # Encryption
 def encrypt_message(mess:int, pub_key:tuple, len_n:int, mod_q:int, mod_t:int,
     poly_mod:int, std_dev:float) -> tuple:
     '''
     Encrypt a given integer message mess using the given public key.
     Takes as input:
-        mess: plaintext integer message.
+        mess: plaintext integer message or plaintext polynomial (see encode_message()).
         pub_key: public key generated via key_pair_gen().
         mod_q: the modulus used for ciphertext (as per BFV).
         mod_t: the modulus used for plaintext (as per BFV).
@@ -138,7 +928,8 @@ def encrypt_message(mess:int, pub_key:tuple, len_n:int, mod_q:int, mod_t:int,
     Returns:
         The encrypted ciphertext polynomial C=(C1,C2) as a tuple containing two arrays.
     '''
-    encoded_m = numpy.array([mess] +[0]*(len_n-1)) % mod_t
+    pub_key = expand_key(pub_key, len_n, mod_q)
+    encoded_m = encode_message(mess, len_n, mod_t)
     moduli_quotient = mod_q//mod_t
     scale = moduli_quotient * encoded_m
     u_poly = ternary_poly_gen(len_n)
@@ -156,6 +947,74 @@ def encrypt_message(mess:int, pub_key:tuple, len_n:int, mod_q:int, mod_t:int,
     )
     return (c_1, c_2)
 
+def encrypt_many(messages, pub_key:tuple, len_n:int, mod_q:int, mod_t:int,
+    poly_mod:int, std_dev:float):
+    '''
+    Encrypts many messages at once, where sampling, multiplication and reduction are
+    performed as single vectorized operations across the whole batch.
+    Takes as input:
+        messages: a 1-D array of k integer messages or a 2-D array of k plaintext polynomials.
+        pub_key: public key generated via key_pair_gen().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_t: the modulus used for plaintext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        std_dev: the standard deviation to be used for the error distribution.
+    Returns:
+        The ciphertexts stacked as an int64 array of shape (k, 2, len_n).
+    '''
+    pub_key = expand_key(pub_key, len_n, mod_q)
+    encoded_m = encode_messages(messages, len_n, mod_t)
+    scale = (mod_q//mod_t) * encoded_m
+    shape = encoded_m.shape
+    u_poly = ternary_poly_gen(shape)
+    c_1 = add_polys(add_polys(mult_polys(pub_key[0], u_poly, mod_q, poly_mod),
+        gauss_poly_gen(shape, std_dev), mod_q, poly_mod), scale, mod_q, poly_mod)
+    c_2 = add_polys(mult_polys(pub_key[1], u_poly, mod_q, poly_mod),
+        gauss_poly_gen(shape, std_dev), mod_q, poly_mod)
+    return numpy.stack((c_1, c_2), axis=1)
+
+def encrypt_message_symmetric(mess:int, priv_key:list, len_n:int, mod_q:int, mod_t:int,
+    poly_mod:int, std_dev:float) -> tuple:
+    '''
+    Encrypt a given message using the private/secret key, where c2 is a uniformly random
+    polynomial expanded from a fresh seed. The ciphertext is sent as (c1, seed), which is
+    roughly half the size of a public key ciphertext and needs one ring multiplication only.
+    Takes as input:
+        mess: plaintext integer message or plaintext polynomial (see encode_message()).
+        priv_key: private key generated via key_pair_gen().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_t: the modulus used for plaintext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        std_dev: the standard deviation to be used for the error distribution.
+    Returns:
+        The compressed ciphertext (C1, seed), see expand_cipher().
+    '''
+    scale = (mod_q//mod_t) * encode_message(mess, len_n, mod_t)
+    seed = os.urandom(SEED_BYTES)
+    poly_a = seeded_uni_poly_gen(seed, len_n, mod_q)
+    c_1 = add_polys(
+            add_polys(
+                mult_polys(-poly_a, priv_key, mod_q, poly_mod),
+                gauss_poly_gen(len_n, std_dev), mod_q, poly_mod),
+            scale, mod_q, poly_mod
+    )
+    return (c_1, seed)
+
+def expand_cipher(cipher:tuple, len_n:int, mod_q:int) -> tuple:
+    '''
+    Expands a seeded ciphertext (c1, seed) into the full ciphertext (c1, c2).
+    Full ciphertexts are returned unchanged.
+    Takes as input:
+        cipher: ciphertext tuple containing c1 and either c2 or the seed of c2.
+        len_n: the length of the polynomials.
+        mod_q: the modulus used for ciphertext (as per BFV).
+    Returns:
+        The ciphertext C=(C1,C2) as a tuple containing two arrays.
+    '''
+    if isinstance(cipher[1], bytes):
+        return (cipher[0], seeded_uni_poly_gen(cipher[1], len_n, mod_q))
+    return cipher
+
 
 # Decryption
 def decrypt_cipher(cipher:tuple, priv_key:list, mod_q:int, mod_t:int, poly_mod:int) -> int:
@@ -170,14 +1029,82 @@ def decrypt_cipher(cipher:tuple, priv_key:list, mod_q:int, mod_t:int, poly_mod:i
     Returns:
         The decrypted ciphertext polynomial as an integer.
     '''
+    decrypted_res = numpy.int64(decrypt_coeffs(cipher, priv_key, mod_q, mod_t, [0])[0])
+    return decrypted_res
+
+def _negacyclic_rows(priv_key:list, indices:list, len_n:int):
+    '''
+    Returns the rows of the negacyclic matrix of priv_key for the given coefficient indices,
+    i.e. coefficient j of poly*priv_key is the signed dot product of poly with row j.
+    '''
+    positions = numpy.arange(len_n)
+    indices = numpy.asarray(indices)[:, None]
+    rows = numpy.asarray(priv_key, dtype=numpy.int64)[(indices - positions) % len_n]
+    return rows * numpy.where(positions <= indices, 1, -1)
+
+def decrypt_coeffs(cipher:tuple, priv_key:list, mod_q:int, mod_t:int, indices:list):
+    '''
+    Decrypts only the requested plaintext coefficients. Every coefficient of c2*sk is
+    computed as a single signed dot product in O(len_n) instead of a full ring product.
+    The values are split into 32-bit halves so that the dot products cannot overflow int64.
+    Takes as input:
+        cipher: ciphertext tuple containing c1 and c2 (or stacked arrays of shape (k, len_n)).
+        priv_key: private key generated via key_pair_gen().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_t: the modulus used for plaintext (as per BFV).
+        indices: the indices of the plaintext coefficients to decrypt.
+    Returns:
+        The decrypted coefficients as int64 array of shape (..., len(indices)).
+    '''
+    c_2 = numpy.asarray(cipher[1], dtype=numpy.int64) % mod_q
+    rows = _negacyclic_rows(priv_key, indices, c_2.shape[-1]).T
+    product = ((c_2 >> 32) @ rows).astype(object) * 2**32 \
+        + ((c_2 & 0xFFFFFFFF) @ rows).astype(object)
+    scaled_m = (product + numpy.asarray(cipher[0])[..., indices].astype(object)) % mod_q
+    return (round_scale(scaled_m, mod_t, mod_q) % mod_t).astype(numpy.int64)
+
+def decrypt_poly(cipher:tuple, priv_key:list, mod_q:int, mod_t:int, poly_mod:int):
+    '''
+    Decrypt a given ciphertext into the full plaintext polynomial (e.g. for batching).
+    Takes as input:
+        cipher: ciphertext tuple containing c1 and c2.
+        priv_key: private key generated via key_pair_gen().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_t: the modulus used for plaintext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+    Returns:
+        The decrypted plaintext polynomial as int64 coefficient array.
+    '''
     scaled_m = add_polys(mult_polys(cipher[1], priv_key, mod_q, poly_mod),
                 cipher[0], mod_q, poly_mod)
-    decrypted_res = numpy.int64((numpy.round(mod_t * scaled_m / mod_q) % mod_t)[0])
-    return decrypted_res
+    return (round_scale(scaled_m, mod_t, mod_q) % mod_t).astype(numpy.int64)
+
+def decrypt_many(ciphers, priv_key:list, mod_q:int, mod_t:int, poly_mod:int,
+    full:bool=False):
+    '''
+    Decrypts many ciphertexts at once using vectorized operations across the batch.
+    By default only the constant coefficient (the integer message) is decrypted.
+    Takes as input:
+        ciphers: the ciphertexts stacked as an array of shape (k, 2, len_n)
+            (see encrypt_many()).
+        priv_key: private key generated via key_pair_gen().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_t: the modulus used for plaintext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        full: if True, the full plaintext polynomials are decrypted (e.g. for batches
+            of plaintext polynomials).
+    Returns:
+        The decrypted messages as an int64 array of length k, or the plaintext
+        polynomials as an int64 array of shape (k, len_n) if full is set.
+    '''
+    ciphers = numpy.asarray(ciphers)
+    if full:
+        return decrypt_poly((ciphers[:, 0], ciphers[:, 1]), priv_key, mod_q, mod_t, poly_mod)
+    return decrypt_coeffs((ciphers[:, 0], ciphers[:, 1]), priv_key, mod_q, mod_t, [0])[:, 0]
 
 
 #Evaluation
-def eval_add(c_1:tuple, c_2:tuple, mod_q:int, poly_mod:int) -> tuple:
+def eval_add(c_1:tuple, c_2:tuple, mod_q:int, poly_mod:int, out:tuple=None) -> tuple:
     '''
     Adds two ciphertexts and returns the sum as a ciphertext.
     Takes as input:
@@ -185,20 +1112,109 @@ def eval_add(c_1:tuple, c_2:tuple, mod_q:int, poly_mod:int) -> tuple:
         c2: second ciphertext to add to base.
         mod_q: the ciphertext modulus.
         poly_mod: the polynomial modulus (given as x^len_n+1).
+        out: optional ciphertext receiving the sum (e.g. c_1 to accumulate in place).
     Returns:
         The encrypted ciphertext c_sum=(c_sum1,c_sum2) as a tuple containing two arrays.
+        Unrelinearized three-component ciphertexts (see eval_tensor()) are added
+        component-wise in the same way.
+    '''
+    out = (None,) * len(c_1) if out is None else out
+    return tuple(add_polys(comp_1, comp_2, mod_q, poly_mod, comp_out)
+        for comp_1, comp_2, comp_out in zip(c_1, c_2, out))
+
+def eval_tensor(c_1:tuple, c_2:tuple, mod_q:int, mod_t:int, poly_mod:int) -> tuple:
+    '''
+    Multiplies two ciphertexts without relinearization. The resulting three-component
+    ciphertext can be added to other products via eval_add() and has to be
+    relinearized once via relinearize() before decryption.
+    Takes as input:
+        c_1: first ciphertext to take as base.
+        c_2: second ciphertext to multiply with base.
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_t: the modulus used for plaintext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+    Returns:
+        The degree 2 ciphertext c_prod=(c_prod1, c_prod2, c_prod3) as a tuple of three arrays.
+    '''
+    c_prod1 = (round_scale(mult_mod_poly(c_1[0], c_2[0], poly_mod), mod_t, mod_q)
+        % mod_q).astype(numpy.int64)
+    c_prod2 = (round_scale(add_mod_poly(
+                mult_mod_poly(c_1[0], c_2[1], poly_mod),
+                mult_mod_poly(c_1[1], c_2[0], poly_mod), poly_mod),
+            mod_t, mod_q) % mod_q).astype(numpy.int64)
+    c_prod3 = (round_scale(mult_mod_poly(c_1[1], c_2[1], poly_mod), mod_t, mod_q)
+        % mod_q).astype(numpy.int64)
+    return (c_prod1, c_prod2, c_prod3)
+
+def relinearize(cipher:tuple, mod_q:int, mod_p:int, poly_mod:int, rlk:tuple) -> tuple:
+    '''
+    Reduces a three-component ciphertext to a regular two-component ciphertext.
+    Employs the concept of modulus switching to reduce generated noise.
+    Takes as input:
+        cipher: the degree 2 ciphertext generated via eval_tensor().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_p: an extra integer mod_p to generate the masked version modulo mod_p*mod_q.
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        rlk: the relinearization key rlk, base decomposition keys generated via
+            rlk_gen_decomp() are passed on to relinearize_decomp().
+    Returns:
+        The relinearized ciphertext as a tuple containing two arrays.
+    '''
+    if isinstance(rlk, dict):
+        return relinearize_decomp(cipher, mod_q, rlk)
+    rlk = expand_key(rlk, len(poly_mod) - 1, mod_q * mod_p)
+    c_prod1, c_prod2, c_prod3 = cipher
+    # Calculate the approximation for c_prod3 * sk^2 mod mod_q
+    c_prod2_0 = (round_scale(mult_mod_poly(c_prod3, rlk[0], poly_mod), 1, mod_p)
+        % mod_q).astype(numpy.int64)
+    c_prod2_1 = (round_scale(mult_mod_poly(c_prod3, rlk[1], poly_mod), 1, mod_p)
+        % mod_q).astype(numpy.int64)
+    # Calculate new_c_prod using the approximation
+    new_c_prod1 = numpy.int64(add_mod_poly(c_prod1, c_prod2_0, poly_mod)) % mod_q
+    new_c_prod2 = numpy.int64(add_mod_poly(c_prod2, c_prod2_1, poly_mod)) % mod_q
+    return (new_c_prod1, new_c_prod2)
+
+def relinearize_decomp(cipher:tuple, mod_q:int, rlk:dict) -> tuple:
+    '''
+    Follows relinearization variant 1 within BFV: c_prod3 is decomposed into its base 2^b
+    digits, which are multiplied with the key components stored in NTT form. All arithmetic
+    is exact, the digits of all components are transformed at once and the products are
+    accumulated within the NTT domain, so only two inverse transforms are required.
+    Takes as input:
+        cipher: the degree 2 ciphertext generated via eval_tensor().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        rlk: the relinearization key generated via rlk_gen_decomp().
+    Returns:
+        The relinearized ciphertext as a tuple containing two arrays.
     '''
-    c_sum1 = add_polys(c_1[0], c_2[0], mod_q, poly_mod)
-    c_sum2 = add_polys(c_1[1], c_2[1], mod_q, poly_mod)
-    return (c_sum1, c_sum2)
+    c_prod1, c_prod2, c_prod3 = cipher
+    len_n = len(c_prod3)
+    rlk = expand_key(rlk, len_n, mod_q)
+    primes = rlk["primes"]
+    tables = ntt_tables(len_n, primes)
+    moduli = tables["moduli"]
+    base_bits, count = rlk["base_bits"], len(rlk["key_1"])
+    shifts = numpy.arange(count, dtype=numpy.uint64)[:, None] * numpy.uint64(base_bits)
+    digits = (numpy.asarray(c_prod3).astype(numpy.uint64) >> shifts) \
+        & numpy.uint64((1 << base_bits) - 1)
+    # Digits lie below 2^base_bits <= 2^30, so they are their own residues modulo every prime
+    digits = ntt_forward(numpy.broadcast_to(digits[:, None, :], (count, len(primes), len_n)),
+        tables)
+    result = []
+    for comp, key_part in zip((c_prod1, c_prod2), (rlk["key_1"], rlk["key_2"])):
+        # Every product is below 2^62 after reduction, hence the sum over digits cannot overflow
+        acc = mod_mul(digits, key_part, moduli, tables["barrett"]).sum(axis=0) % moduli
+        switched = residues_to_poly(ntt_inverse(acc, tables), primes)
+        result.append(((switched + numpy.asarray(comp).astype(object)) % mod_q)
+            .astype(numpy.int64))
+    return tuple(result)
 
 def eval_mult(c_1:tuple, c_2:tuple, mod_q:int, mod_t:int, mod_p:int,
     poly_mod:int, rlk:tuple) -> tuple:
     '''
     Multiplies two ciphertexts and returns the product as a ciphertext.
     Utilises the rlk key to reduce the result from a degree 2 polynomial
-    to a degree 1 polynomial.
-    Employs the concept of modulus switching to reduce generated noise.
+    to a degree 1 polynomial (see eval_tensor() and relinearize()).
     Takes as input:
         c1: first ciphertext to take as base.
         c2: second ciphertext to add to base.
@@ -211,44 +1227,2530 @@ def eval_mult(c_1:tuple, c_2:tuple, mod_q:int, mod_t:int, mod_p:int,
         The encrypted ciphertext new_c_prod=(new_c_prod1, new_c_prod2)
         as a tuple containing two arrays.
     '''
-    # Calculate degree 2 polynomial c_prod = (c_prod1, c_prod2, c_prod3)
-    c_prod1 = numpy.int64(numpy.round(mult_mod_poly(c_1[0],c_2[0],poly_mod) * mod_t / mod_q))%mod_q
-    c_prod2 = numpy.int64(numpy.round(add_mod_poly(
-                mult_mod_poly(c_1[0], c_2[1], poly_mod),
-                mult_mod_poly(c_1[1], c_2[0], poly_mod), poly_mod)
-            * mod_t / mod_q)) % mod_q
-    c_prod3 = numpy.int64(numpy.round(mult_mod_poly(c_1[1],c_2[1],poly_mod) * mod_t / mod_q))%mod_q
-    # Calculate the approximation for c_prod3 * sk^2 mod mod_q
-    c_prod2_0 = numpy.int64(numpy.round(mult_mod_poly(c_prod3, rlk[0], poly_mod) / mod_p)) % mod_q
-    c_prod2_1 = numpy.int64(numpy.round(mult_mod_poly(c_prod3, rlk[1], poly_mod) / mod_p)) % mod_q
-    # Calculate new_c_prod using the approximation
-    new_c_prod1 = numpy.int64(add_mod_poly(c_prod1, c_prod2_0, poly_mod)) % mod_q
-    new_c_prod2 = numpy.int64(add_mod_poly(c_prod2, c_prod2_1, poly_mod)) % mod_q
-    return (new_c_prod1, new_c_prod2)
+    return relinearize(eval_tensor(c_1, c_2, mod_q, mod_t, poly_mod), mod_q, mod_p, poly_mod, rlk)
 
-# Generate Relinearisation Key rlk
-def rlk_gen(len_n:int, mod_q:int, mod_p:int, poly_mod:int, priv_key:list, std_dev2:float) -> tuple:
+def _product_tree(ciphers:list, mult, workers:int) -> tuple:
     '''
-    Follows relinearization variant 2 within BFV.
-    Utilises an approach that incorporates the concept of modulus switching
-    to approximate c_prod3 * sk^2 mod mod_q.
+    Multiplies ciphertexts level by level within a balanced binary tree, so that
+    k ciphertexts only consume a multiplicative depth of ceil(log2(k)).
+    The independent multiplications of a level are spread over worker processes.
+    '''
+    ciphers = list(ciphers)
+    if not ciphers:
+        raise ValueError("Cannot multiply an empty list of ciphertexts.")
+    executor = ProcessPoolExecutor(workers) if workers > 1 and len(ciphers) > 2 else None
+    try:
+        while len(ciphers) > 1:
+            left, right = ciphers[0::2], ciphers[1::2]
+            carry = [left.pop()] if len(left) > len(right) else []
+            products = executor.map(mult, left, right) if executor else map(mult, left, right)
+            ciphers = list(products) + carry
+    finally:
+        if executor:
+            executor.shutdown()
+    return ciphers[0]
+
+def eval_product(ciphers:list, mod_q:int, mod_t:int, mod_p:int, poly_mod:int, rlk:tuple,
+    workers:int=1) -> tuple:
+    '''
+    Multiplies many ciphertexts using a balanced product tree of depth ceil(log2(k))
+    instead of the depth k-1 of sequential eval_mult() calls.
     Takes as input:
-        len_n: the length of the polynomials to be used.
+        ciphers: the list of k ciphertexts to multiply.
         mod_q: the modulus used for ciphertext (as per BFV).
-        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        mod_t: the modulus used for plaintext (as per BFV).
+        mod_p: an extra integer mod_p to generate the masked version modulo mod_p*mod_q.
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        rlk: the relinearization key rlk.
+        workers: the number of worker processes multiplying independent subtrees.
+    Returns:
+        The encrypted product as a tuple containing two arrays.
+    '''
+    rlk = expand_key(rlk, len(poly_mod) - 1, mod_q * mod_p)
+    mult = partial(eval_mult, mod_q=mod_q, mod_t=mod_t, mod_p=mod_p, poly_mod=poly_mod, rlk=rlk)
+    return _product_tree(ciphers, mult, workers)
+
+def eval_add_plain(cipher:tuple, mess, mod_q:int, mod_t:int, poly_mod:int) -> tuple:
+    '''
+    Adds a public plaintext to a ciphertext without encrypting the plaintext first.
+    Takes as input:
+        cipher: the ciphertext to take as base.
+        mess: plaintext integer message or plaintext polynomial to add.
+        mod_q: the ciphertext modulus.
+        mod_t: the plaintext modulus.
+        poly_mod: the polynomial modulus (given as x^len_n+1).
+    Returns:
+        The encrypted sum as a tuple containing two arrays.
+    '''
+    encoded_m = encode_message(mess, len(poly_mod) - 1, mod_t)
+    return (add_polys(cipher[0], (mod_q//mod_t) * encoded_m, mod_q, poly_mod), *cipher[1:])
+
+def eval_mult_plain(cipher:tuple, mess, mod_q:int, mod_t:int, poly_mod:int) -> tuple:
+    '''
+    Multiplies a ciphertext by a public plaintext. No tensoring or relinearization
+    is required, integer messages are applied as scalar without any polynomial product.
+    The plaintext is centered within (-mod_t/2, mod_t/2] to keep the noise growth small.
+    Takes as input:
+        cipher: the ciphertext to take as base.
+        mess: plaintext integer message or plaintext polynomial to multiply with base.
+        mod_q: the ciphertext modulus.
+        mod_t: the plaintext modulus.
+        poly_mod: the polynomial modulus (given as x^len_n+1).
+    Returns:
+        The encrypted product as a tuple containing two arrays.
+    '''
+    encoded_m = encode_message(mess, len(poly_mod) - 1, mod_t)
+    encoded_m = numpy.where(encoded_m > mod_t//2, encoded_m - mod_t, encoded_m)
+    if numpy.ndim(mess) == 0:
+        scalar = int(encoded_m[0])
+        return tuple((numpy.asarray(comp).astype(object) * scalar % mod_q).astype(numpy.int64)
+            for comp in cipher)
+    return tuple(mult_polys(comp, encoded_m, mod_q, poly_mod) for comp in cipher)
+
+def mod_switch(cipher:tuple, mod_q:int, new_q:int) -> tuple:
+    '''
+    Switches a ciphertext to the (smaller) modulus new_q by scaling every component
+    with new_q/mod_q and rounding. The ciphertext still decrypts under the same private key
+    (using new_q as ciphertext modulus), as long as the remaining noise fits into new_q.
+    Takes as input:
+        cipher: the ciphertext to switch.
+        mod_q: the current ciphertext modulus.
+        new_q: the new ciphertext modulus.
+    Returns:
+        The ciphertext modulo new_q as a tuple of int64 arrays.
+    '''
+    return tuple((round_scale(comp, new_q, mod_q) % new_q).astype(numpy.int64) for comp in cipher)
+
+# Generate Relinearisation Key rlk
+def rlk_gen(len_n:int, mod_q:int, mod_p:int, poly_mod:int, priv_key:list, std_dev2:float,
+    seeded:bool=False) -> tuple:
+    '''
+    Follows relinearization variant 2 within BFV.
+    Utilises an approach that incorporates the concept of modulus switching
+    to approximate c_prod3 * sk^2 mod mod_q.
+    Takes as input:
+        len_n: the length of the polynomials to be used.
+        mod_q: the modulus used for ciphertext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
         priv_key: private key generated via key_pair_gen().
         mod_p: an extra integer mod_p to generate the masked version modulo mod_p*mod_q.
         std_dev2: the standard deviation to be used for the error distribution X'.
+        seeded: if True, poly_a is derived from a seed, which replaces rlk2 (see expand_key()).
     Returns:
         Relinearization key rlk as tuple containing (rlk1, rlk2).
     '''
+    return _switch_key_gen(len_n, mod_q, mod_p, poly_mod, priv_key,
+        mult_mod_poly(priv_key, priv_key, poly_mod), std_dev2, seeded)
+
+def _switch_key_gen(len_n:int, mod_q:int, mod_p:int, poly_mod:int, priv_key:list, target:list,
+    std_dev2:float, seeded:bool) -> tuple:
+    '''Generates a key switching key from target (e.g. sk^2 for rlk_gen()) to priv_key.'''
     mod_switch = mod_q*mod_p
-    poly_a = uni_poly_gen(len_n, mod_switch)
+    seed = os.urandom(SEED_BYTES) if seeded else None
+    poly_a = uni_poly_gen(len_n, mod_switch) if seed is None \
+        else seeded_uni_poly_gen(seed, len_n, mod_switch)
     poly_e = gauss_poly_gen(len_n, std_dev2)
-    masked_secret = mod_p*polynomial.polymul(priv_key, priv_key)
-    rlk_1 = numpy.int64(add_mod_poly(
+    masked_secret = mod_p*numpy.asarray(target).astype(object)
+    key_1 = (add_mod_poly(
             mult_mod_poly(-poly_a, priv_key, poly_mod),
             add_mod_poly(-poly_e, masked_secret, poly_mod), poly_mod)
-        ) % mod_switch
-    rlk_2 = poly_a
-    return (rlk_1, rlk_2)
+        % mod_switch).astype(numpy.int64)
+    key_2 = poly_a if seed is None else seed
+    return (key_1, key_2)
+
+def rlk_gen_decomp(len_n:int, mod_q:int, poly_mod:int, priv_key:list, std_dev2:float,
+    base_bits:int=16, seeded:bool=False) -> dict:
+    '''
+    Follows relinearization variant 1 within BFV (base decomposition, see relinearize_decomp()).
+    For every base 2^base_bits digit of mod_q, a masked version of base^i * sk^2 is generated.
+    The key components are stored in NTT form modulo auxiliary primes, which makes the key
+    larger than the variant 2 key but requires neither mod_p nor any rounding.
+    Takes as input:
+        len_n: the length of the polynomials to be used.
+        mod_q: the modulus used for ciphertext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        priv_key: private key generated via key_pair_gen().
+        std_dev2: the standard deviation to be used for the error distribution X'.
+        base_bits: the bit size b of the decomposition base 2^b (between 1 and 30).
+            Smaller bases add less noise but require more key components.
+        seeded: if True, the uniform parts of the key are replaced by a seed.
+    Returns:
+        Relinearization key rlk as dict holding base_bits, mod_q, the auxiliary primes
+        and the NTT form components key_1 and key_2 of shape (digits, primes, len_n).
+    '''
+    return _switch_key_gen_decomp(len_n, mod_q, poly_mod, priv_key,
+        mult_mod_poly(priv_key, priv_key, poly_mod), std_dev2, base_bits, seeded)
+
+def _decomp_primes(len_n:int, mod_q:int, base_bits:int) -> tuple:
+    '''Returns the auxiliary NTT primes bounding the exact products of relinearize_decomp().'''
+    count = -(-(mod_q - 1).bit_length() // base_bits)
+    bound = 2 * count * len_n * (1 << base_bits) * mod_q + 1
+    return ntt_primes(len_n, -(-bound.bit_length() // (NTT_PRIME_BITS - 1)))
+
+def _decomp_uni_polys(seed:bytes, count:int, len_n:int, mod_q:int):
+    '''Expands the uniform polynomials of a base decomposition key, one per digit.'''
+    if seed is None:
+        return uni_poly_gen((count, len_n), mod_q)
+    return numpy.array([seeded_uni_poly_gen(seed + i.to_bytes(2, "little"), len_n, mod_q)
+        for i in range(count)])
+
+def _switch_key_gen_decomp(len_n:int, mod_q:int, poly_mod:int, priv_key:list, target:list,
+    std_dev2:float, base_bits:int, seeded:bool) -> dict:
+    '''Generates a base decomposition key switching key from target to priv_key.'''
+    if not 1 <= base_bits <= NTT_PRIME_BITS - 1:
+        raise ValueError(f"base_bits has to be between 1 and {NTT_PRIME_BITS - 1}.")
+    count = -(-(mod_q - 1).bit_length() // base_bits)
+    primes = _decomp_primes(len_n, mod_q, base_bits)
+    tables = ntt_tables(len_n, primes)
+    seed = os.urandom(SEED_BYTES) if seeded else None
+    polys_a = _decomp_uni_polys(seed, count, len_n, mod_q)
+    target = numpy.asarray(target).astype(object)
+    key_1 = numpy.array([(add_mod_poly(
+            mult_mod_poly(-polys_a[i], priv_key, poly_mod),
+            add_mod_poly(-gauss_poly_gen(len_n, std_dev2), (1 << (base_bits*i)) * target,
+                poly_mod), poly_mod)
+        % mod_q).astype(numpy.int64) for i in range(count)])
+    return {
+        "base_bits": base_bits,
+        "mod_q": mod_q,
+        "primes": primes,
+        "key_1": ntt_forward(poly_to_residues(key_1, primes), tables),
+        "key_2": ntt_forward(poly_to_residues(polys_a, primes), tables) if seed is None else seed,
+    }
+
+# Key Storage
+def expand_key(key:tuple, len_n:int, mod_q:int) -> tuple:
+    '''
+    Expands a seeded public or relinearization key (key_1, seed) into the full key.
+    Full keys are returned unchanged.
+    Takes as input:
+        key: the key tuple generated via key_pair_gen() or rlk_gen(),
+            or the key dict generated via rlk_gen_decomp().
+        len_n: the length of the polynomials.
+        mod_q: the modulus of the key (mod_q*mod_p for relinearization keys,
+            ignored for base decomposition keys which carry their modulus).
+    Returns:
+        The full key as a tuple containing two arrays (or as dict respectively).
+    '''
+    if isinstance(key, dict):
+        if not isinstance(key["key_2"], bytes):
+            return key
+        primes = key["primes"]
+        polys_a = _decomp_uni_polys(key["key_2"], len(key["key_1"]), len_n, key["mod_q"])
+        return dict(key, key_2=ntt_forward(poly_to_residues(polys_a, primes),
+            ntt_tables(len_n, primes)))
+    return expand_cipher(key, len_n, mod_q)
+
+def save_key(path:str, key):
+    '''
+    Saves a (full or seeded) key as compressed .npz file.
+    Takes as input:
+        path: the file path of the .npz file.
+        key: the key to be saved.
+    '''
+    if isinstance(key, dict):
+        key_2 = key["key_2"]
+        numpy.savez_compressed(path, base_bits=key["base_bits"],
+            mod_q=numpy.array(key["mod_q"], dtype=numpy.uint64),
+            primes=numpy.array(key["primes"], dtype=numpy.uint64), key_1=key["key_1"],
+            key_2=numpy.frombuffer(key_2, dtype=numpy.uint8) if isinstance(key_2, bytes) else key_2,
+            seeded=isinstance(key_2, bytes))
+    elif isinstance(key, tuple) and isinstance(key[1], bytes):
+        numpy.savez_compressed(path, key[0], numpy.frombuffer(key[1], dtype=numpy.uint8))
+    else:
+        numpy.savez_compressed(path, key)
+
+def load_key(path:str):
+    '''
+    Loads a (full or seeded) key saved via save_key() or numpy.savez_compressed().
+    Takes as input:
+        path: the file path of the .npz file.
+    Returns:
+        The key, where seeded keys are returned as tuple (key_1, seed)
+        and base decomposition keys as dict (see rlk_gen_decomp()).
+    '''
+    with numpy.load(path) as stored:
+        if "base_bits" in stored.files:
+            key_2 = stored["key_2"]
+            return {
+                "base_bits": int(stored["base_bits"]),
+                "mod_q": int(stored["mod_q"]),
+                "primes": tuple(int(prime) for prime in stored["primes"]),
+                "key_1": stored["key_1"],
+                "key_2": key_2.tobytes() if stored["seeded"] else key_2,
+            }
+        if "arr_1" in stored.files:
+            return (stored["arr_0"], stored["arr_1"].tobytes())
+        return stored["arr_0"]
+
+
+# Galois Automorphisms (Slot Rotations)
+# The automorphism x -> x^k (k odd) permutes the batching slots (see BatchEncoder):
+# k = 3^r rotates both rows of slots by r to the left, k = 2*len_n-1 swaps the two rows.
+def rotation_galois_elt(steps:int, len_n:int) -> int:
+    '''
+    Returns the Galois element rotating both rows of slots by steps to the left.
+    Takes as input:
+        steps: the number of slots to rotate by (negative values rotate to the right).
+        len_n: the length of the polynomials.
+    Returns:
+        The Galois element 3^steps mod 2*len_n.
+    '''
+    return pow(3, steps % (len_n // 2), 2 * len_n)
+
+def sum_slots_galois_elts(len_n:int) -> list:
+    '''
+    Returns the Galois elements required by eval_sum_slots(), i.e. the rotations by
+    powers of two and the row swap.
+    Takes as input:
+        len_n: the length of the polynomials.
+    Returns:
+        The list of log2(len_n) Galois elements.
+    '''
+    elts = [rotation_galois_elt(2**i, len_n) for i in range((len_n // 2).bit_length() - 1)]
+    return elts + [2 * len_n - 1]
+
+def apply_galois(poly, galois_elt:int):
+    '''
+    Applies the automorphism x -> x^galois_elt to a polynomial within Z[x]/(x^len_n+1).
+    Takes as input:
+        poly: integer coefficient array of shape (..., len_n).
+        galois_elt: the odd Galois element.
+    Returns:
+        The permuted polynomial (x^i is mapped to +/- x^(i*galois_elt mod len_n)).
+    '''
+    poly = numpy.asarray(poly)
+    len_n = poly.shape[-1]
+    index = numpy.arange(len_n) * galois_elt % (2 * len_n)
+    result = numpy.empty_like(poly)
+    result[..., index % len_n] = numpy.where(index >= len_n, -poly, poly)
+    return result
+
+def galois_key_gen(len_n:int, mod_q:int, mod_p:int, poly_mod:int, priv_key:list, std_dev2:float,
+    galois_elts:list=None, seeded:bool=False, base_bits:int=None) -> dict:
+    '''
+    Generates the Galois keys, switching the automorphed private key sk(x^k) back to sk(x),
+    in the same way as rlk_gen() does for sk^2.
+    Takes as input:
+        len_n: the length of the polynomials to be used.
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_p: an extra integer mod_p to generate the masked version modulo mod_p*mod_q.
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        priv_key: private key generated via key_pair_gen().
+        std_dev2: the standard deviation to be used for the error distribution X'.
+        galois_elts: the Galois elements to generate keys for
+            (defaults to sum_slots_galois_elts()).
+        seeded: if True, the uniform parts of the keys are replaced by their seeds.
+        base_bits: if given, base decomposition keys (see rlk_gen_decomp()) are generated
+            instead and mod_p is ignored.
+    Returns:
+        A dict mapping each Galois element to its key (key1, key2).
+    '''
+    if galois_elts is None:
+        galois_elts = sum_slots_galois_elts(len_n)
+    if base_bits is not None:
+        return {elt: _switch_key_gen_decomp(len_n, mod_q, poly_mod, priv_key,
+            apply_galois(priv_key, elt), std_dev2, base_bits, seeded) for elt in galois_elts}
+    return {elt: _switch_key_gen(len_n, mod_q, mod_p, poly_mod, priv_key,
+        apply_galois(priv_key, elt), std_dev2, seeded) for elt in galois_elts}
+
+def eval_galois(cipher:tuple, galois_elt:int, mod_q:int, mod_p:int, poly_mod:int,
+    galois_keys:dict) -> tuple:
+    '''
+    Applies the automorphism x -> x^galois_elt to the plaintext of a ciphertext.
+    Takes as input:
+        cipher: the ciphertext to take as base.
+        galois_elt: the odd Galois element.
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_p: the extra modulus used by the Galois keys.
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        galois_keys: the Galois keys generated via galois_key_gen().
+    Returns:
+        The ciphertext of the automorphed plaintext.
+    '''
+    if galois_elt not in galois_keys:
+        raise ValueError(f"No Galois key available for the element {galois_elt}.")
+    c_1, c_2 = (apply_galois(comp, galois_elt) for comp in cipher)
+    # The automorphed ciphertext decrypts under sk(x^k), which is switched back like sk^2
+    return relinearize((c_1 % mod_q, numpy.zeros_like(c_2), c_2 % mod_q), mod_q, mod_p, poly_mod,
+        galois_keys[galois_elt])
+
+def eval_rotate(cipher:tuple, steps:int, mod_q:int, mod_p:int, poly_mod:int,
+    galois_keys:dict) -> tuple:
+    '''
+    Rotates both rows of batching slots by steps to the left (see BatchEncoder).
+    Takes as input:
+        cipher: the ciphertext to rotate.
+        steps: the number of slots to rotate by (negative values rotate to the right).
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_p: the extra modulus used by the Galois keys.
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        galois_keys: the Galois keys generated via galois_key_gen().
+    Returns:
+        The rotated ciphertext.
+    '''
+    elt = rotation_galois_elt(steps, len(poly_mod) - 1)
+    return eval_galois(cipher, elt, mod_q, mod_p, poly_mod, galois_keys)
+
+def eval_sum_slots(cipher:tuple, mod_q:int, mod_p:int, poly_mod:int, galois_keys:dict) -> tuple:
+    '''
+    Sums all batching slots with log2(len_n) rotations, so that every slot holds the total.
+    Takes as input:
+        cipher: the ciphertext to sum up.
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_p: the extra modulus used by the Galois keys.
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+        galois_keys: the Galois keys for sum_slots_galois_elts().
+    Returns:
+        The ciphertext holding the sum of all slots in each slot.
+    '''
+    for elt in sum_slots_galois_elts(len(poly_mod) - 1):
+        cipher = eval_add(cipher, eval_galois(cipher, elt, mod_q, mod_p, poly_mod, galois_keys),
+            mod_q, poly_mod)
+    return cipher
+
+
+# Residue Number System (RNS) Representation
+# Within the RNS backend the ciphertext modulus is the product Q of NTT-friendly primes
+# and every polynomial in R_Q is stored as a uint64 array of shape (k, len_n) holding
+# its residues modulo each of the k primes. All ring arithmetic is exact and per-limb,
+# CRT reconstruction is only performed where needed (scaling and serialization).
+def rns_moduli_gen(len_n:int, count:int) -> tuple:
+    '''
+    Generates the RNS basis for the ciphertext modulus Q.
+    Takes as input:
+        len_n: the number of coefficients within the polynomials.
+        count: the number of primes (limbs), Q amounts to roughly 2^(31*count).
+    Returns:
+        A tuple of NTT-friendly primes whose product is the ciphertext modulus Q.
+    '''
+    return ntt_primes(len_n, count)
+
+def rns_special_moduli(len_n:int, primes:tuple, count:int=None) -> tuple:
+    '''
+    Determines the special primes P used by the RNS key switching keys. The relinearization
+    noise shrinks with P/Q, by default P is chosen larger than Q, select_parameters() uses
+    the fewest special primes the NoiseEstimator accepts instead.
+    Takes as input:
+        len_n: the number of coefficients within the polynomials.
+        primes: the RNS basis of the ciphertext modulus Q.
+        count: the number of special primes (defaults to len(primes)+1).
+    Returns:
+        A tuple of count NTT-friendly primes that are not part of primes.
+    '''
+    count = len(primes) + 1 if count is None else count
+    candidates = ntt_primes(len_n, len(primes) + count)
+    return tuple(prime for prime in candidates if prime not in primes)[:count]
+
+def _special_basis(len_n:int, primes:tuple, special_primes:tuple) -> tuple:
+    '''Returns the special primes P, defaulting to rns_special_moduli().'''
+    return rns_special_moduli(len_n, primes) if special_primes is None else tuple(special_primes)
+
+def rns_add_polys(poly1, poly2, primes:tuple, out=None, workspace:Workspace=None):
+    '''
+    Adds two polynomials given in RNS form.
+    Takes as input:
+        poly1: first polynomial to take as base (uint64 array of shape (..., k, len_n)).
+        poly2: second polynomial to add to base.
+        primes: the RNS basis.
+        out: optional output array (may alias poly1 for in-place accumulation).
+        workspace: optional Workspace holding the temporaries.
+    Returns:
+        The sum as an RNS polynomial.
+    '''
+    shape = numpy.broadcast_shapes(numpy.shape(poly1), numpy.shape(poly2))
+    return mod_add(poly1, poly2, numpy.array(primes, dtype=numpy.uint64)[:, None], out=out,
+        scratch=_scratch(workspace, "rns_add", shape))
+
+def rns_neg_poly(poly, primes:tuple, out=None, workspace:Workspace=None):
+    '''
+    Negates a polynomial given in RNS form.
+    Takes as input:
+        poly: the RNS polynomial to negate.
+        primes: the RNS basis.
+        out: optional output array (may alias poly).
+        workspace: optional Workspace holding the temporaries.
+    Returns:
+        The negated RNS polynomial.
+    '''
+    return mod_sub(numpy.uint64(0), poly, numpy.array(primes, dtype=numpy.uint64)[:, None],
+        out=out, scratch=_scratch(workspace, "rns_neg", numpy.shape(poly)))
+
+def rns_mult_scalar(poly, scalar:int, primes:tuple, out=None, workspace:Workspace=None):
+    '''
+    Multiplies a polynomial given in RNS form by an integer constant
+    using Shoup's precomputed quotients (see mod_mul_shoup()).
+    Takes as input:
+        poly: the RNS polynomial to take as base.
+        scalar: the integer constant.
+        primes: the RNS basis.
+        out: optional output array (may alias poly).
+        workspace: optional Workspace holding the temporaries.
+    Returns:
+        The product as an RNS polynomial.
+    '''
+    moduli = numpy.array(primes, dtype=numpy.uint64)[:, None]
+    residues = numpy.array([scalar % prime for prime in primes], dtype=numpy.uint64)[:, None]
+    return mod_mul_shoup(poly, residues, shoup_precompute(residues, moduli), moduli, out=out,
+        scratch=_scratch(workspace, "rns_scalar", numpy.shape(poly)))
+
+def rns_mult_polys(poly1, poly2, primes:tuple, out=None, workspace:Workspace=None):
+    '''
+    Multiplies two polynomials given in RNS form using a per-limb NTT.
+    Takes as input:
+        poly1: first polynomial to take as base (uint64 array of shape (..., k, len_n)).
+        poly2: second polynomial to multiply with base.
+        primes: the RNS basis.
+        out: optional contiguous output array (may alias poly1 or poly2).
+        workspace: optional Workspace holding the transformed operands and temporaries.
+    Returns:
+        The product as an RNS polynomial.
+    '''
+    tables = ntt_tables(poly1.shape[-1], primes)
+    if workspace is None:
+        product = mod_mul(ntt_forward(poly1, tables), ntt_forward(poly2, tables),
+            tables["moduli"], tables["barrett"])
+        return ntt_inverse(product, tables, out)
+    shape = numpy.broadcast_shapes(poly1.shape, poly2.shape)
+    evals1 = ntt_forward(poly1, tables, workspace.get("rns_mult_1", poly1.shape), workspace)
+    evals2 = ntt_forward(poly2, tables, workspace.get("rns_mult_2", poly2.shape), workspace)
+    product = mod_mul(evals1, evals2, tables["moduli"], tables["barrett"],
+        out=workspace.get("rns_mult_product", shape),
+        scratch=workspace.get("rns_mult_quotient", shape))
+    return ntt_inverse(product, tables, out, workspace)
+
+@lru_cache(maxsize=None)
+def _base_conversion_tables(from_primes:tuple, to_primes:tuple) -> tuple:
+    '''Precomputes the constants of rns_base_convert().'''
+    product = math.prod(from_primes)
+    from_moduli = numpy.array(from_primes, dtype=numpy.uint64)[:, None]
+    hat_inv = numpy.array([pow(product // prime, -1, prime) for prime in from_primes],
+        dtype=numpy.uint64)[:, None]
+    hat_mod = numpy.array([[product // prime % other for other in to_primes]
+        for prime in from_primes], dtype=numpy.uint64)[:, :, None]
+    product_mod = numpy.array([product % other for other in to_primes], dtype=numpy.int64)[:, None]
+    return (from_moduli, hat_inv, shoup_precompute(hat_inv, from_moduli), hat_mod, product_mod,
+        1.0 / from_moduli.astype(numpy.float64))
+
+def rns_base_convert(poly, from_primes:tuple, to_primes:tuple):
+    '''
+    Converts an RNS polynomial to another RNS basis limb by limb, without CRT reconstruction.
+    With P the product of from_primes and y_i = [x_i*(P/p_i)^-1]_{p_i}, the centered
+    representative of x is sum_i y_i*(P/p_i) - v*P, where v = round(sum_i y_i/p_i) is
+    computed in floating point (exact unless x lies within about k*2^-52*P of P/2).
+    Takes as input:
+        poly: uint64 array of shape (..., k, len_n) holding the residues modulo from_primes.
+        from_primes: the current RNS basis.
+        to_primes: the target RNS basis.
+    Returns:
+        The uint64 array of residues of the centered representative modulo to_primes.
+    '''
+    from_moduli, hat_inv, hat_inv_shoup, hat_mod, product_mod, inverses = \
+        _base_conversion_tables(tuple(from_primes), tuple(to_primes))
+    to_moduli = numpy.array(to_primes, dtype=numpy.uint64)[:, None]
+    scaled = mod_mul_shoup(poly, hat_inv, hat_inv_shoup, from_moduli)
+    overflow = numpy.rint((scaled * inverses).sum(axis=-2)).astype(numpy.int64)
+    result = numpy.zeros(poly.shape[:-2] + (len(to_primes), poly.shape[-1]), dtype=numpy.uint64)
+    for i in range(len(from_primes)):
+        # Each term is below 2^31, k terms cannot overflow
+        result += scaled[..., i:i + 1, :] * hat_mod[i] % to_moduli
+    centered = result.astype(numpy.int64) - overflow[..., None, :] * product_mod
+    return (centered % to_moduli.astype(numpy.int64)).astype(numpy.uint64)
+
+def rns_uni_poly_gen(len_n:int, primes:tuple):
+    '''
+    Generates a uniformly random polynomial within R_Q directly in RNS form
+    (independent uniform residues are uniform modulo Q by the CRT).
+    Takes as input:
+        len_n: the number of coefficients within the polynomial.
+        primes: the RNS basis.
+    Returns:
+        A uint64 array of shape (k, len_n).
+    '''
+    moduli = numpy.array(primes, dtype=numpy.int64)[:, None]
+    return numpy.random.randint(0, moduli, (len(primes), len_n)).astype(numpy.uint64)
+
+def key_pair_gen_rns(len_n:int, primes:tuple, std_dev:float, seeded:bool=False):
+    '''
+    Generates the private/public key pair for the RNS backend.
+    Takes as input:
+        len_n: the length of polynomials to be used as priv/pub keys.
+        primes: the RNS basis of the ciphertext modulus Q (see rns_moduli_gen()).
+        std_dev: the standard deviation to be used for the error distribution.
+        seeded: if True, poly_a is derived from a seed, which replaces pub_key_2.
+    Returns:
+        priv_key, pub_key (priv_key as small integer array, pub_key as RNS polynomials)
+    '''
+    priv_key = ternary_poly_gen(len_n)
+    seed = os.urandom(SEED_BYTES) if seeded else None
+    poly_a = rns_uni_poly_gen(len_n, primes) if seed is None \
+        else seeded_rns_uni_poly_gen(seed, len_n, primes)
+    poly_e = poly_to_residues(gauss_poly_gen(len_n, std_dev), primes)
+    pub_key_1 = rns_neg_poly(rns_add_polys(
+        rns_mult_polys(poly_a, poly_to_residues(priv_key, primes), primes), poly_e, primes), primes)
+    pub_key_2 = poly_a if seed is None else seed
+    return priv_key, (pub_key_1, pub_key_2)
+
+def encrypt_message_rns(mess:int, pub_key:tuple, len_n:int, primes:tuple, mod_t:int,
+    std_dev:float, workspace:Workspace=None) -> tuple:
+    '''
+    Encrypt a given integer message mess using the given RNS public key.
+    Takes as input:
+        mess: plaintext integer message or plaintext polynomial (see encode_message()).
+        pub_key: public key generated via key_pair_gen_rns().
+        len_n: the length of the polynomials.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+        std_dev: the standard deviation to be used for the error distribution.
+        workspace: optional Workspace holding the temporaries (see BFVContext).
+    Returns:
+        The encrypted ciphertext C=(C1,C2) as a tuple containing two RNS polynomials.
+    '''
+    pub_key = expand_cipher_rns(pub_key, len_n, primes)
+    encoded_m = encode_message(mess, len_n, mod_t)
+    scale = poly_to_residues(encoded_m, primes)
+    rns_mult_scalar(scale, math.prod(primes) // mod_t, primes, out=scale, workspace=workspace)
+    u_poly = poly_to_residues(ternary_poly_gen(len_n), primes)
+    error1_poly = poly_to_residues(gauss_poly_gen(len_n, std_dev), primes)
+    error2_poly = poly_to_residues(gauss_poly_gen(len_n, std_dev), primes)
+    # Only the two ciphertext components are allocated, all sums are accumulated in place
+    c_1 = rns_mult_polys(pub_key[0], u_poly, primes, workspace=workspace)
+    rns_add_polys(c_1, error1_poly, primes, out=c_1, workspace=workspace)
+    rns_add_polys(c_1, scale, primes, out=c_1, workspace=workspace)
+    c_2 = rns_mult_polys(pub_key[1], u_poly, primes, workspace=workspace)
+    rns_add_polys(c_2, error2_poly, primes, out=c_2, workspace=workspace)
+    return (c_1, c_2)
+
+def decrypt_cipher_rns(cipher:tuple, priv_key:list, primes:tuple, mod_t:int) -> int:
+    '''
+    Decrypt a given RNS ciphertext using the passed private/secret key.
+    The CRT reconstruction is only done for the scaling step.
+    Takes as input:
+        cipher: RNS ciphertext tuple containing c1 and c2.
+        priv_key: private key generated via key_pair_gen_rns().
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+    Returns:
+        The decrypted ciphertext polynomial as an integer.
+    '''
+    decrypted_res = numpy.int64(decrypt_coeffs_rns(cipher, priv_key, primes, mod_t, [0])[0])
+    return decrypted_res
+
+def decrypt_coeffs_rns(cipher:tuple, priv_key:list, primes:tuple, mod_t:int, indices:list):
+    '''
+    Decrypts only the requested plaintext coefficients of an RNS ciphertext via per-limb
+    signed dot products (see decrypt_coeffs()). Residues are below 2^31, so the
+    dot products fit into int64 without splitting.
+    Takes as input:
+        cipher: RNS ciphertext tuple containing c1 and c2 (or stacked arrays).
+        priv_key: private key generated via key_pair_gen_rns().
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+        indices: the indices of the plaintext coefficients to decrypt.
+    Returns:
+        The decrypted coefficients as int64 array of shape (..., len(indices)).
+    '''
+    c_2 = numpy.asarray(cipher[1]).astype(numpy.int64)
+    rows = _negacyclic_rows(priv_key, indices, c_2.shape[-1]).T
+    moduli = numpy.array(primes, dtype=numpy.int64)[:, None]
+    scaled_m = (c_2 @ rows % moduli + numpy.asarray(cipher[0])[..., indices].astype(numpy.int64)) \
+        % moduli
+    scaled_m = residues_to_poly(scaled_m.astype(numpy.uint64), primes)
+    return (round_scale(scaled_m, mod_t, math.prod(primes)) % mod_t).astype(numpy.int64)
+
+def decrypt_poly_rns(cipher:tuple, priv_key:list, primes:tuple, mod_t:int):
+    '''
+    Decrypt a given RNS ciphertext into the full plaintext polynomial (e.g. for batching).
+    Takes as input:
+        cipher: RNS ciphertext tuple containing c1 and c2.
+        priv_key: private key generated via key_pair_gen_rns().
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+    Returns:
+        The decrypted plaintext polynomial as int64 coefficient array.
+    '''
+    scaled_m = rns_add_polys(rns_mult_polys(cipher[1], poly_to_residues(priv_key, primes), primes),
+        cipher[0], primes)
+    scaled_m = residues_to_poly(scaled_m, primes)
+    return (round_scale(scaled_m, mod_t, math.prod(primes)) % mod_t).astype(numpy.int64)
+
+def encrypt_many_rns(messages, pub_key:tuple, len_n:int, primes:tuple, mod_t:int,
+    std_dev:float):
+    '''
+    Encrypts many messages at once using the RNS public key (see encrypt_many()).
+    Takes as input:
+        messages: a 1-D array of k integer messages or a 2-D array of k plaintext polynomials.
+        pub_key: public key generated via key_pair_gen_rns().
+        len_n: the length of the polynomials.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+        std_dev: the standard deviation to be used for the error distribution.
+    Returns:
+        The RNS ciphertexts stacked as a uint64 array of shape (k, 2, len(primes), len_n).
+    '''
+    pub_key = expand_cipher_rns(pub_key, len_n, primes)
+    encoded_m = encode_messages(messages, len_n, mod_t)
+    shape = encoded_m.shape
+    scale = rns_mult_scalar(poly_to_residues(encoded_m, primes), math.prod(primes) // mod_t, primes)
+    u_poly = poly_to_residues(ternary_poly_gen(shape), primes)
+    error1_poly = poly_to_residues(gauss_poly_gen(shape, std_dev), primes)
+    error2_poly = poly_to_residues(gauss_poly_gen(shape, std_dev), primes)
+    c_1 = rns_add_polys(rns_add_polys(
+        rns_mult_polys(u_poly, pub_key[0], primes), error1_poly, primes), scale, primes)
+    c_2 = rns_add_polys(rns_mult_polys(u_poly, pub_key[1], primes), error2_poly, primes)
+    return numpy.stack((c_1, c_2), axis=1)
+
+def decrypt_many_rns(ciphers, priv_key:list, primes:tuple, mod_t:int, full:bool=False):
+    '''
+    Decrypts many RNS ciphertexts at once (see decrypt_many()).
+    Takes as input:
+        ciphers: the RNS ciphertexts stacked as an array of shape (k, 2, len(primes), len_n).
+        priv_key: private key generated via key_pair_gen_rns().
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+        full: if True, the full plaintext polynomials are decrypted.
+    Returns:
+        The decrypted messages as an int64 array of length k, or the plaintext
+        polynomials as an int64 array of shape (k, len_n) if full is set.
+    '''
+    ciphers = numpy.asarray(ciphers)
+    if full:
+        return decrypt_poly_rns((ciphers[:, 0], ciphers[:, 1]), priv_key, primes, mod_t)
+    return decrypt_coeffs_rns((ciphers[:, 0], ciphers[:, 1]), priv_key, primes, mod_t, [0])[:, 0]
+
+def seeded_rns_uni_poly_gen(seed:bytes, len_n:int, primes:tuple):
+    '''
+    Expands a short seed into a uniformly random polynomial within R_Q in RNS form,
+    where each limb is expanded separately (see seeded_uni_poly_gen()).
+    Takes as input:
+        seed: the seed as bytes (see SEED_BYTES).
+        len_n: the number of coefficients within the polynomial.
+        primes: the RNS basis.
+    Returns:
+        A uint64 array of shape (k, len_n).
+    '''
+    return numpy.stack([seeded_uni_poly_gen(seed + index.to_bytes(2, "little"), len_n, prime)
+        for index, prime in enumerate(primes)]).astype(numpy.uint64)
+
+def encrypt_message_symmetric_rns(mess:int, priv_key:list, len_n:int, primes:tuple,
+    mod_t:int, std_dev:float) -> tuple:
+    '''
+    Encrypt a given message using the private/secret key for the RNS backend
+    (see encrypt_message_symmetric()).
+    Takes as input:
+        mess: plaintext integer message or plaintext polynomial (see encode_message()).
+        priv_key: private key generated via key_pair_gen_rns().
+        len_n: the length of the polynomials.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+        std_dev: the standard deviation to be used for the error distribution.
+    Returns:
+        The compressed RNS ciphertext (C1, seed), see expand_cipher_rns().
+    '''
+    scale = rns_mult_scalar(poly_to_residues(encode_message(mess, len_n, mod_t), primes),
+        math.prod(primes) // mod_t, primes)
+    seed = os.urandom(SEED_BYTES)
+    poly_a = seeded_rns_uni_poly_gen(seed, len_n, primes)
+    error_poly = poly_to_residues(gauss_poly_gen(len_n, std_dev), primes)
+    c_1 = rns_add_polys(rns_add_polys(rns_neg_poly(
+        rns_mult_polys(poly_a, poly_to_residues(priv_key, primes), primes), primes),
+        error_poly, primes), scale, primes)
+    return (c_1, seed)
+
+def expand_cipher_rns(cipher:tuple, len_n:int, primes:tuple) -> tuple:
+    '''
+    Expands a seeded RNS ciphertext (c1, seed) into the full ciphertext (c1, c2).
+    Full ciphertexts are returned unchanged.
+    Takes as input:
+        cipher: RNS ciphertext tuple containing c1 and either c2 or the seed of c2.
+        len_n: the length of the polynomials.
+        primes: the RNS basis of the ciphertext modulus Q.
+    Returns:
+        The RNS ciphertext C=(C1,C2).
+    '''
+    if isinstance(cipher[1], bytes):
+        return (cipher[0], seeded_rns_uni_poly_gen(cipher[1], len_n, primes))
+    return cipher
+
+def eval_add_rns(c_1:tuple, c_2:tuple, primes:tuple, out:tuple=None,
+    workspace:Workspace=None) -> tuple:
+    '''
+    Adds two RNS ciphertexts and returns the sum as an RNS ciphertext.
+    Takes as input:
+        c_1: first ciphertext to take as base.
+        c_2: second ciphertext to add to base.
+        primes: the RNS basis of the ciphertext modulus Q.
+        out: optional ciphertext receiving the sum (e.g. c_1 to accumulate in place).
+        workspace: optional Workspace holding the temporaries.
+    Returns:
+        The encrypted ciphertext c_sum=(c_sum1,c_sum2) as a tuple containing two RNS polynomials.
+    '''
+    out = (None,) * len(c_1) if out is None else out
+    return tuple(rns_add_polys(comp_1, comp_2, primes, comp_out, workspace)
+        for comp_1, comp_2, comp_out in zip(c_1, c_2, out))
+
+def eval_add_plain_rns(cipher:tuple, mess, primes:tuple, mod_t:int) -> tuple:
+    '''
+    Adds a public plaintext to an RNS ciphertext (see eval_add_plain()).
+    Takes as input:
+        cipher: the RNS ciphertext to take as base.
+        mess: plaintext integer message or plaintext polynomial to add.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the plaintext modulus.
+    Returns:
+        The encrypted sum as a tuple containing two RNS polynomials.
+    '''
+    encoded_m = encode_message(mess, cipher[0].shape[-1], mod_t)
+    scaled_m = poly_to_residues((math.prod(primes)//mod_t) * encoded_m.astype(object), primes)
+    return (rns_add_polys(cipher[0], scaled_m, primes), *cipher[1:])
+
+def eval_mult_plain_rns(cipher:tuple, mess, primes:tuple, mod_t:int) -> tuple:
+    '''
+    Multiplies an RNS ciphertext by a public plaintext (see eval_mult_plain()).
+    Takes as input:
+        cipher: the RNS ciphertext to take as base.
+        mess: plaintext integer message or plaintext polynomial to multiply with base.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the plaintext modulus.
+    Returns:
+        The encrypted product as a tuple containing two RNS polynomials.
+    '''
+    encoded_m = encode_message(mess, cipher[0].shape[-1], mod_t)
+    encoded_m = numpy.where(encoded_m > mod_t//2, encoded_m - mod_t, encoded_m)
+    if numpy.ndim(mess) == 0:
+        return tuple(rns_mult_scalar(comp, int(encoded_m[0]), primes) for comp in cipher)
+    residues = poly_to_residues(encoded_m, primes)
+    return tuple(rns_mult_polys(comp, residues, primes) for comp in cipher)
+
+def rlk_gen_rns(len_n:int, primes:tuple, priv_key:list, std_dev2:float,
+    seeded:bool=False, special_primes:tuple=None) -> tuple:
+    '''
+    Follows relinearization variant 2 within BFV for the RNS backend, where the
+    extra modulus mod_p is the product P of the special primes (see rns_special_moduli()).
+    Takes as input:
+        len_n: the length of the polynomials to be used.
+        primes: the RNS basis of the ciphertext modulus Q.
+        priv_key: private key generated via key_pair_gen_rns().
+        std_dev2: the standard deviation to be used for the error distribution X'.
+        seeded: if True, poly_a is derived from a seed, which replaces rlk2.
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        Relinearization key rlk as tuple containing (rlk1, rlk2) in RNS form modulo P*Q,
+        given within the NTT domain (seeds expand directly into the NTT form of rlk2).
+    '''
+    return _switch_key_gen_rns(len_n, primes, priv_key, negacyclic_mult(priv_key, priv_key, len_n),
+        std_dev2, seeded, _special_basis(len_n, primes, special_primes))
+
+def _switch_key_gen_rns(len_n:int, primes:tuple, priv_key:list, target:list, std_dev2:float,
+    seeded:bool, special:tuple) -> tuple:
+    '''
+    Generates an RNS key switching key from target (e.g. sk^2) to priv_key modulo P*Q
+    within the NTT domain of the extended basis P*Q.
+    '''
+    ext_primes = primes + special
+    priv_rns = poly_to_residues(priv_key, ext_primes)
+    seed = os.urandom(SEED_BYTES) if seeded else None
+    poly_a = rns_uni_poly_gen(len_n, ext_primes) if seed is None \
+        else seeded_rns_uni_poly_gen(seed, len_n, ext_primes)
+    poly_e = poly_to_residues(gauss_poly_gen(len_n, std_dev2), ext_primes)
+    masked_secret = poly_to_residues(
+        math.prod(special) * numpy.asarray(target).astype(object), ext_primes)
+    # Uniform residues are uniform within the NTT domain as well, poly_a is sampled there
+    tables = ntt_tables(len_n, ext_primes)
+    moduli = tables["moduli"]
+    priv_rns, poly_e, masked_secret = ntt_forward(numpy.stack([priv_rns, poly_e, masked_secret]),
+        tables)
+    masked_a = mod_add(mod_mul(poly_a, priv_rns, moduli, tables["barrett"]), poly_e, moduli)
+    return (mod_sub(masked_secret, masked_a, moduli), poly_a if seed is None else seed)
+
+def eval_tensor_rns(c_1:tuple, c_2:tuple, primes:tuple, mod_t:int) -> tuple:
+    '''
+    Multiplies two RNS ciphertexts without relinearization (see eval_tensor()).
+    The tensoring requires the rounding of t/Q * c_1 * c_2 over the integers,
+    therefore the ciphertexts are lifted via CRT for this step only.
+    Takes as input:
+        c_1: first ciphertext to take as base.
+        c_2: second ciphertext to multiply with base.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+    Returns:
+        The degree 2 ciphertext c_prod=(c_prod1, c_prod2, c_prod3) in RNS form.
+    '''
+    len_n = c_1[0].shape[-1]
+    mod_q = math.prod(primes)
+    c_10, c_11, c_20, c_21 = (residues_to_poly(comp, primes) for comp in (*c_1, *c_2))
+    c_prod1 = round_scale(negacyclic_mult(c_10, c_20, len_n), mod_t, mod_q)
+    c_prod2 = round_scale(negacyclic_mult(c_10, c_21, len_n)
+        + negacyclic_mult(c_11, c_20, len_n), mod_t, mod_q)
+    c_prod3 = round_scale(negacyclic_mult(c_11, c_21, len_n), mod_t, mod_q)
+    return tuple(poly_to_residues(comp, primes) for comp in (c_prod1, c_prod2, c_prod3))
+
+def _switch_key_ntt(key:tuple, len_n:int, ext_primes:tuple):
+    '''Expands an RNS key switching key and stacks both parts into shape (2, k, len_n).'''
+    key = expand_cipher_rns(key, len_n, ext_primes)
+    key = key if isinstance(key, numpy.ndarray) else numpy.stack(key)
+    if key.shape != (2, len(ext_primes), len_n):
+        raise ValueError(f"The key switching key does not match the extended RNS basis of "
+            f"{len(ext_primes)} primes and len_n={len_n}.")
+    return numpy.stack(key)
+
+def _rns_mod_up(poly, primes:tuple, special:tuple, tables:dict):
+    '''Lifts an RNS polynomial modulo Q to P*Q (see rns_base_convert()) within the NTT domain.'''
+    return ntt_forward(numpy.concatenate((poly, rns_base_convert(poly, primes, special)),
+        axis=-2), tables)
+
+def _rns_mod_down(poly, primes:tuple, special:tuple):
+    '''Computes round(poly/P) modulo Q for an RNS polynomial given modulo P*Q.'''
+    count = len(primes)
+    # poly - [poly]_P is divisible by P, where [poly]_P is the centered residue modulo P
+    difference = mod_sub(poly[..., :count, :], rns_base_convert(poly[..., count:, :], special,
+        primes), numpy.array(primes, dtype=numpy.uint64)[:, None])
+    return rns_mult_scalar(difference, pow(math.prod(special), -1, math.prod(primes)), primes,
+        out=difference)
+
+def relinearize_rns(cipher:tuple, primes:tuple, rlk:tuple, special_primes:tuple=None) -> tuple:
+    '''
+    Reduces a three-component RNS ciphertext to a regular two-component ciphertext.
+    c_prod3 is lifted to the extended basis P*Q and the product with rlk is scaled
+    down by P via fast base conversions (see rns_base_convert()), limb by limb.
+    Takes as input:
+        cipher: the degree 2 ciphertext generated via eval_tensor_rns().
+        primes: the RNS basis of the ciphertext modulus Q.
+        rlk: the relinearization key generated via rlk_gen_rns()
+            (or both parts stacked into one array, see BFVContext).
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        The relinearized ciphertext in RNS form.
+    '''
+    len_n = cipher[0].shape[-1]
+    special = _special_basis(len_n, primes, special_primes)
+    ext_primes = primes + special
+    tables = ntt_tables(len_n, ext_primes)
+    lifted = _rns_mod_up(cipher[2], primes, special, tables)
+    # Calculate the approximation for c_prod3 * sk^2 mod Q over the extended basis P*Q
+    products = ntt_inverse(mod_mul(lifted, _switch_key_ntt(rlk, len_n, ext_primes),
+        tables["moduli"], tables["barrett"]), tables)
+    c_prod2_0, c_prod2_1 = _rns_mod_down(products, primes, special)
+    return (rns_add_polys(cipher[0], c_prod2_0, primes),
+        rns_add_polys(cipher[1], c_prod2_1, primes))
+
+def eval_mult_rns(c_1:tuple, c_2:tuple, primes:tuple, mod_t:int, rlk:tuple,
+    special_primes:tuple=None) -> tuple:
+    '''
+    Multiplies two RNS ciphertexts and relinearizes the product using the RNS rlk
+    (see eval_tensor_rns() and relinearize_rns()).
+    Takes as input:
+        c_1: first ciphertext to take as base.
+        c_2: second ciphertext to multiply with base.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+        rlk: the relinearization key generated via rlk_gen_rns().
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        The encrypted ciphertext new_c_prod=(new_c_prod1, new_c_prod2) in RNS form.
+    '''
+    return relinearize_rns(eval_tensor_rns(c_1, c_2, primes, mod_t), primes, rlk, special_primes)
+
+def eval_product_rns(ciphers:list, primes:tuple, mod_t:int, rlk:tuple, workers:int=1,
+    special_primes:tuple=None) -> tuple:
+    '''
+    Multiplies many RNS ciphertexts using a balanced product tree (see eval_product()).
+    Takes as input:
+        ciphers: the list of k RNS ciphertexts to multiply.
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+        rlk: the relinearization key generated via rlk_gen_rns().
+        workers: the number of worker processes multiplying independent subtrees.
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        The encrypted product in RNS form.
+    '''
+    len_n = ciphers[0][0].shape[-1]
+    special = _special_basis(len_n, primes, special_primes)
+    rlk = _switch_key_ntt(rlk, len_n, primes + special)
+    mult = partial(eval_mult_rns, primes=primes, mod_t=mod_t, rlk=rlk, special_primes=special)
+    return _product_tree(ciphers, mult, workers)
+
+def mod_switch_rns(cipher:tuple, primes:tuple, new_primes:tuple) -> tuple:
+    '''
+    Switches an RNS ciphertext down the moduli chain, i.e. to a prefix new_primes of primes.
+    Every dropped prime p is removed via c' = (c - [c]_p) * p^-1 limb by limb, where [c]_p is
+    the centered residue modulo p, which computes round(c/p) without any CRT reconstruction.
+    Takes as input:
+        cipher: the RNS ciphertext to switch.
+        primes: the RNS basis of the current ciphertext modulus Q.
+        new_primes: the RNS basis of the new ciphertext modulus (a prefix of primes).
+    Returns:
+        The RNS ciphertext modulo the product of new_primes.
+    '''
+    new_primes = tuple(new_primes)
+    if not new_primes or primes[:len(new_primes)] != new_primes:
+        raise ValueError("The new RNS basis has to be a non-empty prefix of the current basis.")
+    components = list(cipher)
+    for count in range(len(primes) - 1, len(new_primes) - 1, -1):
+        prime = primes[count]
+        remaining = numpy.array(primes[:count], dtype=numpy.int64)[:, None]
+        inverse = numpy.array([pow(prime, -1, other) for other in primes[:count]],
+            dtype=numpy.uint64)[:, None]
+        for i, comp in enumerate(components):
+            last = comp[..., count:count + 1, :].astype(numpy.int64)
+            last = (last - prime * (last > prime // 2)) % remaining
+            difference = (comp[..., :count, :].astype(numpy.int64) - last) % remaining
+            components[i] = difference.astype(numpy.uint64) * inverse \
+                % remaining.astype(numpy.uint64)
+    return tuple(components)
+
+
+def rns_apply_galois(poly, galois_elt:int, primes:tuple):
+    '''
+    Applies the automorphism x -> x^galois_elt to a polynomial given in RNS form.
+    Takes as input:
+        poly: the RNS polynomial (uint64 array of shape (..., k, len_n)).
+        galois_elt: the odd Galois element.
+        primes: the RNS basis.
+    Returns:
+        The automorphed RNS polynomial.
+    '''
+    len_n = poly.shape[-1]
+    index = numpy.arange(len_n) * galois_elt % (2 * len_n)
+    result = numpy.empty_like(poly)
+    result[..., index % len_n] = numpy.where(index >= len_n, rns_neg_poly(poly, primes), poly)
+    return result
+
+@lru_cache(maxsize=None)
+def _ntt_galois_index(len_n:int, galois_elt:int):
+    # ntt_forward() holds the evaluation at psi^(2i+1) at index i, the automorphism maps it
+    # to the evaluation at psi^((2i+1)*galois_elt)
+    odd = 2 * numpy.arange(len_n) + 1
+    return (odd * galois_elt % (2 * len_n) - 1) // 2
+
+def galois_key_gen_rns(len_n:int, primes:tuple, priv_key:list, std_dev2:float,
+    galois_elts:list=None, seeded:bool=False, special_primes:tuple=None) -> dict:
+    '''
+    Generates the RNS Galois keys (see galois_key_gen()).
+    Takes as input:
+        len_n: the length of the polynomials to be used.
+        primes: the RNS basis of the ciphertext modulus Q.
+        priv_key: private key generated via key_pair_gen_rns().
+        std_dev2: the standard deviation to be used for the error distribution X'.
+        galois_elts: the Galois elements to generate keys for
+            (defaults to sum_slots_galois_elts()).
+        seeded: if True, the uniform parts of the keys are replaced by their seeds.
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        A dict mapping each Galois element to its key in RNS form modulo P*Q, given within
+        the NTT domain (seeds expand directly into the NTT form of the uniform key part).
+    '''
+    if galois_elts is None:
+        galois_elts = sum_slots_galois_elts(len_n)
+    special = _special_basis(len_n, primes, special_primes)
+    return {elt: _switch_key_gen_rns(len_n, primes, priv_key, apply_galois(priv_key, elt),
+        std_dev2, seeded, special) for elt in galois_elts}
+
+def eval_galois_many_rns(cipher:tuple, galois_elts:list, primes:tuple, galois_keys:dict,
+    special_primes:tuple=None) -> list:
+    '''
+    Applies several automorphisms to the same RNS ciphertext using hoisting: the lift of c2
+    to the extended basis P*Q and its forward NTT are shared by all automorphisms, as the
+    automorphism commutes with the lift and only permutes the NTT evaluations. The keys are
+    given within the NTT domain, so each automorphism costs a single inverse transform.
+    Takes as input:
+        cipher: the RNS ciphertext to take as base.
+        galois_elts: the odd Galois elements.
+        primes: the RNS basis of the ciphertext modulus Q.
+        galois_keys: the Galois keys generated via galois_key_gen_rns().
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        The list of ciphertexts of the automorphed plaintexts.
+    '''
+    len_n = cipher[0].shape[-1]
+    special = _special_basis(len_n, primes, special_primes)
+    ext_primes = primes + special
+    tables = ntt_tables(len_n, ext_primes)
+    lifted = _rns_mod_up(cipher[1], primes, special, tables)
+    results = []
+    for elt in galois_elts:
+        if elt not in galois_keys:
+            raise ValueError(f"No Galois key available for the element {elt}.")
+        permuted = lifted[..., _ntt_galois_index(len_n, elt)]
+        c_1, c_2 = _rns_mod_down(ntt_inverse(mod_mul(permuted, _switch_key_ntt(galois_keys[elt],
+            len_n, ext_primes), tables["moduli"], tables["barrett"]), tables), primes, special)
+        results.append((rns_add_polys(rns_apply_galois(cipher[0], elt, primes), c_1, primes), c_2))
+    return results
+
+def eval_rotate_rns(cipher:tuple, steps:int, primes:tuple, galois_keys:dict,
+    special_primes:tuple=None) -> tuple:
+    '''
+    Rotates both rows of batching slots of an RNS ciphertext by steps to the left.
+    Takes as input:
+        cipher: the RNS ciphertext to rotate.
+        steps: the number of slots to rotate by (negative values rotate to the right).
+        primes: the RNS basis of the ciphertext modulus Q.
+        galois_keys: the Galois keys generated via galois_key_gen_rns().
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        The rotated RNS ciphertext.
+    '''
+    elt = rotation_galois_elt(steps, cipher[0].shape[-1])
+    return eval_galois_many_rns(cipher, [elt], primes, galois_keys, special_primes)[0]
+
+def eval_sum_slots_rns(cipher:tuple, primes:tuple, galois_keys:dict,
+    special_primes:tuple=None) -> tuple:
+    '''
+    Sums all batching slots of an RNS ciphertext with log2(len_n) rotations.
+    Takes as input:
+        cipher: the RNS ciphertext to sum up.
+        primes: the RNS basis of the ciphertext modulus Q.
+        galois_keys: the Galois keys for sum_slots_galois_elts().
+        special_primes: the special primes P (defaults to rns_special_moduli()).
+    Returns:
+        The RNS ciphertext holding the sum of all slots in each slot.
+    '''
+    for elt in sum_slots_galois_elts(cipher[0].shape[-1]):
+        cipher = eval_add_rns(cipher, eval_galois_many_rns(cipher, [elt], primes, galois_keys,
+            special_primes)[0], primes)
+    return cipher
+
+
+# Noise Budget
+def _budget_bits(noise_norm, mod_q:int) -> int:
+    '''Returns the noise budget log2(mod_q/(2*noise_norm)) in bits, clipped at 0.'''
+    if noise_norm <= 0:
+        return int(math.log2(mod_q)) - 1
+    return max(int(math.floor(math.log2(mod_q) - math.log2(noise_norm) - 1)), 0)
+
+def noise_budget(cipher:tuple, priv_key:list, mod_q:int, mod_t:int, poly_mod:int) -> int:
+    '''
+    Measures the exact invariant noise budget of a ciphertext using the private key.
+    The invariant noise v is given by t/q*(c1 + c2*s) = m + v (mod t), the ciphertext
+    decrypts correctly as long as |v| < 1/2, i.e. as long as the budget is positive.
+    Takes as input:
+        cipher: ciphertext tuple containing c1 and c2.
+        priv_key: private key generated via key_pair_gen().
+        mod_q: the modulus used for ciphertext (as per BFV).
+        mod_t: the modulus used for plaintext (as per BFV).
+        poly_mod: the modulus used for polynomials (given as x^len_n+1).
+    Returns:
+        The remaining noise budget in bits (0 if the ciphertext can no longer be decrypted).
+    '''
+    scaled_m = add_polys(mult_polys(cipher[1], priv_key, mod_q, poly_mod),
+                cipher[0], mod_q, poly_mod)
+    noise = scaled_m.astype(object) * mod_t % mod_q
+    noise = numpy.where(noise > mod_q // 2, noise - mod_q, noise)
+    return _budget_bits(_max_abs(noise), mod_q)
+
+def noise_budget_rns(cipher:tuple, priv_key:list, primes:tuple, mod_t:int) -> int:
+    '''
+    Measures the exact invariant noise budget of an RNS ciphertext (see noise_budget()).
+    Takes as input:
+        cipher: RNS ciphertext tuple containing c1 and c2.
+        priv_key: private key generated via key_pair_gen_rns().
+        primes: the RNS basis of the ciphertext modulus Q.
+        mod_t: the modulus used for plaintext (as per BFV).
+    Returns:
+        The remaining noise budget in bits.
+    '''
+    scaled_m = rns_add_polys(rns_mult_polys(cipher[1], poly_to_residues(priv_key, primes), primes),
+        cipher[0], primes)
+    noise = residues_to_poly(rns_mult_scalar(scaled_m, mod_t, primes), primes)
+    return _budget_bits(_max_abs(noise), math.prod(primes))
+
+class NoiseEstimator:
+    '''
+    Cheap analytic bounds on the invariant noise v of ciphertexts (see noise_budget()),
+    following the noise analysis of Fan and Vercauteren. Coefficients of ring products are
+    treated as sums of independent terms (central limit heuristic) and bounded by 6 standard
+    deviations, which holds with overwhelming probability and is far tighter than the
+    worst-case expansion factor len_n.
+    Takes as input:
+        len_n: the length of the polynomials.
+        mod_q: the ciphertext modulus.
+        mod_t: the plaintext modulus.
+        std_dev: the standard deviation of the error distribution.
+        mod_p: the extra modulus of the relinearization key.
+        std_dev2: the standard deviation of the relinearization error distribution X'.
+        base_bits: the decomposition base bits if relinearization variant 1 is used
+            (see rlk_gen_decomp()), in which case mod_p is ignored.
+    '''
+    def __init__(self, len_n:int, mod_q:int, mod_t:int, std_dev:float, mod_p:int,
+        std_dev2:float, base_bits:int=None):
+        self.len_n = len_n
+        self.mod_q = mod_q
+        self.mod_t = mod_t
+        self.mod_p = mod_p
+        self.base_bits = base_bits
+        self.std_dev = std_dev
+        self.std_dev2 = std_dev2
+        # Error introduced by scaling with delta = floor(q/t) instead of q/t
+        self.rounding = mod_t * (mod_q % mod_t) / mod_q
+
+    def fresh(self) -> float:
+        '''Returns the noise bound of a fresh encryption (e*u + e1 + e2*s).'''
+        # Ternary u and s have a variance of 2/3 per coefficient
+        std_fresh = self.std_dev * math.sqrt(4 * self.len_n / 3 + 1)
+        return self.mod_t * 6 * std_fresh / self.mod_q + self.rounding
+
+    def add(self, noise_1:float, noise_2:float) -> float:
+        '''Returns the noise bound of the sum of two ciphertexts.'''
+        return noise_1 + noise_2
+
+    def add_plain(self, noise:float) -> float:
+        '''Returns the noise bound after adding a plaintext.'''
+        return noise + self.rounding
+
+    def mult_plain(self, noise:float, mess) -> float:
+        '''Returns the noise bound after multiplying with the plaintext mess.'''
+        encoded_m = encode_message(mess, self.len_n, self.mod_t)
+        encoded_m = numpy.where(encoded_m > self.mod_t//2, self.mod_t - encoded_m, encoded_m)
+        if numpy.ndim(mess):
+            return noise * 6 * math.sqrt(self.len_n) * int(encoded_m.max())
+        return noise * int(encoded_m[0])
+
+    def tensor(self, noise_1:float, noise_2:float) -> float:
+        '''Returns the noise bound of an unrelinearized product of two ciphertexts.'''
+        len_n, mod_t = self.len_n, self.mod_t
+        # t/q*(c1 + c2*s) = m + v + t*a, where a has a standard deviation of sqrt(len_n/18)
+        factor = mod_t * 6 * math.sqrt(len_n) * math.sqrt(len_n / 18)
+        return factor * (noise_1 + noise_2) + 6 * math.sqrt(len_n) * noise_1 * noise_2 \
+            + mod_t * 6 * math.sqrt(len_n) * len_n / (2 * self.mod_q)
+
+    def relinearize(self, noise:float) -> float:
+        '''Returns the noise bound after relinearizing a three-component ciphertext.'''
+        if self.base_bits is not None:
+            # Sum of digits*e_i, where the digits are uniform within [0, 2^b) (second moment 4^b/3)
+            count = -(-(self.mod_q - 1).bit_length() // self.base_bits)
+            std_relin = math.sqrt(count * self.len_n / 3) * 2**self.base_bits * self.std_dev2
+            return noise + self.mod_t * 6 * std_relin / self.mod_q
+        # c3 is uniform within Z_q (standard deviation q/sqrt(12)) and rounded by 1/p
+        std_relin = math.sqrt(self.len_n / 12) * self.std_dev2 * self.mod_q / self.mod_p
+        return noise + self.mod_t * (6 * std_relin + self.len_n) / self.mod_q
+
+    def mult(self, noise_1:float, noise_2:float) -> float:
+        '''Returns the noise bound of the relinearized product of two ciphertexts.'''
+        return self.relinearize(self.tensor(noise_1, noise_2))
+
+    def product(self, noises:list) -> float:
+        '''Returns the noise bound of a balanced product tree (see eval_product()).'''
+        noises = list(noises)
+        while len(noises) > 1:
+            left, right = noises[0::2], noises[1::2]
+            carry = [left.pop()] if len(left) > len(right) else []
+            noises = [self.mult(noise_1, noise_2) for noise_1, noise_2 in zip(left, right)] + carry
+        return noises[0]
+
+    def mod_switch(self, noise:float, new_q:int) -> float:
+        '''Returns the noise bound after switching to the modulus new_q.'''
+        # The rounding errors (uniform within [-1/2, 1/2]) of c2 are multiplied with s
+        return noise + self.mod_t * (0.5 + 6 * math.sqrt(self.len_n / 18)) / new_q
+
+    def min_modulus_bits(self, noise:float) -> int:
+        '''Returns the bit size of the smallest power of two below mod_q keeping 1 bit of budget.'''
+        if self.budget(noise) < 1:
+            raise ValueError(f"The noise bound {noise:.3g} leaves no noise budget, switching "
+                "to a smaller modulus would only add noise.")
+        for bits in range(self.mod_t.bit_length() + 1, self.mod_q.bit_length()):
+            if 2**bits < self.mod_q and self.budget(self.mod_switch(noise, 2**bits)) >= 1:
+                return bits
+        raise ValueError("No power of two modulus below mod_q keeps a noise budget of 1 bit.")
+
+    def budget(self, noise:float) -> int:
+        '''Converts a noise bound into the estimated noise budget in bits.'''
+        return _budget_bits(noise * self.mod_q, self.mod_q)
+
+class TrackedCipher(tuple):
+    '''
+    Ciphertext tuple carrying the analytic bound on its invariant noise (see NoiseEstimator).
+    It behaves exactly like the plain ciphertext tuple within all functions of this module,
+    the BFVContext evaluation methods carry the noise bound along to their results.
+    '''
+    def __new__(cls, components, noise:float):
+        cipher = super().__new__(cls, components)
+        cipher.noise = noise
+        return cipher
+
+    def __reduce__(self):
+        return (TrackedCipher, (tuple(self), self.noise))
+
+
+# Parameter Selection
+def select_parameters(plain_bound:int, depth:int, security:int=128, batching:bool=False,
+    std_dev:float=3.2) -> dict:
+    '''
+    Selects the smallest parameter set supporting the given plaintext range and
+    multiplicative depth at the given security level. The polynomial length is minimized
+    first, the noise budget after depth squarings is checked via the NoiseEstimator.
+    Moduli within the int64 range use the integer backend (powers of two q and p, which
+    are multiplied exactly via the FFT), larger moduli the RNS backend (see rns_moduli_gen()).
+    Takes as input:
+        plain_bound: the largest plaintext value that has to be representable.
+        depth: the required multiplicative depth.
+        security: the security level in bits (128, 192 or 256).
+        batching: if True, mod_t is chosen as prime suitable for the BatchEncoder.
+        std_dev: the standard deviation to be used for the error distributions.
+    Returns:
+        A dict holding len_n, mod_q, mod_t, mod_p, std_dev, std_dev2, the estimated
+        remaining noise budget in bits (budget) and for the RNS backend the special
+        primes whose product is mod_p (special_primes).
+    '''
+    if security not in SECURITY_MAX_LOG_Q:
+        raise ValueError(f"Supported security levels: {sorted(SECURITY_MAX_LOG_Q)}.")
+
+    def remaining_budget(len_n, mod_q, mod_t, mod_p):
+        estimator = NoiseEstimator(len_n, mod_q, mod_t, std_dev, mod_p, std_dev)
+        noise = estimator.fresh()
+        for _ in range(depth):
+            noise = estimator.mult(noise, noise)
+        return estimator.budget(noise)
+
+    for len_n, max_log_q in SECURITY_MAX_LOG_Q[security].items():
+        mod_t = plain_bound + 1
+        if batching:
+            mod_t = max(-(-plain_bound // (2 * len_n)), 1) * 2 * len_n + 1
+            while not is_prime(mod_t):
+                mod_t += 2 * len_n
+            if mod_t.bit_length() > NTT_PRIME_BITS:
+                raise ValueError(f"Batching requires plaintext values below 2^{NTT_PRIME_BITS}.")
+        best = None
+        # Integer backend: mod_q*mod_p has to fit into a signed 64-bit integer,
+        # the split between mod_q and mod_p leaving the largest budget is chosen
+        log_qp = min(max_log_q, 62)
+        for q_bits in range(mod_t.bit_length() + 1, log_qp):
+            mod_q = 2**q_bits # multiplied exactly via the FFT instead of a multi-prime NTT
+            mod_p = 2**(log_qp - q_bits)
+            budget = remaining_budget(len_n, mod_q, mod_t, mod_p)
+            if budget >= 1 and (best is None or budget > best["budget"]):
+                best = {"len_n": len_n, "mod_q": mod_q, "mod_t": mod_t, "mod_p": mod_p,
+                    "std_dev": std_dev, "std_dev2": std_dev, "budget": budget}
+        # RNS backend: Q consists of count primes, P of the fewest special primes keeping
+        # the relinearization noise within the budget (P*Q counts towards the security bound)
+        count = 1
+        while best is None and NTT_PRIME_BITS * (count + 1) <= max_log_q:
+            primes = rns_moduli_gen(len_n, count)
+            special_count = 1
+            while best is None and special_count <= count + 1 \
+                    and NTT_PRIME_BITS * (count + special_count) <= max_log_q:
+                special = rns_special_moduli(len_n, primes, special_count)
+                mod_p = math.prod(special)
+                budget = remaining_budget(len_n, math.prod(primes), mod_t, mod_p)
+                if budget >= 1:
+                    best = {"len_n": len_n, "mod_q": primes, "mod_t": mod_t, "mod_p": mod_p,
+                        "std_dev": std_dev, "std_dev2": std_dev, "budget": budget,
+                        "special_primes": special}
+                special_count += 1
+            count += 1
+        if best is not None:
+            return best
+    raise ValueError("No supported parameter set satisfies the given requirements.")
+
+
+# BFV Context
+class BFVContext:
+    '''
+    Holds a validated BFV parameter set together with all precomputed state (polynomial
+    modulus, scaling factor delta, NTT tables and batching tables), so that callers neither
+    rebuild poly_mod nor pass the loose parameters to every call.
+    The ciphertext modulus can either be given as an integer (e.g. 2**54) or as a tuple
+    of NTT-friendly primes (see rns_moduli_gen()), in which case the RNS backend is used.
+    Takes as input:
+        len_n: the length of the polynomials (a power of two).
+        mod_q: the ciphertext modulus or the RNS basis as a tuple of primes.
+        mod_t: the plaintext modulus.
+        std_dev: the standard deviation to be used for the error distribution.
+        mod_p: the extra modulus used by the relinearization key (integer backend only).
+        std_dev2: the standard deviation for the relinearization error distribution X'
+            (defaults to std_dev).
+        track_noise: if True, encryptions are returned as TrackedCipher carrying an analytic
+            noise bound, which the evaluation methods propagate (see estimated_budget()).
+        base_bits: if given, relinearization and Galois keys follow relinearization
+            variant 1 with base 2^base_bits (see rlk_gen_decomp()) instead of using mod_p
+            (integer backend only, the RNS backend is exact already).
+        use_workspace: if True, encryption and decryption draw their temporaries from a
+            Workspace held by the context (not thread-safe, see Workspace).
+        special_primes: the special primes P of the key switching keys (RNS backend only,
+            defaults to rns_special_moduli(), see select_parameters() for a smaller P).
+    '''
+    def __init__(self, len_n:int, mod_q, mod_t:int, std_dev:float, mod_p:int=2,
+        std_dev2:float=None, track_noise:bool=False, base_bits:int=None,
+        use_workspace:bool=False, special_primes:tuple=None):
+        if len_n < 2 or len_n & (len_n - 1):
+            raise ValueError(f"len_n={len_n} has to be a power of two.")
+        self.primes = tuple(mod_q) if isinstance(mod_q, (tuple, list)) else None
+        if self.primes is not None:
+            for prime in self.primes:
+                _check_rns_prime(len_n, prime)
+            mod_q = math.prod(self.primes)
+        if mod_t < 2 or mod_q <= mod_t:
+            raise ValueError("The moduli have to satisfy 1 < mod_t < mod_q.")
+        if std_dev <= 0 or (std_dev2 is not None and std_dev2 <= 0):
+            raise ValueError("The standard deviations have to be positive.")
+        if base_bits is not None and (self.primes is not None
+                or not 1 <= base_bits <= NTT_PRIME_BITS - 1):
+            raise ValueError(f"base_bits has to be between 1 and {NTT_PRIME_BITS - 1} "
+                "and requires the integer backend.")
+        if self.primes is None and mod_q * (mod_p if base_bits is None else 1) >= 2**63:
+            raise ValueError("mod_q*mod_p has to fit into a signed 64-bit integer.")
+        self.len_n = len_n
+        self.mod_q = mod_q
+        self.mod_t = mod_t
+        self.mod_p = mod_p
+        self.std_dev = std_dev
+        self.std_dev2 = std_dev if std_dev2 is None else std_dev2
+        self.base_bits = base_bits
+        self.poly_mod = numpy.array([1]+[0]*(len_n-1)+[1])
+        self.delta = mod_q // mod_t
+        self.dtype = numpy.int64 if self.primes is None else numpy.uint64 # ciphertext coefficients
+        # Precompute the NTT tables for all product sizes occurring within the scheme
+        if self.primes is None:
+            for bound in (len_n * mod_q, len_n * mod_q**2, len_n * mod_q**2 * mod_p):
+                ntt_tables(len_n, ntt_primes(len_n, -(-(2*bound+1).bit_length()
+                    // (NTT_PRIME_BITS - 1))))
+            if base_bits is not None:
+                ntt_tables(len_n, _decomp_primes(len_n, mod_q, base_bits))
+        else:
+            self.special_primes = _special_basis(len_n, self.primes, special_primes)
+            if not self.special_primes or set(self.special_primes) & set(self.primes):
+                raise ValueError("The special primes have to be disjoint from the RNS basis.")
+            for prime in self.special_primes:
+                _check_rns_prime(len_n, prime)
+            self.moduli = numpy.array(self.primes, dtype=numpy.uint64)[:, None]
+            self.delta_rns = numpy.array([self.delta % prime for prime in self.primes],
+                dtype=numpy.uint64)[:, None]
+            ntt_tables(len_n, self.primes)
+            ntt_tables(len_n, self.primes + self.special_primes)
+        try:
+            self.encoder = BatchEncoder(len_n, mod_t)
+        except ValueError:
+            self.encoder = None
+        self.track_noise = track_noise
+        self.workspace = Workspace() if use_workspace else None
+        self._switch_keys = {} # expanded seeded RNS key switching keys, see _switch_key()
+        self._switched = {} # contexts for smaller moduli, see switched_context()
+        self._decrypt_only = False # set for switched contexts, see _check_key_switching()
+        self.estimator = NoiseEstimator(len_n, mod_q, mod_t, self.std_dev,
+            mod_p if self.primes is None else math.prod(self.special_primes), self.std_dev2,
+            base_bits)
+
+    @classmethod
+    def from_requirements(cls, plain_bound:int, depth:int, security:int=128,
+        batching:bool=False, track_noise:bool=False):
+        '''
+        Creates a context with the smallest parameter set meeting the given requirements
+        (see select_parameters()).
+        Takes as input:
+            plain_bound: the largest plaintext value that has to be representable.
+            depth: the required multiplicative depth.
+            security: the security level in bits (128, 192 or 256).
+            batching: if True, mod_t is chosen as prime suitable for the BatchEncoder.
+            track_noise: if True, ciphertexts carry an analytic noise bound.
+        Returns:
+            The BFVContext.
+        '''
+        params = select_parameters(plain_bound, depth, security, batching)
+        return cls(params["len_n"], params["mod_q"], params["mod_t"], params["std_dev"],
+            mod_p=params["mod_p"], std_dev2=params["std_dev2"], track_noise=track_noise,
+            special_primes=params.get("special_primes"))
+
+    def _propagate(self, result:tuple, inputs:tuple, estimate) -> tuple:
+        # Carries the noise bound along if all input ciphertexts are tracked
+        if inputs and all(isinstance(cipher, TrackedCipher) for cipher in inputs):
+            return TrackedCipher(result, estimate(*(cipher.noise for cipher in inputs)))
+        return result
+
+    def track(self, cipher:tuple, noise:float=None) -> TrackedCipher:
+        '''
+        Attaches a noise bound to a ciphertext (e.g. received from another party).
+        Takes as input:
+            cipher: the ciphertext to track.
+            noise: the noise bound (defaults to the bound of a fresh encryption).
+        Returns:
+            The ciphertext as TrackedCipher.
+        '''
+        return TrackedCipher(cipher, self.estimator.fresh() if noise is None else noise)
+
+    def noise_budget(self, cipher:tuple, priv_key:list) -> int:
+        '''
+        Measures the exact noise budget of a ciphertext (debugging only, requires priv_key).
+        Takes as input:
+            cipher: the ciphertext to measure.
+            priv_key: private key generated via key_pair_gen().
+        Returns:
+            The remaining noise budget in bits.
+        '''
+        if self.primes is not None:
+            return noise_budget_rns(cipher, priv_key, self.primes, self.mod_t)
+        return noise_budget(cipher, priv_key, self.mod_q, self.mod_t, self.poly_mod)
+
+    def estimated_budget(self, cipher:TrackedCipher) -> int:
+        '''
+        Returns the analytically estimated (lower bound of the) noise budget of a tracked
+        ciphertext.
+        Takes as input:
+            cipher: the TrackedCipher to estimate the budget for.
+        Returns:
+            The estimated noise budget in bits.
+        '''
+        return self.estimator.budget(cipher.noise)
+
+    def key_pair_gen(self, seeded:bool=False):
+        '''
+        Generates the private/public key pair for this context.
+        Takes as input:
+            seeded: if True, the uniform part of the public key is replaced by its seed.
+        Returns:
+            priv_key, pub_key
+        '''
+        if self.primes is not None:
+            return key_pair_gen_rns(self.len_n, self.primes, self.std_dev, seeded)
+        return key_pair_gen(self.len_n, self.mod_q, self.poly_mod, self.std_dev, seeded)
+
+    def generate_keys(self, seeded:bool=False) -> tuple:
+        '''
+        Generates a key pair bound to this context (see SecretKey and PublicKey).
+        Takes as input:
+            seeded: if True, the uniform part of the public key is derived from a seed.
+        Returns:
+            secret_key, public_key
+        '''
+        priv_key, pub_key = self.key_pair_gen(seeded)
+        return SecretKey(self, priv_key), PublicKey(self, pub_key)
+
+    def rlk_gen(self, priv_key:list, seeded:bool=False) -> tuple:
+        '''
+        Generates the relinearization key for this context.
+        Takes as input:
+            priv_key: private key generated via key_pair_gen().
+            seeded: if True, the uniform part of the key is replaced by its seed.
+        Returns:
+            Relinearization key rlk as tuple containing (rlk1, rlk2)
+            (or as dict if base_bits is set, see rlk_gen_decomp()).
+        '''
+        self._check_key_switching()
+        if self.primes is not None:
+            return rlk_gen_rns(self.len_n, self.primes, priv_key, self.std_dev2, seeded,
+                self.special_primes)
+        if self.base_bits is not None:
+            return rlk_gen_decomp(self.len_n, self.mod_q, self.poly_mod, priv_key, self.std_dev2,
+                self.base_bits, seeded)
+        return rlk_gen(self.len_n, self.mod_q, self.mod_p, self.poly_mod, priv_key, self.std_dev2,
+            seeded)
+
+    def _switch_key(self, key:tuple):
+        # Expands a seeded RNS key switching key (rlk or Galois key) only once per seed,
+        # so that reloading the same key (e.g. per request) does not repeat the expansion
+        if not isinstance(key[1], bytes):
+            return key
+        cached = self._switch_keys.get(key[1])
+        if cached is None or not numpy.array_equal(cached[0], key[0]):
+            cached = self._switch_keys[key[1]] = (key[0], _switch_key_ntt(key, self.len_n,
+                self.primes + self.special_primes))
+        return cached[1]
+
+    def _galois_switch_keys(self, galois_keys:dict, galois_elts:list) -> dict:
+        return {elt: self._switch_key(galois_keys[elt]) for elt in galois_elts
+            if elt in galois_keys}
+
+    def _check_key_switching(self):
+        # Relinearization and Galois keys are bound to the modulus (and special primes) they
+        # were generated for, which switched contexts no longer share
+        if self._decrypt_only:
+            raise ValueError("Contexts created via switched_context() do not support "
+                "relinearization or rotations, evaluate before switching the modulus.")
+
+    def expand_key(self, key:tuple, relin:bool=False) -> tuple:
+        '''
+        Expands a seeded public or relinearization key into the full key.
+        Takes as input:
+            key: the (seeded) key generated via key_pair_gen() or rlk_gen().
+            relin: True if the key is a relinearization key.
+        Returns:
+            The full key as a tuple.
+        '''
+        if self.primes is not None:
+            primes = self.primes + self.special_primes if relin else self.primes
+            return expand_cipher_rns(key, self.len_n, primes)
+        return expand_key(key, self.len_n, self.mod_q * self.mod_p if relin else self.mod_q)
+
+    def check_key(self, key, relin:bool=False):
+        '''
+        Checks that a (loaded) key matches the parameters of this context, e.g. to detect
+        keys stored for a previous parameter set before they fail deep within an operation.
+        Takes as input:
+            key: the private key, or the (seeded) public or relinearization key.
+            relin: True if the key is a relinearization key.
+        Raises a ValueError describing the mismatch otherwise.
+        '''
+        if isinstance(key, dict):
+            expected = f"base decomposition key for mod_q={self.mod_q}, base 2^{self.base_bits}"
+            found = f"base decomposition key for mod_q={key['mod_q']}, base 2^{key['base_bits']}"
+            if (key["mod_q"], key["base_bits"]) == (self.mod_q, self.base_bits) \
+                    and numpy.shape(key["key_1"])[-1] == self.len_n:
+                return
+        elif not isinstance(key, tuple) and numpy.ndim(key) == 1:
+            expected, found = f"private key of length {self.len_n}", f"length {len(key)}"
+            if len(key) == self.len_n:
+                return
+        else:
+            shape = (self.len_n,) if self.primes is None else \
+                (len(self.primes) + (len(self.special_primes) if relin else 0), self.len_n)
+            expected = f"key parts of shape {shape}"
+            found = f"shape {numpy.shape(key[0])}"
+            if numpy.shape(key[0]) == shape and (isinstance(key[1], bytes)
+                    or numpy.shape(key[1]) == shape):
+                return
+        raise ValueError(f"The key does not match the parameters of the context (expected "
+            f"{expected}, found {found}), regenerate the keys for the current parameters.")
+
+    def encrypt(self, mess, pub_key:tuple) -> tuple:
+        '''
+        Encrypts an integer message or a plaintext polynomial.
+        Takes as input:
+            mess: plaintext integer message or plaintext polynomial.
+            pub_key: public key generated via key_pair_gen().
+        Returns:
+            The encrypted ciphertext C=(C1,C2).
+        '''
+        if self.primes is not None:
+            cipher = encrypt_message_rns(mess, pub_key, self.len_n, self.primes, self.mod_t,
+                self.std_dev, self.workspace)
+        else:
+            cipher = encrypt_message(mess, pub_key, self.len_n, self.mod_q, self.mod_t,
+                self.poly_mod, self.std_dev)
+        return self.track(cipher) if self.track_noise else cipher
+
+    def encrypt_symmetric(self, mess, priv_key:list) -> tuple:
+        '''
+        Encrypts a message with the private/secret key into a seeded ciphertext.
+        Takes as input:
+            mess: plaintext integer message or plaintext polynomial.
+            priv_key: private key generated via key_pair_gen().
+        Returns:
+            The compressed ciphertext (C1, seed), see expand_cipher().
+        '''
+        if self.primes is not None:
+            cipher = encrypt_message_symmetric_rns(mess, priv_key, self.len_n, self.primes,
+                self.mod_t, self.std_dev)
+        else:
+            cipher = encrypt_message_symmetric(mess, priv_key, self.len_n, self.mod_q,
+                self.mod_t, self.poly_mod, self.std_dev)
+        return self.track(cipher) if self.track_noise else cipher
+
+    def expand_cipher(self, cipher:tuple) -> tuple:
+        '''
+        Expands a seeded ciphertext (c1, seed) into the full ciphertext (c1, c2).
+        Takes as input:
+            cipher: ciphertext tuple containing c1 and either c2 or the seed of c2.
+        Returns:
+            The ciphertext C=(C1,C2).
+        '''
+        if self.primes is not None:
+            result = expand_cipher_rns(cipher, self.len_n, self.primes)
+        else:
+            result = expand_cipher(cipher, self.len_n, self.mod_q)
+        return self._propagate(result, (cipher,), lambda noise: noise)
+
+    def decrypt(self, cipher:tuple, priv_key:list) -> int:
+        '''
+        Decrypts a ciphertext into its constant coefficient.
+        Takes as input:
+            cipher: ciphertext tuple containing c1 and c2.
+            priv_key: private key generated via key_pair_gen().
+        Returns:
+            The decrypted ciphertext polynomial as an integer.
+        '''
+        if self.primes is not None:
+            return decrypt_cipher_rns(cipher, priv_key, self.primes, self.mod_t)
+        return decrypt_cipher(cipher, priv_key, self.mod_q, self.mod_t, self.poly_mod)
+
+    def encrypt_many(self, messages, pub_key:tuple):
+        '''
+        Encrypts many messages at once as vectorized batch.
+        Takes as input:
+            messages: a 1-D array of integer messages or a 2-D array of plaintext polynomials.
+            pub_key: public key generated via key_pair_gen().
+        Returns:
+            The ciphertexts stacked along the first axis.
+        '''
+        if self.primes is not None:
+            return encrypt_many_rns(messages, pub_key, self.len_n, self.primes, self.mod_t,
+                self.std_dev)
+        return encrypt_many(messages, pub_key, self.len_n, self.mod_q, self.mod_t,
+            self.poly_mod, self.std_dev)
+
+    def decrypt_many(self, ciphers, priv_key:list, full:bool=False):
+        '''
+        Decrypts many ciphertexts at once as vectorized batch.
+        Takes as input:
+            ciphers: the ciphertexts stacked along the first axis (see encrypt_many()).
+            priv_key: private key generated via key_pair_gen().
+            full: if True, the full plaintext polynomials are decrypted, which inverts
+                encrypt_many() for a 2-D array of plaintext polynomials.
+        Returns:
+            The decrypted messages as an int64 array (one row per ciphertext if full is set).
+        '''
+        if self.primes is not None:
+            return decrypt_many_rns(ciphers, priv_key, self.primes, self.mod_t, full)
+        return decrypt_many(ciphers, priv_key, self.mod_q, self.mod_t, self.poly_mod, full)
+
+    def decrypt_coeffs(self, cipher:tuple, priv_key:list, indices:list):
+        '''
+        Decrypts only the requested plaintext coefficients in O(len_n) each.
+        Takes as input:
+            cipher: the ciphertext to decrypt.
+            priv_key: private key generated via key_pair_gen().
+            indices: the indices of the plaintext coefficients to decrypt.
+        Returns:
+            The decrypted coefficients as int64 array.
+        '''
+        if self.primes is not None:
+            return decrypt_coeffs_rns(cipher, priv_key, self.primes, self.mod_t, indices)
+        return decrypt_coeffs(cipher, priv_key, self.mod_q, self.mod_t, indices)
+
+    def decrypt_poly(self, cipher:tuple, priv_key:list):
+        '''
+        Decrypts a ciphertext into the full plaintext polynomial.
+        Takes as input:
+            cipher: ciphertext tuple containing c1 and c2.
+            priv_key: private key generated via key_pair_gen().
+        Returns:
+            The decrypted plaintext polynomial as int64 coefficient array.
+        '''
+        if self.primes is not None:
+            return decrypt_poly_rns(cipher, priv_key, self.primes, self.mod_t)
+        return decrypt_poly(cipher, priv_key, self.mod_q, self.mod_t, self.poly_mod)
+
+    def eval_add(self, c_1:tuple, c_2:tuple, out:tuple=None) -> tuple:
+        '''
+        Adds two ciphertexts.
+        Takes as input:
+            c_1: first ciphertext to take as base.
+            c_2: second ciphertext to add to base.
+            out: optional ciphertext receiving the sum, passing c_1 accumulates in place.
+        Returns:
+            The encrypted sum as ciphertext.
+        '''
+        if self.primes is not None:
+            result = eval_add_rns(c_1, c_2, self.primes, out, self.workspace)
+        else:
+            result = eval_add(c_1, c_2, self.mod_q, self.poly_mod, out)
+        return self._propagate(result, (c_1, c_2), self.estimator.add)
+
+    def eval_mult(self, c_1:tuple, c_2:tuple, rlk:tuple) -> tuple:
+        '''
+        Multiplies two ciphertexts and relinearizes the product.
+        Takes as input:
+            c_1: first ciphertext to take as base.
+            c_2: second ciphertext to multiply with base.
+            rlk: the relinearization key generated via rlk_gen().
+        Returns:
+            The encrypted product as ciphertext.
+        '''
+        self._check_key_switching()
+        if self.primes is not None:
+            result = eval_mult_rns(c_1, c_2, self.primes, self.mod_t, self._switch_key(rlk),
+                self.special_primes)
+        else:
+            result = eval_mult(c_1, c_2, self.mod_q, self.mod_t, self.mod_p, self.poly_mod, rlk)
+        return self._propagate(result, (c_1, c_2), self.estimator.mult)
+
+    def eval_sum(self, ciphers) -> tuple:
+        '''
+        Adds many ciphertexts with lazy modular reduction (see eval_sum()).
+        Takes as input:
+            ciphers: an iterable of ciphertexts or an array of stacked ciphertexts.
+        Returns:
+            The encrypted sum as ciphertext.
+        '''
+        result = eval_sum(ciphers, self.primes if self.primes is not None else self.mod_q)
+        if isinstance(ciphers, (list, tuple)):
+            return self._propagate(result, tuple(ciphers), lambda *noises: sum(noises))
+        return result
+
+    def accumulator(self):
+        '''
+        Creates a streaming CipherAccumulator for this context.
+        Returns:
+            An empty CipherAccumulator.
+        '''
+        return CipherAccumulator(self.primes if self.primes is not None else self.mod_q)
+
+    def eval_product(self, ciphers:list, rlk:tuple, workers:int=1) -> tuple:
+        '''
+        Multiplies many ciphertexts using a balanced product tree.
+        Takes as input:
+            ciphers: the list of ciphertexts to multiply.
+            rlk: the relinearization key generated via rlk_gen().
+            workers: the number of worker processes multiplying independent subtrees.
+        Returns:
+            The encrypted product as ciphertext.
+        '''
+        self._check_key_switching()
+        if self.primes is not None:
+            result = eval_product_rns(ciphers, self.primes, self.mod_t, self._switch_key(rlk),
+                workers, self.special_primes)
+        else:
+            result = eval_product(ciphers, self.mod_q, self.mod_t, self.mod_p, self.poly_mod, rlk,
+                workers)
+        return self._propagate(result, tuple(ciphers),
+            lambda *noises: self.estimator.product(noises))
+
+    def eval_pow(self, cipher:tuple, exponent:int, rlk:tuple) -> tuple:
+        '''
+        Raises a ciphertext to a public power via right-to-left square-and-multiply.
+        Each squaring selected by the bits of the exponent is multiplied onto the product
+        of the previous ones, which never lies deeper than the squaring itself, so that
+        the multiplicative depth is ceil(log2(exponent)), the minimum for any schedule.
+        Takes as input:
+            cipher: the ciphertext to take as base.
+            exponent: the (positive) exponent.
+            rlk: the relinearization key generated via rlk_gen().
+        Returns:
+            The encrypted power as ciphertext.
+        '''
+        if exponent < 1:
+            raise ValueError("The exponent has to be a positive integer.")
+        result = None
+        square = cipher
+        while True:
+            if exponent & 1:
+                result = square if result is None else self.eval_mult(result, square, rlk)
+            exponent >>= 1
+            if not exponent:
+                break
+            square = self.eval_mult(square, square, rlk)
+        return result
+
+    def eval_poly(self, cipher:tuple, coeffs:list, rlk:tuple) -> tuple:
+        '''
+        Evaluates a public polynomial p(x) = coeffs[0] + coeffs[1]*x + ... on a ciphertext.
+        Uses a Paterson-Stockmeyer style baby-step giant-step schedule: the powers x..x^k
+        (k = ceil(sqrt(d+1)) for degree d) are computed once, blocks of k coefficients are
+        combined via plaintext multiplications only, and the blocks are joined via Horner's
+        rule in x^k. This requires about 2*sqrt(d) instead of d-1 ciphertext multiplications.
+        Takes as input:
+            cipher: the ciphertext to evaluate the polynomial on.
+            coeffs: the integer coefficients of p(x) in ascending order (degree at least 1).
+            rlk: the relinearization key generated via rlk_gen().
+        Returns:
+            The encrypted evaluation p(x) as ciphertext.
+        '''
+        coeffs = [int(coeff) % self.mod_t for coeff in coeffs]
+        while coeffs and not coeffs[-1]:
+            coeffs.pop()
+        degree = len(coeffs) - 1
+        if degree < 1:
+            raise ValueError("The polynomial has to be at least of degree 1.")
+        step = min(math.isqrt(degree) + 1, degree)
+        # Baby steps: x^i = x^(i//2) * x^(i-i//2) keeps the depth at ceil(log2(i))
+        powers = {1: cipher}
+        for i in range(2, step + 1):
+            powers[i] = self.eval_mult(powers[i//2], powers[i - i//2], rlk)
+
+        def eval_block(block):
+            # Combines a block via plaintext operations, returns (ciphertext or None, constant)
+            acc = None
+            for i, coeff in enumerate(block[1:], 1):
+                if coeff:
+                    term = self.eval_mult_plain(powers[i], coeff)
+                    acc = term if acc is None else self.eval_add(acc, term)
+            return acc, block[0]
+
+        # Giant steps: Horner's rule in x^step over the coefficient blocks
+        blocks = [coeffs[j:j + step] for j in range(0, degree + 1, step)]
+        result, const = eval_block(blocks[-1])
+        for block in reversed(blocks[:-1]):
+            prod = None if result is None else self.eval_mult(result, powers[step], rlk)
+            if const:
+                scaled = self.eval_mult_plain(powers[step], const)
+                prod = scaled if prod is None else self.eval_add(prod, scaled)
+            acc, const = eval_block(block)
+            result = prod if acc is None else self.eval_add(prod, acc)
+        return self.eval_add_plain(result, const) if const else result
+
+    def eval_tensor(self, c_1:tuple, c_2:tuple) -> tuple:
+        '''
+        Multiplies two ciphertexts without relinearization.
+        Takes as input:
+            c_1: first ciphertext to take as base.
+            c_2: second ciphertext to multiply with base.
+        Returns:
+            The encrypted product as three-component ciphertext (see relinearize()).
+        '''
+        if self.primes is not None:
+            result = eval_tensor_rns(c_1, c_2, self.primes, self.mod_t)
+        else:
+            result = eval_tensor(c_1, c_2, self.mod_q, self.mod_t, self.poly_mod)
+        return self._propagate(result, (c_1, c_2), self.estimator.tensor)
+
+    def relinearize(self, cipher:tuple, rlk:tuple) -> tuple:
+        '''
+        Relinearizes a three-component ciphertext into a regular ciphertext.
+        Takes as input:
+            cipher: the three-component ciphertext generated via eval_tensor().
+            rlk: the relinearization key generated via rlk_gen().
+        Returns:
+            The relinearized ciphertext.
+        '''
+        self._check_key_switching()
+        if self.primes is not None:
+            result = relinearize_rns(cipher, self.primes, self._switch_key(rlk),
+                self.special_primes)
+        else:
+            result = relinearize(cipher, self.mod_q, self.mod_p, self.poly_mod, rlk)
+        return self._propagate(result, (cipher,), self.estimator.relinearize)
+
+    def eval_add_plain(self, cipher:tuple, mess) -> tuple:
+        '''
+        Adds a public plaintext to a ciphertext.
+        Takes as input:
+            cipher: the ciphertext to take as base.
+            mess: plaintext integer message or plaintext polynomial to add.
+        Returns:
+            The encrypted sum as ciphertext.
+        '''
+        if self.primes is not None:
+            result = eval_add_plain_rns(cipher, mess, self.primes, self.mod_t)
+        else:
+            result = eval_add_plain(cipher, mess, self.mod_q, self.mod_t, self.poly_mod)
+        return self._propagate(result, (cipher,), self.estimator.add_plain)
+
+    def galois_key_gen(self, priv_key:list, steps:list=None, seeded:bool=False) -> dict:
+        '''
+        Generates the Galois keys for slot rotations.
+        Takes as input:
+            priv_key: private key generated via key_pair_gen().
+            steps: the rotation steps to generate keys for, None denoting the row swap
+                (defaults to the keys required by eval_sum_slots()).
+            seeded: if True, the uniform parts of the keys are replaced by their seeds.
+        Returns:
+            A dict mapping each Galois element to its key.
+        '''
+        self._check_key_switching()
+        elts = None if steps is None else [2 * self.len_n - 1 if step is None
+            else rotation_galois_elt(step, self.len_n) for step in steps]
+        if self.primes is not None:
+            return galois_key_gen_rns(self.len_n, self.primes, priv_key, self.std_dev2, elts,
+                seeded, self.special_primes)
+        return galois_key_gen(self.len_n, self.mod_q, self.mod_p, self.poly_mod, priv_key,
+            self.std_dev2, elts, seeded, self.base_bits)
+
+    def eval_galois(self, cipher:tuple, galois_elt:int, galois_keys:dict) -> tuple:
+        '''
+        Applies the automorphism x -> x^galois_elt to the plaintext of a ciphertext.
+        Takes as input:
+            cipher: the ciphertext to take as base.
+            galois_elt: the odd Galois element.
+            galois_keys: the Galois keys generated via galois_key_gen().
+        Returns:
+            The ciphertext of the automorphed plaintext.
+        '''
+        self._check_key_switching()
+        if self.primes is not None:
+            result = eval_galois_many_rns(cipher, [galois_elt], self.primes,
+                self._galois_switch_keys(galois_keys, [galois_elt]), self.special_primes)[0]
+        else:
+            result = eval_galois(cipher, galois_elt, self.mod_q, self.mod_p, self.poly_mod,
+                galois_keys)
+        return self._propagate(result, (cipher,), self.estimator.relinearize)
+
+    def eval_rotate(self, cipher:tuple, steps:int, galois_keys:dict) -> tuple:
+        '''
+        Rotates both rows of batching slots by steps to the left.
+        Takes as input:
+            cipher: the ciphertext to rotate.
+            steps: the number of slots to rotate by (negative values rotate to the right).
+            galois_keys: the Galois keys generated via galois_key_gen().
+        Returns:
+            The rotated ciphertext.
+        '''
+        return self.eval_galois(cipher, rotation_galois_elt(steps, self.len_n), galois_keys)
+
+    def eval_rotate_rows(self, cipher:tuple, galois_keys:dict) -> tuple:
+        '''
+        Swaps the two rows of batching slots.
+        Takes as input:
+            cipher: the ciphertext to take as base.
+            galois_keys: the Galois keys generated via galois_key_gen().
+        Returns:
+            The ciphertext with swapped rows.
+        '''
+        return self.eval_galois(cipher, 2 * self.len_n - 1, galois_keys)
+
+    def eval_rotate_many(self, cipher:tuple, steps:list, galois_keys:dict) -> list:
+        '''
+        Rotates the same ciphertext by several steps, hoisting the shared lift and NTT
+        of c2 for the RNS backend (see eval_galois_many_rns()).
+        Takes as input:
+            cipher: the ciphertext to rotate.
+            steps: the list of rotation steps.
+            galois_keys: the Galois keys generated via galois_key_gen().
+        Returns:
+            The list of rotated ciphertexts.
+        '''
+        self._check_key_switching()
+        if self.primes is None:
+            return [self.eval_rotate(cipher, step, galois_keys) for step in steps]
+        elts = [rotation_galois_elt(step, self.len_n) for step in steps]
+        return [self._propagate(result, (cipher,), self.estimator.relinearize) for result
+            in eval_galois_many_rns(cipher, elts, self.primes,
+                self._galois_switch_keys(galois_keys, elts), self.special_primes)]
+
+    def eval_sum_slots(self, cipher:tuple, galois_keys:dict) -> tuple:
+        '''
+        Sums all batching slots with log2(len_n) rotations, every slot then holds the total.
+        Takes as input:
+            cipher: the ciphertext to sum up.
+            galois_keys: the Galois keys generated via galois_key_gen() (default steps).
+        Returns:
+            The ciphertext holding the sum of all slots in each slot.
+        '''
+        for elt in sum_slots_galois_elts(self.len_n):
+            cipher = self.eval_add(cipher, self.eval_galois(cipher, elt, galois_keys))
+        return cipher
+
+    def switched_context(self, new_q):
+        '''
+        Returns the context matching ciphertexts switched to new_q (see mod_switch()),
+        e.g. to deserialize and decrypt them. It is created once per modulus and cached.
+        The private key of this context remains valid, relinearization and Galois keys do
+        not, so the switched context rejects relinearization and rotations.
+        Takes as input:
+            new_q: the new ciphertext modulus or RNS basis.
+        Returns:
+            The BFVContext for the modulus new_q.
+        '''
+        new_q = tuple(new_q) if isinstance(new_q, (tuple, list)) else int(new_q)
+        context = self._switched.get(new_q)
+        if context is None:
+            context = BFVContext(self.len_n, new_q, self.mod_t, self.std_dev, mod_p=1,
+                std_dev2=self.std_dev2, track_noise=self.track_noise) # p is never used
+            context._decrypt_only = True
+            self._switched[new_q] = context
+        return context
+
+    def mod_switch(self, cipher:tuple, new_q=None) -> tuple:
+        '''
+        Switches a ciphertext to a smaller modulus, e.g. before serialization. For the RNS
+        backend, new_q can either be a prefix of the RNS basis (moduli chain) or an integer
+        modulus, in which case the result is a regular int64 ciphertext.
+        Takes as input:
+            cipher: the ciphertext to switch.
+            new_q: the new ciphertext modulus or RNS basis. For a TrackedCipher it defaults
+                to the smallest power of two keeping a positive noise budget (raises a
+                ValueError if there is none, see NoiseEstimator.min_modulus_bits()).
+        Returns:
+            The ciphertext modulo new_q (see switched_context()).
+        '''
+        if new_q is None:
+            new_q = 2**self.estimator.min_modulus_bits(cipher.noise)
+        if isinstance(new_q, (tuple, list)):
+            if self.primes is None:
+                raise ValueError("Switching to an RNS basis requires the RNS backend.")
+            result = mod_switch_rns(cipher, self.primes, tuple(new_q))
+            new_mod = math.prod(new_q)
+        else:
+            if new_q >= self.mod_q:
+                raise ValueError("The new modulus has to be smaller than the current modulus.")
+            lifted = cipher if self.primes is None \
+                else tuple(residues_to_poly(comp, self.primes) for comp in cipher)
+            result = mod_switch(lifted, self.mod_q, new_q)
+            new_mod = new_q
+        return self._propagate(result, (cipher,),
+            lambda noise: self.estimator.mod_switch(noise, new_mod))
+
+    def eval_mult_plain(self, cipher:tuple, mess) -> tuple:
+        '''
+        Multiplies a ciphertext by a public plaintext.
+        Takes as input:
+            cipher: the ciphertext to take as base.
+            mess: plaintext integer message or plaintext polynomial to multiply with base.
+        Returns:
+            The encrypted product as ciphertext.
+        '''
+        if self.primes is not None:
+            result = eval_mult_plain_rns(cipher, mess, self.primes, self.mod_t)
+        else:
+            result = eval_mult_plain(cipher, mess, self.mod_q, self.mod_t, self.poly_mod)
+        return self._propagate(result, (cipher,),
+            lambda noise: self.estimator.mult_plain(noise, mess))
+
+
+# Object Interface
+# Keys, plaintexts and ciphertexts bound to their BFVContext. For the RNS backend, ciphertexts
+# are kept within the NTT (evaluation) domain wherever possible: fresh encryptions, additions
+# and plaintext multiplications are computed pointwise on NTT form operands, the inverse
+# transforms are only applied lazily when tensoring, decrypting or serializing (to_tuple()).
+class Plaintext:
+    '''
+    Encoded plaintext polynomial within R_t bound to its context.
+    Takes as input:
+        context: the BFVContext.
+        mess: plaintext integer message or plaintext polynomial (see encode_message()).
+    '''
+    __slots__ = ("context", "poly", "_ntt")
+
+    def __init__(self, context:BFVContext, mess):
+        self.context = context
+        self.poly = encode_message(mess, context.len_n, context.mod_t)
+        self._ntt = None
+
+    def __neg__(self):
+        return Plaintext(self.context, -self.poly)
+
+    def scalar(self):
+        '''Returns the centered constant coefficient if the plaintext is a constant, else None.'''
+        if self.poly[1:].any():
+            return None
+        mod_t = self.context.mod_t
+        return int(self.poly[0]) - mod_t if self.poly[0] > mod_t // 2 else int(self.poly[0])
+
+    def ntt_form(self):
+        '''Returns the NTT form of the centered plaintext modulo the RNS basis (cached).'''
+        if self._ntt is None:
+            context = self.context
+            centered = numpy.where(self.poly > context.mod_t // 2, self.poly - context.mod_t,
+                self.poly)
+            self._ntt = ntt_forward(poly_to_residues(centered, context.primes),
+                ntt_tables(context.len_n, context.primes))
+        return self._ntt
+
+def _check_decryptable(cipher):
+    # Decrypting a three-component product with the two-component formula yields garbage
+    if len(cipher) != 2:
+        raise ValueError("Only two-component ciphertexts can be decrypted, relinearize first.")
+
+class SecretKey:
+    '''
+    Private key bound to its context.
+    Takes as input:
+        context: the BFVContext.
+        poly: the private key generated via BFVContext.key_pair_gen().
+    '''
+    __slots__ = ("context", "poly", "_ntt")
+
+    def __init__(self, context:BFVContext, poly):
+        self.context = context
+        self.poly = numpy.asarray(poly)
+        self._ntt = None
+
+    def ntt_form(self):
+        '''Returns the NTT form of the private key modulo the RNS basis (cached).'''
+        if self._ntt is None:
+            context = self.context
+            self._ntt = ntt_forward(poly_to_residues(self.poly, context.primes),
+                ntt_tables(context.len_n, context.primes))
+        return self._ntt
+
+    def decrypt_poly(self, cipher):
+        '''
+        Decrypts a ciphertext into the full plaintext polynomial. NTT form ciphertexts are
+        decrypted within the NTT domain, which requires only a single inverse transform.
+        Takes as input:
+            cipher: the Ciphertext (or ciphertext tuple) to decrypt.
+        Returns:
+            The decrypted plaintext polynomial as int64 coefficient array.
+        '''
+        context = self.context
+        _check_decryptable(cipher)
+        if not isinstance(cipher, Ciphertext):
+            return context.decrypt_poly(cipher, self.poly)
+        if not cipher.ntt_form:
+            return context.decrypt_poly(cipher.components, self.poly)
+        tables = ntt_tables(context.len_n, context.primes)
+        c_1, c_2 = cipher.components
+        workspace = context.workspace
+        scratch = _scratch(workspace, "decrypt_quotient", c_1.shape)
+        scaled_m = mod_mul(c_2, self.ntt_form(), context.moduli, tables["barrett"],
+            out=_scratch(workspace, "decrypt_product", c_1.shape), scratch=scratch)
+        mod_add(c_1, scaled_m, context.moduli, out=scaled_m, scratch=scratch)
+        scaled_m = residues_to_poly(ntt_inverse(scaled_m, tables, scaled_m, workspace),
+            context.primes)
+        return (round_scale(scaled_m, context.mod_t, context.mod_q) % context.mod_t) \
+            .astype(numpy.int64)
+
+    def decrypt(self, cipher):
+        '''
+        Decrypts a ciphertext holding an integer message.
+        Takes as input:
+            cipher: the Ciphertext (or ciphertext tuple) to decrypt.
+        Returns:
+            The decrypted integer message.
+        '''
+        _check_decryptable(cipher)
+        if isinstance(cipher, Ciphertext) and cipher.ntt_form:
+            return self.decrypt_poly(cipher)[0]
+        cipher = cipher.components if isinstance(cipher, Ciphertext) else cipher
+        return self.context.decrypt(cipher, self.poly)
+
+class PublicKey:
+    '''
+    Public key bound to its context, seeded keys are expanded once.
+    Takes as input:
+        context: the BFVContext.
+        key: the (seeded) public key generated via BFVContext.key_pair_gen().
+    '''
+    __slots__ = ("context", "key", "_ntt")
+
+    def __init__(self, context:BFVContext, key:tuple):
+        self.context = context
+        self.key = context.expand_key(key)
+        self._ntt = None
+
+    def ntt_form(self) -> tuple:
+        '''Returns the NTT form of both public key components (cached).'''
+        if self._ntt is None:
+            tables = ntt_tables(self.context.len_n, self.context.primes)
+            self._ntt = tuple(ntt_forward(comp, tables) for comp in self.key)
+        return self._ntt
+
+    def encrypt(self, mess):
+        '''
+        Encrypts an integer message or a plaintext polynomial. For the RNS backend, the
+        ciphertext is computed and returned in NTT form: only u, e1+delta*m and e2 are
+        transformed (jointly), the public key is transformed once and cached.
+        Takes as input:
+            mess: plaintext integer message, plaintext polynomial or Plaintext.
+        Returns:
+            The encrypted Ciphertext.
+        '''
+        context = self.context
+        poly = mess.poly if isinstance(mess, Plaintext) else mess
+        if context.primes is None:
+            return Ciphertext(context, context.encrypt(poly, self.key))
+        primes, len_n, moduli = context.primes, context.len_n, context.moduli
+        workspace = context.workspace
+        tables = ntt_tables(len_n, primes)
+        shape = (len(primes), len_n)
+        scale = poly_to_residues(encode_message(poly, len_n, context.mod_t), primes)
+        rns_mult_scalar(scale, context.delta, primes, out=scale, workspace=workspace)
+        error1_poly = poly_to_residues(gauss_poly_gen(len_n, context.std_dev), primes)
+        stacked = numpy.stack([poly_to_residues(ternary_poly_gen(len_n), primes),
+            mod_add(error1_poly, scale, moduli, out=error1_poly,
+                scratch=_scratch(workspace, "encrypt_scale", shape)),
+            poly_to_residues(gauss_poly_gen(len_n, context.std_dev), primes)],
+            out=_scratch(workspace, "encrypt_stack", (3,) + shape))
+        u_poly, error1_poly, error2_poly = ntt_forward(stacked, tables, stacked, workspace)
+        scratch = _scratch(workspace, "encrypt_quotient", shape)
+        components = []
+        for key_part, error in zip(self.ntt_form(), (error1_poly, error2_poly)):
+            # Only the ciphertext components themselves are allocated
+            component = mod_mul(key_part, u_poly, moduli, tables["barrett"], scratch=scratch)
+            components.append(mod_add(component, error, moduli, out=component, scratch=scratch))
+        return Ciphertext(context, components, ntt_form=True,
+            noise=context.estimator.fresh() if context.track_noise else None)
+
+class Ciphertext:
+    '''
+    Ciphertext bound to its context, supporting +, - and * with ciphertexts, Plaintexts and
+    integer messages or plaintext polynomials. Multiplying two ciphertexts only tensors them
+    (see BFVContext.eval_tensor()), the result has to be relinearized via relinearize().
+    Takes as input:
+        context: the BFVContext.
+        components: the ciphertext tuple (a TrackedCipher passes on its noise bound).
+        ntt_form: True if the components are given within the NTT domain (RNS backend only).
+        noise: the analytic noise bound (see NoiseEstimator), None if untracked.
+    '''
+    __slots__ = ("context", "components", "ntt_form", "noise")
+
+    def __init__(self, context:BFVContext, components:tuple, ntt_form:bool=False,
+        noise:float=None):
+        if ntt_form and context.primes is None:
+            raise ValueError("The NTT domain is only available for the RNS backend.")
+        if noise is None and isinstance(components, TrackedCipher):
+            noise = components.noise
+        self.context = context
+        self.components = tuple(components)
+        self.ntt_form = ntt_form
+        self.noise = noise
+
+    def __len__(self):
+        return len(self.components)
+
+    def __repr__(self):
+        domain = "ntt" if self.ntt_form else "coeff"
+        return f"Ciphertext(size={len(self)}, domain={domain}, noise={self.noise})"
+
+    def to_ntt(self):
+        '''Returns the ciphertext within the NTT domain (unchanged for the integer backend).'''
+        if self.ntt_form or self.context.primes is None:
+            return self
+        tables = ntt_tables(self.context.len_n, self.context.primes)
+        return Ciphertext(self.context, tuple(ntt_forward(comp, tables)
+            for comp in self.components), True, self.noise)
+
+    def to_coeff(self):
+        '''Returns the ciphertext within the coefficient domain.'''
+        if not self.ntt_form:
+            return self
+        tables = ntt_tables(self.context.len_n, self.context.primes)
+        return Ciphertext(self.context, tuple(ntt_inverse(comp, tables)
+            for comp in self.components), False, self.noise)
+
+    def to_tuple(self) -> tuple:
+        '''
+        Returns the plain ciphertext tuple within the coefficient domain, e.g. for
+        serialization or the functions of this module (a TrackedCipher if the noise is tracked).
+        '''
+        components = self.to_coeff().components
+        return components if self.noise is None else TrackedCipher(components, self.noise)
+
+    def _estimate(self, estimate, *noises):
+        # Propagates the noise bound if all operands are tracked
+        return None if None in (self.noise,) + noises else estimate(self.noise, *noises)
+
+    def _operand(self, other):
+        if isinstance(other, Ciphertext):
+            if other.context is not self.context:
+                raise ValueError("The ciphertexts belong to different contexts.")
+            return other
+        return other if isinstance(other, Plaintext) else Plaintext(self.context, other)
+
+    def __add__(self, other):
+        context, other = self.context, self._operand(other)
+        if isinstance(other, Plaintext):
+            if not self.ntt_form:
+                return Ciphertext(context, context.eval_add_plain(self.to_tuple(), other.poly))
+            scale = ntt_forward(rns_mult_scalar(poly_to_residues(other.poly, context.primes),
+                context.delta, context.primes), ntt_tables(context.len_n, context.primes))
+            return Ciphertext(context, (mod_add(self.components[0], scale, context.moduli),
+                *self.components[1:]), True, self._estimate(context.estimator.add_plain))
+        if len(self) != len(other):
+            raise ValueError("Ciphertexts of different sizes cannot be added, relinearize first.")
+        noise = self._estimate(context.estimator.add, other.noise)
+        if not (self.ntt_form or other.ntt_form):
+            return Ciphertext(context, context.eval_add(self.components, other.components),
+                noise=noise)
+        return Ciphertext(context, tuple(mod_add(comp_1, comp_2, context.moduli) for comp_1, comp_2
+            in zip(self.to_ntt().components, other.to_ntt().components)), True, noise)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        context = self.context
+        if context.primes is None:
+            components = tuple((-numpy.asarray(comp) % context.mod_q).astype(numpy.int64)
+                for comp in self.components)
+        else:
+            components = tuple(rns_neg_poly(comp, context.primes) for comp in self.components)
+        return Ciphertext(context, components, self.ntt_form, self.noise)
+
+    def __sub__(self, other):
+        return self + (-self._operand(other))
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __mul__(self, other):
+        context, other = self.context, self._operand(other)
+        if isinstance(other, Ciphertext):
+            return Ciphertext(context, context.eval_tensor(self.to_tuple(), other.to_tuple()))
+        scalar = other.scalar()
+        if context.primes is None or (scalar is not None and not self.ntt_form):
+            mess = other.poly if scalar is None else scalar
+            return Ciphertext(context, context.eval_mult_plain(self.to_tuple(), mess))
+        if scalar is not None:
+            components = tuple(rns_mult_scalar(comp, scalar, context.primes)
+                for comp in self.components)
+            return Ciphertext(context, components, True,
+                self._estimate(lambda noise: context.estimator.mult_plain(noise, scalar)))
+        barrett = ntt_tables(context.len_n, context.primes)["barrett"]
+        components = tuple(mod_mul(comp, other.ntt_form(), context.moduli, barrett)
+            for comp in self.to_ntt().components)
+        return Ciphertext(context, components, True,
+            self._estimate(lambda noise: context.estimator.mult_plain(noise, other.poly)))
+
+    __rmul__ = __mul__
+
+    def relinearize(self, rlk):
+        '''
+        Relinearizes a three-component ciphertext (see BFVContext.relinearize()).
+        Takes as input:
+            rlk: the relinearization key generated via BFVContext.rlk_gen().
+        Returns:
+            The relinearized Ciphertext within the coefficient domain.
+        '''
+        return Ciphertext(self.context, self.context.relinearize(self.to_tuple(), rlk))
+
+
+# Offline/Online Encryption
+class EncryptionPool:
+    '''
+    Bounded pool of precomputed fresh encryptions of zero (offline phase). Encrypting a
+    message online then only amounts to adding delta*m onto c1 of a pooled ciphertext,
+    which moves the sampling and both ring multiplications into idle periods.
+    Every pooled ciphertext is handed out exactly once, as reusing an encryption of zero
+    would leak the difference between two plaintexts.
+    Takes as input:
+        context: the BFVContext the encryptions are generated for.
+        pub_key: public key generated via context.key_pair_gen().
+        max_size: the maximum number of precomputed encryptions of zero.
+    '''
+    def __init__(self, context:BFVContext, pub_key:tuple, max_size:int=16):
+        if max_size < 1:
+            raise ValueError("The pool has to hold at least one encryption.")
+        self.context = context
+        self.pub_key = context.expand_key(pub_key) # expand a seeded key only once
+        self.max_size = max_size
+        self.pool = deque()
+
+    def __len__(self):
+        return len(self.pool)
+
+    def refill(self, count:int=None) -> int:
+        '''
+        Precomputes encryptions of zero (offline phase), bounded by max_size.
+        Takes as input:
+            count: the maximum number of encryptions to add (defaults to filling the pool).
+        Returns:
+            The number of encryptions added to the pool.
+        '''
+        missing = self.max_size - len(self.pool)
+        if count is not None:
+            missing = min(missing, count)
+        if missing > 0:
+            self.pool.extend(self.context.encrypt_many(numpy.zeros(missing, dtype=numpy.int64),
+                self.pub_key))
+        return max(missing, 0)
+
+    def encrypt(self, mess) -> tuple:
+        '''
+        Encrypts a message by consuming one precomputed encryption of zero (online phase).
+        Falls back to a regular encryption if the pool is empty.
+        Takes as input:
+            mess: plaintext integer message or plaintext polynomial.
+        Returns:
+            The encrypted ciphertext C=(C1,C2).
+        '''
+        if not self.pool:
+            return self.context.encrypt(mess, self.pub_key)
+        c_1, c_2 = self.pool.popleft()
+        context = self.context
+        encoded_m = encode_message(mess, context.len_n, context.mod_t)
+        if context.primes is not None:
+            scale = poly_to_residues(encoded_m, context.primes) * context.delta_rns \
+                % context.moduli
+            cipher = (rns_add_polys(c_1, scale, context.primes), c_2)
+        else:
+            cipher = (add_polys(c_1, context.delta * encoded_m, context.mod_q, context.poly_mod),
+                c_2)
+        # A pooled encryption carries the noise of a fresh one, as context.encrypt() does
+        return context.track(cipher) if context.track_noise else cipher
+
+    def save(self, path:str):
+        '''
+        Persists the pooled encryptions of zero (e.g. across device reboots).
+        Takes as input:
+            path: the file path of the compressed .npz file.
+        '''
+        numpy.savez_compressed(path, numpy.array(list(self.pool)))
+
+    def load(self, path:str) -> int:
+        '''
+        Loads persisted encryptions of zero into the pool (up to max_size). The file is
+        removed afterwards, so that no encryption of zero can ever be used twice.
+        Takes as input:
+            path: the file path of the compressed .npz file.
+        Returns:
+            The number of encryptions added to the pool.
+        '''
+        with numpy.load(path) as stored:
+            ciphers = stored['arr_0']
+        os.remove(path)
+        count = max(min(len(ciphers), self.max_size - len(self.pool)), 0)
+        self.pool.extend(ciphers[:count])
+        return count
+
+
+# Encrypted Aggregation
+class CipherAccumulator:
+    '''
+    Streaming accumulator adding many ciphertexts within a wide integer buffer.
+    As all ciphertext coefficients are reduced (within [0, mod_q) or [0, p_i) per RNS limb),
+    the buffer can absorb a fixed number of operands before it could overflow. The modular
+    reduction is thus only performed once this headroom runs out or at finalization.
+    Takes as input:
+        mod_q: the ciphertext modulus, or the tuple of RNS primes for the RNS backend.
+    '''
+    def __init__(self, mod_q):
+        if isinstance(mod_q, (tuple, list)):
+            self.moduli = numpy.array(mod_q, dtype=numpy.uint64)[:, None]
+            self.dtype = numpy.uint64
+            self.headroom = (2**64 - 1) // (max(mod_q) - 1)
+        else:
+            self.moduli = mod_q
+            self.dtype = numpy.int64
+            self.headroom = (2**63 - 1) // (mod_q - 1)
+        self.buffer = None
+        self.pending = 0 # number of operands currently held by the buffer
+        self.count = 0
+        self.reductions = 0
+
+    def __len__(self):
+        return self.count
+
+    def _reduce(self):
+        self.buffer %= self.moduli
+        self.pending = 1
+        self.reductions += 1
+
+    def add(self, cipher:tuple):
+        '''
+        Adds a single ciphertext (two or three components) to the accumulator.
+        Takes as input:
+            cipher: the (expanded) ciphertext to add.
+        '''
+        cipher = numpy.asarray(cipher, dtype=self.dtype)
+        if self.buffer is None:
+            self.buffer = cipher.copy()
+        else:
+            if self.pending == self.headroom:
+                self._reduce()
+            self.buffer += cipher
+        self.pending += 1
+        self.count += 1
+
+    def add_many(self, ciphers):
+        '''
+        Adds a stacked batch of ciphertexts (e.g. from encrypt_many()) to the accumulator.
+        Takes as input:
+            ciphers: the ciphertexts as an array of shape (k, components, ...).
+        '''
+        ciphers = numpy.asarray(ciphers, dtype=self.dtype)
+        start = 0
+        while start < len(ciphers):
+            if self.buffer is None:
+                self.buffer = numpy.zeros(ciphers.shape[1:], dtype=self.dtype)
+            elif self.pending == self.headroom:
+                self._reduce()
+            stop = min(len(ciphers), start + self.headroom - self.pending)
+            self.buffer += ciphers[start:stop].sum(axis=0, dtype=self.dtype)
+            self.pending += stop - start
+            self.count += stop - start
+            start = stop
+
+    def result(self) -> tuple:
+        '''
+        Finalizes the summation.
+        Returns:
+            The encrypted sum as a ciphertext tuple.
+        '''
+        if self.buffer is None:
+            raise ValueError("Cannot finalize an empty accumulator.")
+        self._reduce()
+        return tuple(comp.copy() for comp in self.buffer)
+
+def eval_sum(ciphers, mod_q) -> tuple:
+    '''
+    Adds many ciphertexts in one streaming pass with lazy modular reduction.
+    Takes as input:
+        ciphers: an iterable of ciphertexts or an array of stacked ciphertexts.
+        mod_q: the ciphertext modulus, or the tuple of RNS primes for the RNS backend.
+    Returns:
+        The encrypted sum as a ciphertext tuple.
+    '''
+    accumulator = CipherAccumulator(mod_q)
+    if isinstance(ciphers, numpy.ndarray):
+        accumulator.add_many(ciphers)
+    else:
+        for cipher in ciphers:
+            accumulator.add(cipher)
+    return accumulator.result()
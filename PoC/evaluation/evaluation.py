@@ -16,23 +16,45 @@ from os.path import exists
 with open("./config/config.json", "r") as config_f:
     CONFIG = json.load(config_f)
 TOPIC = f"Meters/{CONFIG['scheme']}/kw/" # topic to subscribe to
+# Smallest BFV parameters meeting the requirements in the config (the stored keys depend on them)
+BFV_CONTEXT = bfv_python.BFVContext.from_requirements(**CONFIG["bfv"])
 
 # Set Message Queue #
 q=Queue() # initialise queue
 
+def load_c2(text):
+    '''Parses c2 of a bfv_python ciphertext, expanding it from its seed for seeded ciphertexts.'''
+    if text.startswith("["):
+        return numpy.array(json.loads(text), dtype=BFV_CONTEXT.dtype)
+    return BFV_CONTEXT.expand_cipher((None, bytes.fromhex(text)))[1]
+
+def dump_result(cipher):
+    '''Switches an evaluation result to the smallest modulus fitting its noise and serializes it as c1|c2|q (c1|c2 if it cannot be switched).'''
+    try:
+        new_q = 2**BFV_CONTEXT.estimator.min_modulus_bits(cipher.noise)
+    except ValueError: # no budget to trade for a smaller modulus, keep the current one
+        c1 = json.dumps(cipher[0].tolist())
+        c2 = json.dumps(cipher[1].tolist())
+        return (c1+"|"+c2).replace(" ", "")
+    switched = BFV_CONTEXT.mod_switch(cipher, new_q)
+    c1 = json.dumps(switched[0].tolist())
+    c2 = json.dumps(switched[1].tolist())
+    return (c1+"|"+c2+"|"+str(new_q)).replace(" ", "")
+
 def decrypt(message):
     '''Function to handle decryption of incoming messages'''
     if CONFIG["scheme"] == "bfv_python":
         message = message.decode('utf8')
-        n = 4096
-        q = 2**54
-        t = 40961
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
         priv = numpy.load('config/priv.bfv.npz')['arr_0']
+        BFV_CONTEXT.check_key(priv)
         enc_mess = message.split("|")
-        c1 = numpy.array(json.loads(enc_mess[0]))
-        c2 = numpy.array(json.loads(enc_mess[1]))
-        return bfv_python.decrypt_cipher((c1,c2),priv,q,t,poly_mod)
+        if len(enc_mess) == 3: # evaluation result switched to a smaller modulus
+            context = BFV_CONTEXT.switched_context(int(enc_mess[2]))
+            c1, c2 = (numpy.array(json.loads(c), dtype=context.dtype) for c in enc_mess[:2])
+            return context.decrypt((c1,c2),priv)
+        c1 = numpy.array(json.loads(enc_mess[0]), dtype=BFV_CONTEXT.dtype)
+        c2 = load_c2(enc_mess[1])
+        return BFV_CONTEXT.decrypt((c1,c2),priv)
     
     elif CONFIG["scheme"] == "RSA":
         with open('config/priv.rsa.pem', mode='rb') as priv_f:
@@ -60,24 +82,20 @@ def decrypt(message):
 def encrypt(message):
     '''Encrypts energy reading with specified scheme in Config'''
     if CONFIG["scheme"] == "bfv_python":
-        n = 4096
-        q = 2**54
-        t = 40961
-        std_dev = 3.2
-        p = 2
-        std_dev2 = 1.6
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
         if not exists('config/priv.bfv.npz') or not exists('config/pub.bfv.npz') or not exists('config/rlk.bfv.npz'):
-            priv, pub = bfv_python.key_pair_gen(n, q, poly_mod, std_dev)
+            priv, pub = BFV_CONTEXT.key_pair_gen(seeded=True)
             numpy.savez_compressed('config/priv.bfv', priv)
-            numpy.savez_compressed('config/pub.bfv', pub)
-            rlk = bfv_python.rlk_gen(n, q, p, poly_mod, priv, std_dev2)
-            numpy.savez_compressed('config/rlk.bfv', rlk)
+            bfv_python.save_key('config/pub.bfv', pub)
+            rlk = BFV_CONTEXT.rlk_gen(priv, seeded=True)
+            bfv_python.save_key('config/rlk.bfv', rlk)
         else:
             priv = numpy.load('config/priv.bfv.npz')['arr_0']
-            pub = numpy.load('config/pub.bfv.npz')['arr_0']
-            rlk = numpy.load('config/rlk.bfv.npz')['arr_0']
-        enc_mess = bfv_python.encrypt_message(message, pub, n, q, t, poly_mod, std_dev)
+            pub = bfv_python.load_key('config/pub.bfv.npz')
+            rlk = bfv_python.load_key('config/rlk.bfv.npz')
+            BFV_CONTEXT.check_key(priv) # keys from other parameters would decrypt to garbage
+            BFV_CONTEXT.check_key(pub)
+            BFV_CONTEXT.check_key(rlk, relin=True)
+        enc_mess = BFV_CONTEXT.encrypt(message, pub)
         c1 = json.dumps(enc_mess[0].tolist())
         c2 = json.dumps(enc_mess[1].tolist())
         return (c1+"|"+c2).replace(" ", "")
@@ -132,21 +150,16 @@ def eval_add(m1, m2):
     if CONFIG["scheme"] == "bfv_python":
         m1 = m1.decode('utf8')
         m2 = m2.decode('utf8')
-        q = 2**54
-        n = 4096
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
         m1_split = m1.split("|")
-        m1_c1 = numpy.array(json.loads(m1_split[0]))
-        m1_c2 = numpy.array(json.loads(m1_split[1]))
-        enc_m1 = (m1_c1, m1_c2)
+        m1_c1 = numpy.array(json.loads(m1_split[0]), dtype=BFV_CONTEXT.dtype)
+        m1_c2 = load_c2(m1_split[1])
+        enc_m1 = BFV_CONTEXT.track((m1_c1, m1_c2)) # readings are fresh encryptions
         m2_split = m2.split("|")
-        m2_c1 = numpy.array(json.loads(m2_split[0]))
-        m2_c2 = numpy.array(json.loads(m2_split[1]))
-        enc_m2 = (m2_c1, m2_c2)
-        enc_sum = bfv_python.eval_add(enc_m1, enc_m2, q, poly_mod)
-        c1 = json.dumps(enc_sum[0].tolist())
-        c2 = json.dumps(enc_sum[1].tolist())
-        return (c1+"|"+c2).replace(" ", "")
+        m2_c1 = numpy.array(json.loads(m2_split[0]), dtype=BFV_CONTEXT.dtype)
+        m2_c2 = load_c2(m2_split[1])
+        enc_m2 = BFV_CONTEXT.track((m2_c1, m2_c2))
+        enc_sum = BFV_CONTEXT.eval_add(enc_m1, enc_m2)
+        return dump_result(enc_sum)
     elif CONFIG["scheme"] == "pyfhel-bfv":
         BFV = Pyfhel()
         BFV.contextGen(scheme='bfv', n=4096, t_bits=16, q=2**54)
@@ -172,24 +185,18 @@ def eval_mult(m1, m2):
     if CONFIG["scheme"] == "bfv_python":
         m1 = m1.decode('utf8')
         m2 = m2.decode('utf8')
-        q = 2**54
-        n = 4096
-        t = 40961
-        p = 2
-        poly_mod = numpy.array([1]+[0]*(n-1)+[1])
-        rlk = numpy.load('config/rlk.bfv.npz')['arr_0']
+        rlk = bfv_python.load_key('config/rlk.bfv.npz')
+        BFV_CONTEXT.check_key(rlk, relin=True)
         m1_split = m1.split("|")
-        m1_c1 = numpy.array(json.loads(m1_split[0]))
-        m1_c2 = numpy.array(json.loads(m1_split[1]))
-        enc_m1 = (m1_c1, m1_c2)
+        m1_c1 = numpy.array(json.loads(m1_split[0]), dtype=BFV_CONTEXT.dtype)
+        m1_c2 = load_c2(m1_split[1])
+        enc_m1 = BFV_CONTEXT.track((m1_c1, m1_c2)) # readings are fresh encryptions
         m2_split = m2.split("|")
-        m2_c1 = numpy.array(json.loads(m2_split[0]))
-        m2_c2 = numpy.array(json.loads(m2_split[1]))
-        enc_m2 = (m2_c1, m2_c2)
-        enc_prod = bfv_python.eval_mult(enc_m1, enc_m2, q, t, p, poly_mod, rlk)
-        c1 = json.dumps(enc_prod[0].tolist())
-        c2 = json.dumps(enc_prod[1].tolist())
-        return (c1+"|"+c2).replace(" ", "")
+        m2_c1 = numpy.array(json.loads(m2_split[0]), dtype=BFV_CONTEXT.dtype)
+        m2_c2 = load_c2(m2_split[1])
+        enc_m2 = BFV_CONTEXT.track((m2_c1, m2_c2))
+        enc_prod = BFV_CONTEXT.eval_mult(enc_m1, enc_m2, rlk)
+        return dump_result(enc_prod)
     elif CONFIG["scheme"] == "pyfhel-bfv":
         BFV = Pyfhel()
         BFV.contextGen(scheme='bfv', n=4096, t_bits=16, q=2**54)
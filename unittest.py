@@ -2,6 +2,7 @@
 
 import bfv_python
 import numpy
+import os
 
 ## Test Case: Key Generation ##
 print("Key Generation Testcase:")
@@ -78,4 +79,412 @@ print(f"dec_prod: {dec_prod}")
 # Calculate plaintext product
 m_prod = m1*m2
 print("Plaintext product of m1*m2:")
-print(f"m_prod: {m_prod}")
\ No newline at end of file
+print(f"m_prod: {m_prod}")
+
+## Test Case: NTT Multiplication ##
+print("\nNTT Multiplication Testcase:")
+# Set polynomials with coefficients beyond the float64 precision
+poly1 = numpy.array([2**52+1, -3, 0, 7])
+poly2 = numpy.array([5, 2**50-1, 1, -1])
+ntt_prod = bfv_python.negacyclic_mult(poly1, poly2, n)
+print(f"NTT product: {ntt_prod}")
+# Calculate schoolbook product within Z[x]/(x^n+1) using Python integers
+school_prod = [0]*n
+for i in range(n):
+    for j in range(n):
+        sign = 1 if i+j < n else -1
+        school_prod[(i+j) % n] += sign * int(poly1[i]) * int(poly2[j])
+print(f"Schoolbook product: {numpy.array(school_prod, dtype=object)}")
+
+
+## Test Case: Negacyclic Reduction ##
+print("\nNegacyclic Reduction Testcase:")
+# Reduce the degree 6 polynomial 1+2x+3x^2+4x^3+5x^4+6x^5+7x^6 mod x^4+1
+folded = bfv_python.negacyclic_reduce(numpy.array([1, 2, 3, 4, 5, 6, 7]), n)
+print(f"Folded polynomial: {folded}")
+print("Expected polynomial: [-4 -4 -4 4]")
+
+
+## Test Case: RNS Backend ##
+print("\nRNS Backend Testcase:")
+# Set the ciphertext modulus Q as a product of two NTT-friendly primes
+primes = bfv_python.rns_moduli_gen(n, 2)
+print(f"RNS basis: {primes}")
+priv_rns, pub_rns = bfv_python.key_pair_gen_rns(n, primes, std_dev)
+rlk_rns = bfv_python.rlk_gen_rns(n, primes, priv_rns, std_dev2)
+# Set messages
+m1 = 5
+m2 = 3
+# Encrypt the messages
+c1 = bfv_python.encrypt_message_rns(m1, pub_rns, n, primes, t, std_dev)
+c2 = bfv_python.encrypt_message_rns(m2, pub_rns, n, primes, t, std_dev)
+# Evaluate and decrypt results
+c_sum = bfv_python.eval_add_rns(c1, c2, primes)
+c_prod = bfv_python.eval_mult_rns(c1, c2, primes, t, rlk_rns)
+print(f"Decrypted c1: {bfv_python.decrypt_cipher_rns(c1, priv_rns, primes, t)} | m1: {m1}")
+print(f"Decrypted sum: {bfv_python.decrypt_cipher_rns(c_sum, priv_rns, primes, t)} | m_sum: {(m1+m2)%t}")
+print(f"Decrypted product: {bfv_python.decrypt_cipher_rns(c_prod, priv_rns, primes, t)} | m_prod: {(m1*m2)%t}")
+
+
+## Test Case: Batch Encoding ##
+print("\nBatch Encoding Testcase:")
+# Set parameters allowing batching (t prime and t = 1 mod 2n)
+n = 2**4
+t = 97
+q = 2**40
+p = 2**20
+polynom_modulus = numpy.array([1]+[0]*(n-1)+[1])
+encoder = bfv_python.BatchEncoder(n, t)
+priv_key, pub_key = bfv_python.key_pair_gen(n, q, polynom_modulus, std_dev)
+rlk = bfv_python.rlk_gen(n, q, p, polynom_modulus, priv_key, std_dev2)
+# Set message vectors and encrypt them into one ciphertext each
+v1 = numpy.arange(n)
+v2 = numpy.arange(n) + 5
+c1 = bfv_python.encrypt_message(encoder.encode(v1), pub_key, n, q, t, polynom_modulus, std_dev)
+c2 = bfv_python.encrypt_message(encoder.encode(v2), pub_key, n, q, t, polynom_modulus, std_dev)
+# Evaluate slot-wise and decrypt results
+c_sum = bfv_python.eval_add(c1, c2, q, polynom_modulus)
+c_prod = bfv_python.eval_mult(c1, c2, q, t, p, polynom_modulus, rlk)
+print(f"Decrypted slots of c1+c2: {encoder.decode(bfv_python.decrypt_poly(c_sum, priv_key, q, t, polynom_modulus))}")
+print(f"Plaintext slots of v1+v2: {(v1+v2)%t}")
+print(f"Decrypted slots of c1*c2: {encoder.decode(bfv_python.decrypt_poly(c_prod, priv_key, q, t, polynom_modulus))}")
+print(f"Plaintext slots of v1*v2: {(v1*v2)%t}")
+# The slots are computed with the uint64 NTT kernels, which cover prime moduli up to 2^31
+t_max = bfv_python.ntt_primes(n, 1, bfv_python.NTT_PRIME_BITS)[0]
+v_max = numpy.arange(n) * 123456789 % t_max
+encoder_max = bfv_python.BatchEncoder(n, t_max)
+print(f"Largest plaintext modulus round trip: {numpy.array_equal(encoder_max.decode(encoder_max.encode(v_max)), v_max)}")
+try:
+    bfv_python.BatchEncoder(n, bfv_python.ntt_primes(n, 1, 40)[0])
+except ValueError as error:
+    print(f"40-bit plaintext modulus rejected: {error}")
+
+
+## Test Case: BFV Context ##
+print("\nBFV Context Testcase:")
+# Set up the context once and reuse it for all operations
+context = bfv_python.BFVContext(n, q, t, std_dev, mod_p=p, std_dev2=std_dev2)
+priv_key, pub_key = context.key_pair_gen()
+rlk = context.rlk_gen(priv_key)
+# Set messages
+m1 = 4
+m2 = 7
+# Encrypt, evaluate and decrypt using the context
+c1 = context.encrypt(m1, pub_key)
+c2 = context.encrypt(m2, pub_key)
+print(f"Decrypted sum: {context.decrypt(context.eval_add(c1, c2), priv_key)} | m_sum: {(m1+m2)%t}")
+print(f"Decrypted product: {context.decrypt(context.eval_mult(c1, c2, rlk), priv_key)} | m_prod: {(m1*m2)%t}")
+# RNS moduli have to be primes below 2^NTT_PRIME_BITS for the modular arithmetic kernels
+for moduli in (bfv_python.ntt_primes(n, 2, 40), (97*193,)):
+    try:
+        bfv_python.BFVContext(n, moduli, t, std_dev)
+    except ValueError as error:
+        print(f"Invalid RNS basis rejected: {error}")
+
+
+## Test Case: Batched Encryption and Decryption ##
+print("\nBatched Encryption and Decryption Testcase:")
+# Set a batch of messages
+messages = numpy.array([0, 1, 2, 3, 42, 96])
+# Encrypt and decrypt the whole batch at once
+ciphers = context.encrypt_many(messages, pub_key)
+print(f"Ciphertext batch shape: {ciphers.shape}")
+print(f"Decrypted batch: {context.decrypt_many(ciphers, priv_key)}")
+print(f"Plaintext batch: {messages}")
+# Batches of plaintext polynomials are decrypted into full polynomials
+polys = numpy.arange(3 * n).reshape(3, n) % t
+poly_ciphers = context.encrypt_many(polys, pub_key)
+print(f"Polynomial batch round trip: {numpy.array_equal(context.decrypt_many(poly_ciphers, priv_key, full=True), polys)}")
+rns_context = bfv_python.BFVContext(n, bfv_python.rns_moduli_gen(n, 2), t, std_dev)
+priv_rns, pub_rns = rns_context.key_pair_gen()
+poly_ciphers = rns_context.encrypt_many(polys, pub_rns)
+print(f"RNS polynomial batch round trip: {numpy.array_equal(rns_context.decrypt_many(poly_ciphers, priv_rns, full=True), polys)}")
+
+
+## Test Case: Offline/Online Encryption ##
+print("\nOffline/Online Encryption Testcase:")
+# Precompute encryptions of zero (offline phase)
+pool = bfv_python.EncryptionPool(context, pub_key, max_size=4)
+print(f"Precomputed encryptions of zero: {pool.refill()}")
+# Encrypt messages by consuming the pool (online phase)
+m1 = 9
+c1 = pool.encrypt(m1)
+print(f"Decrypted c1: {context.decrypt(c1, priv_key)} | m1: {m1}")
+print(f"Remaining pool size: {len(pool)}")
+# Pooled encryptions carry the noise bound of fresh ones if the context tracks noise
+tracked_context = bfv_python.BFVContext(n, q, t, std_dev, mod_p=p, std_dev2=std_dev2, track_noise=True)
+tracked_pool = bfv_python.EncryptionPool(tracked_context, pub_key, max_size=2)
+tracked_pool.refill()
+c1 = tracked_pool.encrypt(m1)
+new_q = 2**tracked_context.estimator.min_modulus_bits(c1.noise)
+c1_small = tracked_context.mod_switch(c1)
+print(f"Decrypted pooled c1 after switching to q=2^{new_q.bit_length()-1}: {tracked_context.switched_context(new_q).decrypt(c1_small, priv_key)} | m1: {m1}")
+
+
+## Test Case: Secret Key Encryption with Seeded Ciphertexts ##
+print("\nSecret Key Encryption Testcase:")
+m1 = 11
+# Encrypt with the private key, c2 is replaced by its seed
+c1 = context.encrypt_symmetric(m1, priv_key)
+print(f"Seed of c2: {c1[1].hex()}")
+# Expand the seed at the receiver and decrypt
+c1 = context.expand_cipher(c1)
+print(f"Decrypted c1: {context.decrypt(c1, priv_key)} | m1: {m1}")
+
+
+## Test Case: Seeded Key Compression ##
+print("\nSeeded Key Compression Testcase:")
+# Generate keys whose uniform part is replaced by a seed
+priv_seeded, pub_seeded = context.key_pair_gen(seeded=True)
+rlk_seeded = context.rlk_gen(priv_seeded, seeded=True)
+print(f"Seed of pub_key_2: {pub_seeded[1].hex()}")
+# Store and load the seeded public key
+bfv_python.save_key("seeded_pub.bfv", pub_seeded)
+pub_loaded = bfv_python.load_key("seeded_pub.bfv.npz")
+os.remove("seeded_pub.bfv.npz")
+# Seeded keys are expanded automatically
+m1 = 6
+m2 = 8
+c1 = context.encrypt(m1, pub_loaded)
+c2 = context.encrypt(m2, context.expand_key(pub_seeded))
+print(f"Decrypted product: {context.decrypt(context.eval_mult(c1, c2, rlk_seeded), priv_seeded)} | m_prod: {(m1*m2)%t}")
+
+
+## Test Case: Plaintext-Ciphertext Operations ##
+print("\nPlaintext-Ciphertext Operations Testcase:")
+m1 = 12
+price = 5
+offset = 3
+c1 = context.encrypt(m1, pub_key)
+# Multiply by a public price and add a public offset without relinearization
+c_bill = context.eval_add_plain(context.eval_mult_plain(c1, price), offset)
+print(f"Decrypted bill: {context.decrypt(c_bill, priv_key)} | m_bill: {(m1*price+offset)%t}")
+
+
+## Test Case: Lazy Relinearization ##
+print("\nLazy Relinearization Testcase:")
+prices = [3, 4, 5]
+readings = [7, 8, 9]
+# Sum unrelinearized products and relinearize only once at the end
+c_sum = None
+for price, reading in zip(prices, readings):
+    c_prod = context.eval_tensor(context.encrypt(price, pub_key), context.encrypt(reading, pub_key))
+    c_sum = c_prod if c_sum is None else context.eval_add(c_sum, c_prod)
+print(f"Components before relinearization: {len(c_sum)}")
+c_sum = context.relinearize(c_sum, rlk)
+print(f"Decrypted inner product: {context.decrypt(c_sum, priv_key)} | m_inner: {sum(p*r for p, r in zip(prices, readings))%t}")
+
+
+## Test Case: Encrypted Summation ##
+print("\nEncrypted Summation Testcase:")
+messages = numpy.arange(1, 51)
+ciphers = context.encrypt_many(messages, pub_key)
+# Sum all ciphertexts in one pass with lazy modular reduction
+print(f"Decrypted sum: {context.decrypt(context.eval_sum(ciphers), priv_key)} | m_sum: {messages.sum()%t}")
+# Stream ciphertexts into an accumulator one by one
+accumulator = context.accumulator()
+for cipher in ciphers:
+    accumulator.add(tuple(cipher))
+print(f"Decrypted accumulated sum: {context.decrypt(accumulator.result(), priv_key)} | reductions: {accumulator.reductions}")
+
+
+## Test Case: Balanced Product Tree ##
+print("\nBalanced Product Tree Testcase:")
+# Use a larger RNS modulus to provide a multiplicative depth of 2
+tree_context = bfv_python.BFVContext(n, bfv_python.rns_moduli_gen(n, 3), t, std_dev)
+priv_tree, pub_tree = tree_context.key_pair_gen()
+rlk_tree = tree_context.rlk_gen(priv_tree)
+messages = [2, 3, 5, 7]
+ciphers = [tree_context.encrypt(mess, pub_tree) for mess in messages]
+# Multiply the four ciphertexts with depth log2(4) = 2 (workers=n runs each level in parallel)
+c_prod = tree_context.eval_product(ciphers, rlk_tree)
+print(f"Decrypted product: {tree_context.decrypt(c_prod, priv_tree)} | m_prod: {numpy.prod(messages)%t}")
+c_prod_parallel = tree_context.eval_product(ciphers, rlk_tree, workers=2)
+print(f"Parallel product matches sequential product: {all((comp_1 == comp_2).all() for comp_1, comp_2 in zip(c_prod, c_prod_parallel))}")
+
+
+## Test Case: Exponentiation and Polynomial Evaluation ##
+print("\nExponentiation and Polynomial Evaluation Testcase:")
+m1 = 3
+c1 = tree_context.encrypt(m1, pub_tree)
+# Compute x^3 via square-and-multiply
+print(f"Decrypted power: {tree_context.decrypt(tree_context.eval_pow(c1, 3, rlk_tree), priv_tree)} | m_pow: {m1**3%t}")
+# x^15 only needs depth 4 like x^16, the squarings are accumulated from the shallowest one
+depth_context = bfv_python.BFVContext(n, tree_context.primes, t, std_dev, track_noise=True)
+c1_tracked = depth_context.track(c1)
+c_pow15 = depth_context.eval_pow(c1_tracked, 15, rlk_tree)
+c_pow16 = depth_context.eval_pow(c1_tracked, 16, rlk_tree)
+print(f"Decrypted x^15: {depth_context.decrypt(c_pow15, priv_tree)} | m_pow: {m1**15%t}")
+print(f"Estimated budget of x^15: {depth_context.estimated_budget(c_pow15)} bits | x^16 (depth 4): {depth_context.estimated_budget(c_pow16)} bits")
+# Evaluate p(x) = 5 + 2x + 3x^3 with a baby-step giant-step schedule
+coeffs = [5, 2, 0, 3]
+c_poly = tree_context.eval_poly(c1, coeffs, rlk_tree)
+print(f"Decrypted p(m1): {tree_context.decrypt(c_poly, priv_tree)} | p(m1): {sum(a*m1**i for i, a in enumerate(coeffs))%t}")
+
+
+## Test Case: Noise Budget ##
+print("\nNoise Budget Testcase:")
+noise_context = bfv_python.BFVContext(n, q, t, std_dev, mod_p=p, std_dev2=std_dev2, track_noise=True)
+m1 = 4
+m2 = 6
+# Encryptions carry an analytic noise bound through the evaluation
+c1 = noise_context.encrypt(m1, pub_key)
+c2 = noise_context.encrypt(m2, pub_key)
+c_prod = noise_context.eval_mult(noise_context.eval_add(c1, c2), c2, rlk)
+print(f"Fresh budget: {noise_context.noise_budget(c1, priv_key)} bits | estimated: {noise_context.estimated_budget(c1)} bits")
+print(f"Product budget: {noise_context.noise_budget(c_prod, priv_key)} bits | estimated: {noise_context.estimated_budget(c_prod)} bits")
+print(f"Decrypted product: {noise_context.decrypt(c_prod, priv_key)} | m_prod: {((m1+m2)*m2)%t}")
+
+
+## Test Case: Parameter Selection ##
+print("\nParameter Selection Testcase:")
+# Select the smallest parameters for plaintexts up to 1000 and a multiplicative depth of 1
+params = bfv_python.select_parameters(1000, 1)
+print(f"Selected parameters: n={params['len_n']}, q={params['mod_q']}, t={params['mod_t']}, budget={params['budget']} bits")
+planned_context = bfv_python.BFVContext.from_requirements(1000, 1)
+priv_plan, pub_plan = planned_context.key_pair_gen()
+rlk_plan = planned_context.rlk_gen(priv_plan)
+m1 = 25
+m2 = 31
+c_prod = planned_context.eval_mult(planned_context.encrypt(m1, pub_plan), planned_context.encrypt(m2, pub_plan), rlk_plan)
+print(f"Decrypted product: {planned_context.decrypt(c_prod, priv_plan)} | m_prod: {(m1*m2)%params['mod_t']}")
+# The special primes P are sized by the relinearization noise, so that depth 1 at t=40961 fits n=4096
+params = bfv_python.select_parameters(40960, 1, batching=True)
+print(f"Selected parameters: n={params['len_n']} (expected 4096), {len(params['mod_q'])} primes, {len(params['special_primes'])} special primes, t={params['mod_t']}")
+# The integer backend uses a power of two q, which the FFT multiplies without a multi-prime NTT
+params = bfv_python.select_parameters(40960, 0, batching=True)
+print(f"Selected parameters: n={params['len_n']} (expected 2048), q=2^{params['mod_q'].bit_length()-1}, power of two: {params['mod_q'] & (params['mod_q'] - 1) == 0}")
+
+
+## Test Case: Modulus Switching ##
+print("\nModulus Switching Testcase:")
+m1 = 20
+m2 = 22
+c_sum = noise_context.eval_add(noise_context.encrypt(m1, pub_key), noise_context.encrypt(m2, pub_key))
+# Switch to the smallest power of two modulus fitting the remaining noise
+new_q = 2**noise_context.estimator.min_modulus_bits(c_sum.noise)
+c_small = noise_context.mod_switch(c_sum, new_q)
+small_context = noise_context.switched_context(new_q)
+print(f"Switched modulus: q=2^{new_q.bit_length()-1} | budget: {small_context.noise_budget(c_small, priv_key)} bits")
+print(f"Decrypted sum: {small_context.decrypt(c_small, priv_key)} | m_sum: {(m1+m2)%t}")
+# Drop the last prime of an RNS moduli chain
+c1 = tree_context.encrypt(m1, pub_tree)
+c1_chain = tree_context.mod_switch(c1, tree_context.primes[:2])
+print(f"Decrypted c1 after dropping a prime: {tree_context.switched_context(tree_context.primes[:2]).decrypt(c1_chain, priv_tree)} | m1: {m1}")
+# Integer moduli up to 2^62 are valid targets, the switched context never uses mod_p
+c1_int = tree_context.mod_switch(c1, 2**62)
+print(f"Decrypted c1 after switching to 2^62: {tree_context.switched_context(2**62).decrypt(c1_int, priv_tree)} | m1: {m1}")
+# Switched contexts are cached per modulus and reject the keys of the original modulus
+print(f"Switched context cached: {noise_context.switched_context(new_q) is small_context}")
+try:
+    small_context.eval_mult(c_small, c_small, rlk)
+except ValueError as error:
+    print(f"Relinearization rejected: {error}")
+# Without any noise budget left there is no smaller modulus to switch to
+try:
+    noise_context.estimator.min_modulus_bits(0.6)
+except ValueError as error:
+    print(f"Exhausted budget rejected: {error}")
+
+
+## Test Case: Slot Rotations ##
+print("\nSlot Rotations Testcase:")
+encoder = context.encoder
+galois_keys = context.galois_key_gen(priv_key)
+values = numpy.arange(n)
+c_packed = context.encrypt(encoder.encode(values), pub_key)
+# Rotate both rows of slots by one to the left
+c_rot = context.eval_rotate(c_packed, 1, galois_keys)
+print(f"Decrypted rotation: {encoder.decode(context.decrypt_poly(c_rot, priv_key))}")
+# Sum all slots with log2(n) rotations
+c_total = context.eval_sum_slots(c_packed, galois_keys)
+print(f"Decrypted total: {encoder.decode(context.decrypt_poly(c_total, priv_key))[0]} | m_total: {values.sum()%t}")
+# Hoisted rotations within the RNS backend (Galois keys are kept within the NTT domain)
+galois_keys_rns = tree_context.galois_key_gen(priv_tree, steps=[1, 2], seeded=True)
+c_packed_rns = tree_context.encrypt(encoder.encode(values), pub_tree)
+for step, c_rot_rns in zip([1, 2], tree_context.eval_rotate_many(c_packed_rns, [1, 2], galois_keys_rns)):
+    print(f"Decrypted RNS rotation by {step}: {encoder.decode(tree_context.decrypt_poly(c_rot_rns, priv_tree))}")
+
+
+## Test Case: Selective Decryption ##
+print("\nSelective Decryption Testcase:")
+poly = numpy.arange(n)
+c_poly = context.encrypt(poly, pub_key)
+# Decrypt only a few coefficients via dot products instead of a full ring product
+print(f"Decrypted coefficients [0, 3, {n-1}]: {context.decrypt_coeffs(c_poly, priv_key, [0, 3, n-1])} | plaintext: {poly[[0, 3, n-1]] % t}")
+
+
+## Test Case: Base Decomposition Relinearization ##
+print("\nBase Decomposition Relinearization Testcase:")
+decomp_context = bfv_python.BFVContext(n, q, t, std_dev, base_bits=10)
+rlk_decomp = decomp_context.rlk_gen(priv_key)
+c_decomp = decomp_context.eval_mult(context.encrypt(m1, pub_key), context.encrypt(m2, pub_key),
+    rlk_decomp)
+print(f"Decrypted product: {decomp_context.decrypt(c_decomp, priv_key)} | m_prod: {(m1*m2)%t}")
+print(f"Noise budget: {decomp_context.noise_budget(c_decomp, priv_key)} bits")
+
+
+## Test Case: FFT Multiplication for Power-of-Two Moduli ##
+print("\nFFT Multiplication Testcase:")
+poly_a = bfv_python.uni_poly_gen(n, q)
+poly_b = bfv_python.uni_poly_gen(n, q)
+exact = (bfv_python.negacyclic_mult(poly_a, poly_b, n) % q).astype(numpy.int64)
+print(f"FFT product matches exact NTT product: {(bfv_python.negacyclic_mult_pow2(poly_a, poly_b, n, q) == exact).all()}")
+
+
+## Test Case: Modular Arithmetic Kernels ##
+print("\nModular Arithmetic Kernels Testcase:")
+kernel_primes = bfv_python.ntt_primes(n, 3)
+kernel_moduli = numpy.array(kernel_primes, dtype=numpy.uint64)[:, None]
+res_a = bfv_python.poly_to_residues(bfv_python.uni_poly_gen(n, q), kernel_primes)
+res_b = bfv_python.poly_to_residues(bfv_python.uni_poly_gen(n, q), kernel_primes)
+barrett = bfv_python.barrett_precompute(kernel_moduli)
+shoup = bfv_python.shoup_precompute(res_b, kernel_moduli)
+print(f"Barrett product matches: {(bfv_python.mod_mul(res_a, res_b, kernel_moduli, barrett) == res_a * res_b % kernel_moduli).all()}")
+print(f"Shoup product matches: {(bfv_python.mod_mul_shoup(res_a, res_b, shoup, kernel_moduli) == res_a * res_b % kernel_moduli).all()}")
+
+
+## Test Case: JIT Backend ##
+print("\nJIT Backend Testcase:")
+if bfv_python.numba is None:
+    print("Numba is not installed, the NumPy backend is used.")
+else:
+    jit_tables = bfv_python.ntt_tables(n, kernel_primes)
+    outputs = []
+    for enabled in (False, True):
+        bfv_python.use_jit(enabled)
+        outputs.append((bfv_python.ntt_forward(res_a, jit_tables), bfv_python.ntt_inverse(res_a, jit_tables),
+            bfv_python.negacyclic_reduce(numpy.arange(3*n) - n, n)))
+    print(f"Identical NumPy and Numba outputs: {all((out_1 == out_2).all() for out_1, out_2 in zip(*outputs))}")
+
+
+## Test Case: Ciphertext Objects ##
+print("\nCiphertext Objects Testcase:")
+obj_context = bfv_python.BFVContext(n, bfv_python.rns_moduli_gen(n, 3), t, std_dev)
+secret_key, public_key = obj_context.generate_keys()
+rlk_obj = obj_context.rlk_gen(secret_key.poly)
+ct_1, ct_2 = public_key.encrypt(m1), public_key.encrypt(m2)
+print(f"Fresh ciphertext: {ct_1!r}") # kept within the NTT domain
+print(f"Decrypted (c1+c2)*3-c1: {secret_key.decrypt((ct_1 + ct_2) * 3 - ct_1)} | m: {((m1+m2)*3-m1)%t}")
+print(f"Decrypted c1*c2+1: {secret_key.decrypt((ct_1 * ct_2).relinearize(rlk_obj) + 1)} | m: {(m1*m2+1)%t}")
+for obj_ctx in (context, obj_context): # three-component products have to be relinearized first
+    obj_sk, obj_pk = obj_ctx.generate_keys()
+    try:
+        obj_sk.decrypt(obj_pk.encrypt(3) * obj_pk.encrypt(4))
+        print("Unrelinearized product decrypted without error")
+    except ValueError as error:
+        print(f"Unrelinearized product rejected: {error}")
+
+
+## Test Case: Workspace Arena ##
+print("\nWorkspace Arena Testcase:")
+ws_context = bfv_python.BFVContext(n, obj_context.primes, t, std_dev, use_workspace=True)
+ws_priv, ws_pub = ws_context.key_pair_gen()
+ws_acc = ws_context.encrypt(m1, ws_pub)
+for _ in range(3):
+    ws_context.eval_add(ws_acc, ws_context.encrypt(m2, ws_pub), out=ws_acc) # accumulates in place
+print(f"Decrypted in-place sum: {ws_context.decrypt(ws_acc, ws_priv)} | m: {(m1+3*m2)%t}")
+ws_res = bfv_python.poly_to_residues(bfv_python.uni_poly_gen(n, q), obj_context.primes)
+ws_out = numpy.empty_like(ws_res)
+bfv_python.rns_mult_polys(ws_res, ws_res, obj_context.primes, out=ws_out, workspace=ws_context.workspace)
+print(f"Workspace product matches: {(ws_out == bfv_python.rns_mult_polys(ws_res, ws_res, obj_context.primes)).all()}")